@@ -0,0 +1,106 @@
+"""
+Generador de carga en proceso contra la app ASGI (sin red ni servidor):
+GET /products, POST /chat con el proveedor simulado y GET /chat/history,
+cada uno con N peticiones y C clientes concurrentes sobre una BD SQLite
+temporal. La latencia del proveedor se configura con LLM_SIM_* (por
+defecto 50 ms fijos con semilla, para que las corridas sean comparables).
+
+Uso: python -m benchmarks.bench_api [--requests 200] [--concurrency 20] [-o res.json] [--compare base.json]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+# La URL se lee al importar database.py: hay que fijarla antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("LLM_PROVIDER", "simulated")
+os.environ.setdefault("LLM_SIM_SEED", "42")
+os.environ.setdefault("LLM_SIM_LATENCY_MS", "50")
+os.environ.setdefault("LLM_SIM_LATENCY_DISTRIBUTION", "fixed")
+os.environ.setdefault("LLM_SIM_TOKENS_PER_SECOND", "0")
+# Cada pregunta debe llegar al proveedor: sin caché de respuestas
+os.environ.setdefault("CHAT_RESPONSE_CACHE_SIZE", "0")
+os.environ.setdefault("LOG_SAMPLE_RATE", "0")
+
+import httpx  # noqa: E402
+
+from benchmarks.catalog import make_catalog, QUERIES  # noqa: E402
+from benchmarks.results import add_output_arguments, document, emit, percentile, result  # noqa: E402
+from src.infrastructure.api import main  # noqa: E402
+from src.infrastructure.api.container import AppContainer  # noqa: E402
+from src.infrastructure.db.database import SessionLocal, async_engine, init_db  # noqa: E402
+from src.infrastructure.repositorie.product_repository import SQLProductRepository  # noqa: E402
+
+
+async def load(http: httpx.AsyncClient, requests: int, concurrency: int, make_request) -> dict:
+    """`make_request(i)` retorna (método, ruta, json) de la petición i."""
+    latencies, statuses = [], {}
+    pending = iter(range(requests))
+
+    async def client():
+        for i in pending:
+            method, path, payload = make_request(i)
+            start = time.perf_counter()
+            response = await http.request(method, path, json=payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "requests_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "statuses": statuses,
+    }
+
+
+async def run(requests: int, concurrency: int, catalog_size: int = 500) -> dict:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    init_db()
+    with SessionLocal() as db:
+        repo = SQLProductRepository(db)
+        for product in make_catalog(catalog_size):
+            product.id = None
+            db.add(repo._entity_to_model(product))
+        db.commit()
+    main.app.state.container = AppContainer()
+    sessions = max(1, concurrency * 4)
+    params = {"requests": requests, "concurrency": concurrency, "catalog_size": catalog_size}
+
+    scenarios = [
+        ("GET /products", lambda i: ("GET", "/products", None)),
+        ("GET /products?limit=50", lambda i: ("GET", f"/products?limit=50&after={(i * 50) % catalog_size}", None)),
+        ("POST /chat", lambda i: ("POST", "/chat", {"session_id": f"bench-{i % sessions}",
+                                                    "message": QUERIES[i % len(QUERIES)]})),
+        # Las sesiones ya tienen historial tras el escenario de /chat
+        ("GET /chat/history", lambda i: ("GET", f"/chat/history/bench-{i % sessions}?limit=20", None)),
+    ]
+    results = []
+    async with httpx.AsyncClient(app=main.app, base_url="http://bench") as http:
+        for name, make_request in scenarios:
+            results.append(result(name, params, await load(http, requests, concurrency, make_request)))
+    await main.app.state.container.close()
+    await async_engine.dispose()
+    return document("api", results, dict(params, llm_latency_ms=float(os.environ["LLM_SIM_LATENCY_MS"])))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--catalog-size", type=int, default=500)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    doc = asyncio.run(run(args.requests, args.concurrency, args.catalog_size))
+    code = emit(doc, args.output, args.baseline, args.threshold)
+    _tmp.cleanup()
+    sys.exit(code)
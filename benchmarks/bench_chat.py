@@ -0,0 +1,87 @@
+"""
+Throughput y latencia de POST /chat con el proveedor simulado, sin red:
+N clientes concurrentes envían mensajes a la app ASGI en proceso sobre una
+BD SQLite temporal. La latencia del proveedor se configura con LLM_SIM_*.
+
+Uso: python -m benchmarks.bench_chat [--requests 200] [--concurrency 20] [-o res.json] [--compare base.json]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.TemporaryDirectory()
+# La URL se lee al importar database.py: hay que fijarla antes de importar la app
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp.name, 'bench.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("LLM_PROVIDER", "simulated")
+os.environ.setdefault("LLM_SIM_SEED", "42")
+
+import httpx  # noqa: E402
+
+from benchmarks.catalog import make_catalog, QUERIES  # noqa: E402
+from benchmarks.results import add_output_arguments, document, emit, percentile, result  # noqa: E402
+from src.infrastructure.api import main  # noqa: E402
+from src.infrastructure.api.container import AppContainer  # noqa: E402
+from src.infrastructure.db.database import SessionLocal, async_engine, init_db  # noqa: E402
+from src.infrastructure.repositorie.product_repository import SQLProductRepository  # noqa: E402
+
+
+async def run(requests: int, concurrency: int, catalog_size: int = 500) -> dict:
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    init_db()
+    with SessionLocal() as db:
+        repo = SQLProductRepository(db)
+        for product in make_catalog(catalog_size):
+            product.id = None
+            db.add(repo._entity_to_model(product))
+        db.commit()
+    main.app.state.container = AppContainer()
+
+    latencies, statuses = [], {}
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def client(http):
+        while not queue.empty():
+            i = queue.get_nowait()
+            payload = {"session_id": f"bench-{i % (concurrency * 4)}", "message": QUERIES[i % len(QUERIES)]}
+            start = time.perf_counter()
+            response = await http.post("/chat", json=payload)
+            latencies.append((time.perf_counter() - start) * 1000)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    async with httpx.AsyncClient(app=main.app, base_url="http://bench") as http:
+        await asyncio.gather(*(client(http) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await main.app.state.container.close()
+    await async_engine.dispose()
+
+    return {
+        "provider": type(main.app.state.container.llm_service).__name__,
+        "requests_per_s": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p95_ms": round(percentile(latencies, 95), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "statuses": statuses,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--catalog-size", type=int, default=500)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    params = {"requests": args.requests, "concurrency": args.concurrency, "catalog_size": args.catalog_size}
+    metrics = asyncio.run(run(args.requests, args.concurrency, args.catalog_size))
+    doc = document("chat", [result("POST /chat", params, metrics)])
+    code = emit(doc, args.output, args.baseline, args.threshold)
+    _tmp.cleanup()
+    sys.exit(code)
@@ -0,0 +1,122 @@
+"""
+Turnos de chat concurrentes con un LLM lento sobre un pool de conexiones
+pequeño, comparando:
+
+- held: una sola sesión abierta desde la lectura hasta la escritura,
+  incluida la espera al LLM (como el /chat original con Depends(get_db));
+- uow: ChatService con unidades de trabajo cortas de lectura y escritura.
+
+Uso: python -m benchmarks.bench_chat_pool [--turns 200] [--pool-size 2] [--llm-latency-ms 500]
+                                          [-o res.json] [--compare base.json]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from benchmarks.catalog import make_catalog, QUERIES
+from benchmarks.results import add_output_arguments, document, emit, percentile, result
+from src.application.chat_service import ChatService
+from src.application.context_builder import CHAT_CONTEXT_WINDOW
+from src.application.dtos import ChatMessageRequestDTO
+from src.domain.entities import ChatContext, ChatMessage
+from src.infrastructure.db.database import Base
+import src.infrastructure.db.models  # registra los modelos en Base
+from src.infrastructure.llm_providers.simulated_llm_service import SimulatedLLMService
+from src.infrastructure.repositorie.async_chat_repository import AsyncSQLChatRepository
+from src.infrastructure.repositorie.async_product_repository import AsyncSQLProductRepository
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+from src.infrastructure.repositorie.unit_of_work import AsyncSQLUnitOfWork
+
+POOL_TIMEOUT_SECONDS = 5
+
+
+async def held_turn(factory, provider, session_id, message):
+    async with factory() as db:
+        products = await AsyncSQLProductRepository(db).get_all()
+        chat_repo = AsyncSQLChatRepository(db)
+        history = await chat_repo.get_recent_messages(session_id, CHAT_CONTEXT_WINDOW)
+        reply = await provider.generate_response(message, products[:8], ChatContext(messages=history))
+        now = datetime.utcnow()
+        await chat_repo.save_messages([
+            ChatMessage(id=None, session_id=session_id, role="user", message=message, timestamp=now),
+            ChatMessage(id=None, session_id=session_id, role="assistant", message=reply, timestamp=now),
+        ])
+
+
+async def run(mode: str, turns: int, pool_size: int, latency_ms: float, catalog_size: int = 200) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        with sessionmaker(bind=engine)() as db:
+            repo = SQLProductRepository(db)
+            for product in make_catalog(catalog_size):
+                product.id = None
+                db.add(repo._entity_to_model(product))
+            db.commit()
+        engine.dispose()
+
+        async_engine = create_async_engine(
+            f"sqlite+aiosqlite:///{path}", poolclass=AsyncAdaptedQueuePool,
+            pool_size=pool_size, max_overflow=0, pool_timeout=POOL_TIMEOUT_SECONDS,
+        )
+        factory = async_sessionmaker(async_engine, expire_on_commit=False)
+        provider = SimulatedLLMService(latency_ms=latency_ms, tokens_per_second=0, seed=1)
+        service = ChatService(None, None, provider, unit_of_work_factory=lambda: AsyncSQLUnitOfWork(factory))
+        latencies, errors = [], 0
+
+        async def turn(i):
+            nonlocal errors
+            session_id, message = f"bench-{i}", QUERIES[i % len(QUERIES)]
+            start = time.perf_counter()
+            try:
+                if mode == "held":
+                    await held_turn(factory, provider, session_id, message)
+                else:
+                    await service.process_message(ChatMessageRequestDTO(session_id=session_id, message=message))
+                latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                # La pool agotada aparece directa (held) o envuelta en ChatServiceError (uow)
+                if isinstance(e, PoolTimeoutError) or "QueuePool limit" in str(e):
+                    errors += 1
+                else:
+                    raise
+
+        started = time.perf_counter()
+        await asyncio.gather(*(turn(i) for i in range(turns)))
+        elapsed = time.perf_counter() - started
+        await async_engine.dispose()
+
+    return {
+        "turns_per_s": round(turns / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50), 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 1) if latencies else None,
+        "pool_timeouts": errors,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--llm-latency-ms", type=float, default=500)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    results = [
+        result(f"chat_turn.{mode}", {"turns": args.turns, "pool_size": args.pool_size,
+                                     "llm_latency_ms": args.llm_latency_ms},
+               asyncio.run(run(mode, args.turns, args.pool_size, args.llm_latency_ms)))
+        for mode in ("held", "uow")
+    ]
+    doc = document("chat_pool", results)
+    sys.exit(emit(doc, args.output, args.baseline, args.threshold))
@@ -0,0 +1,80 @@
+"""
+Importación masiva de un feed CSV/NDJSON sintético con
+ProductService.import_products: filas por segundo y memoria residente
+máxima del proceso, que no debe crecer con el tamaño del feed.
+
+Uso: python -m benchmarks.bench_import [--rows 500000] [--format csv] [--batch-size 5000] [-o res.json]
+"""
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import replace
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.catalog import make_catalog
+from benchmarks.results import add_output_arguments, document, emit, result
+from src.application.product_service import ProductService, IMPORT_BATCH_SIZE
+from src.infrastructure.db.database import Base
+import src.infrastructure.db.models  # registra los modelos en Base
+from src.infrastructure.importers.product_feed import iter_csv_lines, iter_ndjson_lines, iter_rows, open_text
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+
+def write_feed(path: str, rows: int, feed_format: str) -> None:
+    # Se repite un catálogo base para no tener el feed completo en memoria
+    base = make_catalog(10_000)
+    lines = iter_csv_lines if feed_format == "csv" else iter_ndjson_lines
+
+    def products():
+        for i in range(rows):
+            yield replace(base[i % len(base)], id=None)
+
+    with open(path, "w", encoding="utf-8", newline="") as out:
+        out.writelines(lines(products()))
+
+
+def run(rows: int, feed_format: str, batch_size: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = os.path.join(tmp, f"feed.{feed_format}")
+        write_feed(feed, rows, feed_format)
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'import.db')}")
+        Base.metadata.create_all(bind=engine)
+
+        started = time.perf_counter()
+        with open(feed, "rb") as binary, sessionmaker(bind=engine)() as db:
+            report = ProductService(SQLProductRepository(db)).import_products(
+                iter_rows(open_text(binary), feed_format), batch_size=batch_size
+            )
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "rows_per_s": round(rows / elapsed),
+        "import_ms": round(elapsed * 1000, 1),
+        # ru_maxrss está en KiB en Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "imported": report.imported,
+        "failed": report.failed,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[500_000])
+    parser.add_argument("--format", choices=("csv", "ndjson"), default="csv")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    results = [
+        result("product_import", {"rows": rows, "format": args.format, "batch_size": args.batch_size},
+               run(rows, args.format, args.batch_size))
+        for rows in args.rows
+    ]
+    doc = document("import", results)
+    sys.exit(emit(doc, args.output, args.baseline, args.threshold))
@@ -0,0 +1,105 @@
+"""
+Memoria y tiempo de leer el catálogo completo a entidades, por tamaño:
+
+- orm_dict_entities: el camino anterior (objetos ORM en el mapa de identidad
+  → dataclass con __dict__, repitiendo las validaciones en cada fila);
+- core_slotted_entities: SQLProductRepository.get_all (tuplas de columnas
+  → Product con __slots__ por Product.from_row).
+
+Reporta la memoria retenida por la lista resultante, el pico durante la
+carga (tracemalloc) y los bytes por producto.
+
+Uso: python -m benchmarks.bench_memory [--sizes 100000] [-o res.json] [--compare base.json]
+"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+from dataclasses import fields, make_dataclass
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.bench_micro import _seed
+from benchmarks.results import add_output_arguments, document, emit, measure, result
+from src.domain.entities import Product
+from src.infrastructure.db.database import Base
+from src.infrastructure.db.models import ProductModel
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+DEFAULT_SIZES = [100_000]
+# Mismos campos que Product, pero con __dict__ por instancia (forma anterior)
+DictProduct = make_dataclass("DictProduct", [(f.name, f.type) for f in fields(Product)])
+
+
+def orm_dict_entities(db):
+    products = []
+    for m in db.query(ProductModel).all():
+        Product.validate_changes({"price": m.price, "stock": m.stock, "name": m.name})
+        products.append(DictProduct(m.id, m.name, m.brand, m.category, m.size, m.color,
+                                    m.price, m.stock, m.description, m.version))
+    return products
+
+
+def core_slotted_entities(db):
+    return SQLProductRepository(db).get_all()
+
+
+PATHS = {"orm_dict_entities": orm_dict_entities, "core_slotted_entities": core_slotted_entities}
+
+
+def _memory(factory, load) -> dict:
+    """Memoria retenida por el resultado (con la sesión ya cerrada) y pico durante la carga."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    with factory() as db:
+        products = load(db)
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    retained = current - before
+    count = len(products)
+    del products
+    return {
+        "retained_mb": round(retained / 2 ** 20, 2),
+        "peak_mb": round((peak - before) / 2 ** 20, 2),
+        "bytes_per_product": round(retained / count) if count else 0,
+    }
+
+
+def run_size(size: int, repeat: int) -> list:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'memory.db')}")
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+        with factory() as db:
+            _seed(db, size)
+
+        for name, load in PATHS.items():
+            def timed():
+                with factory() as db:
+                    load(db)
+            metrics = dict(measure(timed, repeat=repeat), **_memory(factory, load))
+            results.append(result(f"catalog_read.{name}", {"catalog_size": size}, metrics))
+        engine.dispose()
+    return results
+
+
+def run(sizes, repeat: int = 3) -> dict:
+    results = []
+    for size in sizes:
+        results.extend(run_size(size, repeat))
+    return document("memory", results, {"sizes": sizes, "repeat": repeat})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    sys.exit(emit(run(args.sizes, args.repeat), args.output, args.baseline, args.threshold))
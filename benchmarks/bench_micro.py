@@ -0,0 +1,122 @@
+"""
+Micro-benchmarks de los repositorios SQL y del armado del prompt, por
+tamaño de catálogo, sobre una BD SQLite temporal:
+
+- SQLProductRepository: get_all, get_by_id, search (filtro + página), iter_all;
+- ProductService.search_products;
+- SQLChatRepository: save_messages, get_recent_messages, get_session_history;
+- GeminiService.format_products_info (sin y con bloque precalculado);
+- ChatContext.format_for_prompt.
+
+Uso: python -m benchmarks.bench_micro [--sizes 10 100 1000 10000 100000] [-o res.json] [--compare base.json]
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.catalog import make_catalog
+from benchmarks.results import add_output_arguments, document, emit, measure, result
+from src.application.product_service import ProductService
+from src.domain.entities import ChatContext, ChatMessage
+from src.infrastructure.db.database import Base
+import src.infrastructure.db.models  # registra los modelos en Base
+from src.infrastructure.llm_providers.gemini_service import GeminiService
+from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 100_000]
+# Mensajes por sesión en los benchmarks del historial
+HISTORY_MESSAGES = 200
+
+
+def _seed(db, size: int) -> None:
+    repo = SQLProductRepository(db)
+    products = make_catalog(size)
+    for start in range(0, size, 10_000):
+        batch = [repo._entity_to_model(p) for p in products[start:start + 10_000]]
+        for model in batch:
+            model.id = None
+        db.add_all(batch)
+        db.flush()
+    db.commit()
+
+
+def _messages(session_id: str, count: int):
+    now = datetime.utcnow()
+    return [
+        ChatMessage(id=None, session_id=session_id, role="user" if i % 2 == 0 else "assistant",
+                    message=f"mensaje {i} sobre zapatillas de running talla 42", timestamp=now + timedelta(seconds=i))
+        for i in range(count)
+    ]
+
+
+def run_size(size: int, repeat: int) -> list:
+    results = []
+
+    def record(name, fn, **extra):
+        results.append(result(name, {"catalog_size": size}, dict(measure(fn, repeat=repeat), **extra)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'micro.db')}")
+        Base.metadata.create_all(bind=engine)
+        factory = sessionmaker(bind=engine)
+        with factory() as db:
+            _seed(db, size)
+
+        with factory() as db:
+            repo = SQLProductRepository(db)
+            service = ProductService(repo)
+            middle = size // 2 or 1
+            record("product_repo.get_all", lambda: (repo.get_all(), db.expunge_all()))
+            record("product_repo.get_by_id", lambda: repo.get_by_id(middle))
+            record("product_repo.search_brand_page", lambda: repo.search({"brand": "Nike"}, limit=20))
+            record("product_repo.search_price_in_stock",
+                   lambda: repo.search({"min_price": 80, "max_price": 120, "in_stock": True}, limit=20))
+            record("product_repo.iter_all", lambda: (sum(1 for _ in repo.iter_all()), db.expunge_all()))
+            record("product_service.search_products",
+                   lambda: service.search_products({"category": "Running", "color": "azul"}, limit=20, offset=20))
+            products = repo.get_all()
+
+        with factory() as db:
+            chats = SQLChatRepository(db)
+            chats.save_messages(_messages("bench-history", HISTORY_MESSAGES))
+            counter = iter(range(10 ** 9))
+            record("chat_repo.save_messages",
+                   lambda: chats.save_messages(_messages(f"bench-save-{next(counter)}", 2)))
+            record("chat_repo.get_recent_messages", lambda: chats.get_recent_messages("bench-history", 6))
+            record("chat_repo.get_session_history", lambda: chats.get_session_history("bench-history", 50))
+        engine.dispose()
+
+    gemini = GeminiService(api_key="bench")
+    record("gemini.format_products_info", lambda: gemini.format_products_info(products))
+    gemini.prompt_block.on_catalog_loaded(products, 1)
+    record("gemini.format_products_info_cached", lambda: gemini.format_products_info(products, 1))
+    return results
+
+
+def run(sizes, repeat: int = 5) -> dict:
+    # No depende del catálogo: se mide una vez por tamaño de historial
+    results = []
+    for count in (6, 50):
+        context = ChatContext(messages=_messages("bench", count), max_messages=count,
+                              summary="El cliente busca zapatillas de running")
+        results.append(result("chat_context.format_for_prompt", {"messages": count},
+                              measure(context.format_for_prompt, repeat=max(repeat, 100))))
+    for size in sizes:
+        # Con catálogos grandes basta con menos repeticiones
+        results.extend(run_size(size, repeat if size <= 10_000 else max(2, repeat // 2)))
+    return document("micro", results, {"sizes": sizes, "repeat": repeat})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=5)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    sys.exit(emit(run(args.sizes, args.repeat), args.output, args.baseline, args.threshold))
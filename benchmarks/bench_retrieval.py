@@ -0,0 +1,65 @@
+"""
+Compara el tamaño del prompt y el tiempo de armarlo enviando el catálogo
+completo frente a los top-K productos elegidos por BM25ProductIndex.
+
+Uso: python -m benchmarks.bench_retrieval [--sizes 100 1000 10000] [-o res.json] [--compare base.json]
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.catalog import make_catalog, QUERIES
+from benchmarks.results import add_output_arguments, document, emit, result
+from src.infrastructure.llm_providers.product_prompt_block import format_product_line
+from src.infrastructure.search.product_index import BM25ProductIndex, CHAT_PRODUCTS_TOP_K
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+
+def run(size: int, k: int = CHAT_PRODUCTS_TOP_K, repeat: int = 5) -> dict:
+    products = make_catalog(size)
+    index = BM25ProductIndex()
+    _, build_ms = _timed(lambda: index.on_catalog_loaded(products, 1), 1)
+
+    def full_prompt():
+        return "\n".join(format_product_line(p) for p in products)
+
+    def retrieved_prompts():
+        return ["\n".join(format_product_line(p) for p in index.select(products, q, k=k))
+                for q in QUERIES]
+
+    full_text, full_ms = _timed(full_prompt, repeat)
+    retrieved, retrieval_ms = _timed(retrieved_prompts, repeat)
+    retrieved_chars = statistics.mean(len(t) for t in retrieved)
+    return {
+        "index_build_ms": round(build_ms, 2),
+        "full_prompt_chars": len(full_text),
+        "full_prompt_est_tokens": len(full_text) // 4,
+        "full_prompt_build_ms": round(full_ms, 3),
+        "retrieved_prompt_chars": round(retrieved_chars),
+        "retrieved_prompt_est_tokens": round(retrieved_chars / 4),
+        "retrieved_prompt_build_ms": round(retrieval_ms / len(QUERIES), 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1_000, 10_000])
+    parser.add_argument("--top-k", type=int, default=CHAT_PRODUCTS_TOP_K)
+    parser.add_argument("--repeat", type=int, default=5)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    results = [
+        result("prompt_retrieval", {"catalog_size": size, "top_k": args.top_k}, run(size, args.top_k, args.repeat))
+        for size in args.sizes
+    ]
+    doc = document("retrieval", results, {"repeat": args.repeat})
+    sys.exit(emit(doc, args.output, args.baseline, args.threshold))
@@ -0,0 +1,106 @@
+"""
+Throughput concurrente de lecturas del catálogo y escrituras del chat en
+SQLite, con el perfil por defecto frente a DB_PROFILE=production (WAL y
+PRAGMAs de engine_profile.py).
+
+Uso: python -m benchmarks.bench_sqlite_profile [--seconds 3] [--readers 4] [--writers 4]
+                                               [-o res.json] [--compare base.json]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from benchmarks.catalog import make_catalog
+from benchmarks.results import add_output_arguments, document, emit, result
+from src.domain.entities import ChatMessage
+from src.infrastructure.db.database import Base
+from src.infrastructure.db.engine_profile import engine_options, install_sqlite_pragmas, sqlite_pragmas
+import src.infrastructure.db.models  # registra los modelos en Base
+from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+
+def run(profile: str, seconds: float, readers: int, writers: int, catalog_size: int = 1_000) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = create_engine(url, **engine_options(url))
+        install_sqlite_pragmas(engine, sqlite_pragmas(profile))
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+
+        with Session() as db:
+            repo = SQLProductRepository(db)
+            for product in make_catalog(catalog_size):
+                product.id = None
+                db.add(repo._entity_to_model(product))
+            db.commit()
+
+        counts = {"reads": 0, "writes": 0, "errors": 0}
+        lock = threading.Lock()
+        stop = threading.Event()
+
+        def count(key):
+            with lock:
+                counts[key] += 1
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    with Session() as db:
+                        SQLProductRepository(db).get_all()
+                    count("reads")
+                except OperationalError:
+                    count("errors")
+
+        def writer(n):
+            while not stop.is_set():
+                now = datetime.utcnow()
+                try:
+                    with Session() as db:
+                        SQLChatRepository(db).save_messages([
+                            ChatMessage(id=None, session_id=f"bench-{n}", role="user", message="hola", timestamp=now),
+                            ChatMessage(id=None, session_id=f"bench-{n}", role="assistant", message="¡hola!", timestamp=now),
+                        ])
+                    count("writes")
+                except OperationalError:
+                    count("errors")
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        for t in threads:
+            t.start()
+        time.sleep(seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        engine.dispose()
+
+    return {
+        "reads_per_s": round(counts["reads"] / seconds, 1),
+        "writes_per_s": round(counts["writes"] / seconds, 1),
+        "errors": counts["errors"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--writers", type=int, default=4)
+    add_output_arguments(parser)
+    args = parser.parse_args()
+    results = [
+        result(f"sqlite_concurrency.{profile}", {"readers": args.readers, "writers": args.writers},
+               run(profile, args.seconds, args.readers, args.writers))
+        for profile in ("default", "production")
+    ]
+    doc = document("sqlite_profile", results, {"seconds": args.seconds})
+    sys.exit(emit(doc, args.output, args.baseline, args.threshold))
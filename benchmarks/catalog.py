@@ -0,0 +1,42 @@
+"""
+Catálogo sintético reproducible para los benchmarks.
+"""
+import random
+from typing import List
+
+from src.domain.entities import Product
+
+BRANDS = ["Nike", "Adidas", "Puma", "Reebok", "New Balance", "Asics", "Converse", "Vans"]
+CATEGORIES = ["Running", "Casual", "Formal", "Basketball", "Trail", "Skate"]
+COLORS = ["Negro", "Blanco", "Azul", "Rojo", "Verde", "Gris", "Marrón"]
+MODELS = ["Air", "Zoom", "Boost", "Classic", "Runner", "Pro", "Flex", "Max", "Retro", "Street"]
+ADJECTIVES = ["ligeras", "cómodas", "resistentes", "clásicas", "urbanas", "transpirables"]
+
+QUERIES = [
+    "¿tienen Nike talla 42?",
+    "busco zapatillas de running azules",
+    "algo formal en marrón para una boda",
+    "Adidas blancas casual",
+    "¿qué me recomiendas para trail?",
+]
+
+
+def make_catalog(size: int, seed: int = 42) -> List[Product]:
+    """Genera `size` productos con IDs 1..size."""
+    rng = random.Random(seed)
+    products = []
+    for i in range(1, size + 1):
+        brand = rng.choice(BRANDS)
+        category = rng.choice(CATEGORIES)
+        products.append(Product(
+            id=i,
+            name=f"{brand} {rng.choice(MODELS)} {rng.choice(MODELS)} {i}",
+            brand=brand,
+            category=category,
+            size=str(rng.randint(36, 46)),
+            color=rng.choice(COLORS),
+            price=round(rng.uniform(40, 250), 2),
+            stock=rng.randint(0, 50),
+            description=f"Zapatillas {category.lower()} {rng.choice(ADJECTIVES)} de {brand}.",
+        ))
+    return products
@@ -0,0 +1,156 @@
+"""
+Formato común de resultados de los benchmarks y comparación entre corridas.
+
+Cada corrida produce un documento JSON:
+
+    {"suite": ..., "environment": {...}, "results": [{"name", "params", "metrics"}]}
+
+`compare` empareja los resultados por nombre y parámetros y marca como
+regresión cada métrica que empeora más que el umbral (en las de latencia,
+más alta es peor; en las de throughput, más baja).
+
+Uso: python -m benchmarks.results base.json nuevo.json [--threshold 0.10]
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import sqlalchemy
+
+# Sufijos de métricas donde más alto es mejor; el resto se interpreta como latencia
+HIGHER_IS_BETTER = ("_per_s", "ops_s")
+# Solo se comparan estas métricas; los tamaños y conteos son informativos
+COMPARED_SUFFIXES = ("_ms", "_per_s", "ops_s")
+DEFAULT_THRESHOLD = 0.10
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, warmup: int = 1, min_time: float = 0.0) -> Dict[str, float]:
+    """
+    Ejecuta `fn` `warmup` veces sin medir y luego `repeat` veces (o hasta
+    sumar `min_time` segundos). Retorna mediana, p95 y mínimo en ms.
+    """
+    for _ in range(warmup):
+        fn()
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < repeat or time.perf_counter() - started < min_time:
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(percentile(samples, 95), 4),
+        "min_ms": round(min(samples), 4),
+        "runs": len(samples),
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def document(suite: str, results: List[dict], params: Optional[dict] = None) -> dict:
+    return {"suite": suite, "environment": environment(), "params": params or {}, "results": results}
+
+
+def result(name: str, params: dict, metrics: dict) -> dict:
+    return {"name": name, "params": params, "metrics": metrics}
+
+
+def _key(entry: dict) -> str:
+    return entry["name"] + json.dumps(entry["params"], sort_keys=True)
+
+
+def compare(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD) -> List[dict]:
+    """
+    Una fila por métrica comparable presente en ambas corridas, con el
+    cambio relativo y `regression` si empeoró más que `threshold`.
+    """
+    previous = {_key(r): r for r in baseline["results"]}
+    rows = []
+    for entry in current["results"]:
+        before = previous.get(_key(entry))
+        if before is None:
+            continue
+        for metric, value in entry["metrics"].items():
+            old = before["metrics"].get(metric)
+            if not metric.endswith(COMPARED_SUFFIXES) or not isinstance(value, (int, float)) \
+                    or not isinstance(old, (int, float)) or old <= 0:
+                continue
+            change = (value - old) / old
+            worse = -change if metric.endswith(HIGHER_IS_BETTER) else change
+            rows.append({
+                "name": entry["name"], "params": entry["params"], "metric": metric,
+                "baseline": old, "current": value, "change": round(change, 4),
+                "regression": worse > threshold,
+            })
+    return rows
+
+
+def emit(doc: dict, output: Optional[str] = None, baseline: Optional[str] = None,
+         threshold: float = DEFAULT_THRESHOLD) -> int:
+    """
+    Escribe el documento (a `output` o a stdout) y, con `baseline`, la
+    comparación en stderr. Retorna 1 si hubo regresiones (código de salida).
+    """
+    text = json.dumps(doc, indent=2, ensure_ascii=False)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if baseline is None:
+        return 0
+    with open(baseline, encoding="utf-8") as f:
+        rows = compare(json.load(f), doc, threshold)
+    return report(rows)
+
+
+def report(rows: List[dict]) -> int:
+    regressions = [r for r in rows if r["regression"]]
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else "ok"
+        print(f"{flag:10} {row['name']} {json.dumps(row['params'], sort_keys=True)} {row['metric']}: "
+              f"{row['baseline']} -> {row['current']} ({row['change']:+.1%})", file=sys.stderr)
+    print(f"{len(regressions)} regresiones en {len(rows)} métricas comparadas", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def add_output_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--output", "-o", help="Archivo JSON de resultados (por defecto stdout)")
+    parser.add_argument("--compare", dest="baseline", help="Resultados previos con los que comparar")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Empeoramiento relativo tolerado antes de marcar regresión")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara dos corridas de benchmarks")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args()
+    with open(args.baseline, encoding="utf-8") as f_base, open(args.current, encoding="utf-8") as f_new:
+        sys.exit(report(compare(json.load(f_base), json.load(f_new), args.threshold)))
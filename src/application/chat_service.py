@@ -1,62 +1,95 @@
-from ..domain.repositories import IProductRepository, IChatRepository
+from ..domain.repositories import IProductRepository, IChatRepository, IChatSummaryRepository, IUnitOfWork
 from ..domain.entities import ChatMessage, ChatContext
-from ..domain.exceptions import ChatServiceError
+from ..domain.llm_provider import ILLMProvider
+from ..domain.exceptions import ChatServiceError, LLMOverloadedError
 from .dtos import ChatMessageRequestDTO, ChatMessageResponseDTO, ChatHistoryDTO
+from .context_builder import ConversationSummarizer, build_chat_context, CHAT_CONTEXT_WINDOW
+import inspect
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List, Optional
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+async def _resolve(result):
+    """Permite usar repositorios síncronos o asíncronos con el mismo código."""
+    return await result if inspect.isawaitable(result) else result
+
+
+class _RepositoriesUnitOfWork(IUnitOfWork):
+    """Unidad de trabajo trivial sobre repositorios ya construidos."""
+
+    def __init__(self, products, chats, summaries):
+        self.products = products
+        self.chats = chats
+        self.summaries = summaries
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return None
+
 
 class ChatService:
     """
     Servicio de chat con IA para procesamiento de mensajes y gestión de historial.
+
+    Con `unit_of_work_factory` cada turno usa dos unidades de trabajo cortas
+    (lectura y escritura) y ninguna sesión de BD queda abierta mientras se
+    espera al LLM. Sin ella se usan los repositorios recibidos directamente.
+
+    Con `timing_observer` cada turno informa la duración en segundos de sus
+    etapas: products, context, prompt, llm (y llm_first_token en streaming),
+    persist y total.
     """
 
-    def __init__(self, product_repository: IProductRepository, chat_repository: IChatRepository, ai_service):
+    def __init__(self, product_repository: Optional[IProductRepository], chat_repository: Optional[IChatRepository],
+                 ai_service: ILLMProvider, product_retriever=None,
+                 summary_repository: Optional[IChatSummaryRepository] = None,
+                 summarizer: Optional[ConversationSummarizer] = None,
+                 unit_of_work_factory: Optional[Callable[[], IUnitOfWork]] = None,
+                 catalog_version: Optional[Callable[[], int]] = None,
+                 timing_observer: Optional[Callable[[Dict[str, float]], None]] = None):
         self.product_repository = product_repository
         self.chat_repository = chat_repository
         self.ai_service = ai_service
+        # Opcional: selecciona solo los productos relevantes (p. ej. BM25ProductIndex)
+        self.product_retriever = product_retriever
+        # Opcional: persiste el resumen de los turnos que salen del contexto
+        self.summary_repository = summary_repository
+        self.summarizer = summarizer or ConversationSummarizer()
+        self.unit_of_work_factory = unit_of_work_factory
+        # Opcional: versión del catálogo en memoria, para reutilizar el bloque de productos del prompt
+        self.catalog_version = catalog_version
+        self.timing_observer = timing_observer
+
+    def _unit_of_work(self) -> IUnitOfWork:
+        if self.unit_of_work_factory is not None:
+            return self.unit_of_work_factory()
+        return _RepositoriesUnitOfWork(self.product_repository, self.chat_repository, self.summary_repository)
 
     async def process_message(self, request: ChatMessageRequestDTO) -> ChatMessageResponseDTO:
         """
         Procesa el mensaje del usuario, llama a la IA y guarda historial.
         """
+        timings = {}
+        started = time.perf_counter()
         try:
-            # 1. Obtener todos los productos
-            products = self.product_repository.get_all()
+            turn = await self._prepare_turn(request, timings)
 
-            # 2. Obtener historial reciente (últimos 6 mensajes)
-            recent_messages = self.chat_repository.get_recent_messages(request.session_id, 6)
+            # 4. Llamar a la IA (sin ninguna sesión de BD abierta)
+            with _stage(timings, "llm"):
+                ai_reply = await self.ai_service.generate_response(
+                    user_message=request.message,
+                    products=turn.products,
+                    context=turn.context,
+                    catalog_version=turn.catalog_version
+                )
 
-            # 3. Crear ChatContext
-            chat_context = ChatContext(messages=recent_messages)
+            with _stage(timings, "persist"):
+                saved_user_msg, saved_assistant_msg = await self._save_turn(request, ai_reply, turn)
 
-            # 4. Llamar a la IA (simulado aquí con await ai_service.generate_response)
-            ai_reply = await self.ai_service.generate_response(
-                user_message=request.message,
-                products=products,
-                context=chat_context
-            )
-
-            # 5. Guardar mensaje del usuario
-            user_msg = ChatMessage(
-                id=None,
-                session_id=request.session_id,
-                role='user',
-                message=request.message,
-                timestamp=datetime.utcnow()
-            )
-            saved_user_msg = self.chat_repository.save_message(user_msg)
-
-            # 6. Guardar respuesta de asistente
-            assistant_msg = ChatMessage(
-                id=None,
-                session_id=request.session_id,
-                role='assistant',
-                message=ai_reply,
-                timestamp=datetime.utcnow()
-            )
-            saved_assistant_msg = self.chat_repository.save_message(assistant_msg)
-
-            # 7. Retornar DTO de respuesta
+            # 6. Retornar DTO de respuesta
             return ChatMessageResponseDTO(
                 session_id=request.session_id,
                 user_message=saved_user_msg.message,
@@ -64,26 +97,150 @@ class ChatService:
                 timestamp=saved_assistant_msg.timestamp
             )
 
+        except LLMOverloadedError:
+            # Se propaga tal cual para que la API responda 429
+            raise
+        except Exception as e:
+            raise ChatServiceError(f"Error al procesar el mensaje: {str(e)}")
+        finally:
+            self._report(timings, started)
+
+    async def stream_message(self, request: ChatMessageRequestDTO) -> AsyncIterator[dict]:
+        """
+        Igual que process_message, pero entrega la respuesta a medida que se genera:
+        {"type": "token", "text"} por fragmento y al final {"type": "done", ...}
+        cuando el mensaje completo ya está guardado.
+        """
+        timings = {}
+        started = time.perf_counter()
+        try:
+            turn = await self._prepare_turn(request, timings)
+            parts = []
+            with _stage(timings, "llm"):
+                async for chunk in self.ai_service.stream_response(
+                    user_message=request.message,
+                    products=turn.products,
+                    context=turn.context,
+                    catalog_version=turn.catalog_version
+                ):
+                    if not parts:
+                        timings["llm_first_token"] = time.perf_counter() - started
+                    parts.append(chunk)
+                    yield {"type": "token", "text": chunk}
+            with _stage(timings, "persist"):
+                _, saved_assistant_msg = await self._save_turn(request, "".join(parts), turn)
+        except LLMOverloadedError:
+            raise
         except Exception as e:
             raise ChatServiceError(f"Error al procesar el mensaje: {str(e)}")
+        finally:
+            self._report(timings, started)
+        yield {
+            "type": "done",
+            "session_id": request.session_id,
+            "assistant_message": saved_assistant_msg.message,
+            "timestamp": saved_assistant_msg.timestamp.isoformat(),
+        }
+
+    async def _prepare_turn(self, request: ChatMessageRequestDTO, timings: Dict[str, float]) -> "_ChatTurn":
+        # 1-2. Lectura: productos, historial reciente y resumen de los turnos anteriores
+        async with self._unit_of_work() as uow:
+            with _stage(timings, "products"):
+                products = await _resolve(uow.products.get_all())
+            with _stage(timings, "context"):
+                recent_messages = await _resolve(
+                    uow.chats.get_recent_messages(request.session_id, CHAT_CONTEXT_WINDOW)
+                )
+                previous_summary = (
+                    await _resolve(uow.summaries.get(request.session_id)) if uow.summaries else None
+                )
+        catalog_version = self.catalog_version() if self.catalog_version else None
+
+        with _stage(timings, "prompt"):
+            # 3. Crear ChatContext acotado; lo que no entra pasa al resumen
+            chat_context, summary = build_chat_context(
+                request.session_id, recent_messages, previous_summary, self.summarizer
+            )
+
+            # 3b. Limitar el prompt a los productos relevantes para la consulta
+            if self.product_retriever is not None:
+                products = self.product_retriever.select(
+                    products, request.message, chat_context.get_recent_messages()
+                )
+        return _ChatTurn(products, chat_context, previous_summary, summary, catalog_version)
+
+    async def _save_turn(self, request: ChatMessageRequestDTO, ai_reply: str, turn: "_ChatTurn"):
+        # 5. Escritura: mensaje del usuario y respuesta del asistente en una transacción
+        now = datetime.utcnow()
+        user_msg = ChatMessage(
+            id=None,
+            session_id=request.session_id,
+            role='user',
+            message=request.message,
+            timestamp=now
+        )
+        assistant_msg = ChatMessage(
+            id=None,
+            session_id=request.session_id,
+            role='assistant',
+            message=ai_reply,
+            timestamp=now
+        )
+        async with self._unit_of_work() as uow:
+            saved = await _resolve(uow.chats.save_messages([user_msg, assistant_msg]))
+            if uow.summaries and turn.summary is not turn.previous_summary:
+                await _resolve(uow.summaries.save(turn.summary))
+        return saved
+
+    def _report(self, timings: Dict[str, float], started: float) -> None:
+        if self.timing_observer is not None:
+            timings["total"] = time.perf_counter() - started
+            self.timing_observer(timings)
 
     def get_session_history(self, session_id: str, limit: Optional[int] = None) -> List[ChatHistoryDTO]:
         """
         Obtiene el historial de una sesión.
         """
         history = self.chat_repository.get_session_history(session_id, limit)
-        return [
-            ChatHistoryDTO(
-                id=msg.id,
-                role=msg.role,
-                message=msg.message,
-                timestamp=msg.timestamp
-            ) for msg in history
-        ]
+        return [ChatHistoryDTO.from_entity(msg) for msg in history]
 
     def clear_session_history(self, session_id: str) -> int:
         """
         Elimina todo el historial de una sesión.
         Retorna la cantidad de mensajes eliminados.
         """
-        return self.chat_repository.delete_session_history(session_id)
\ No newline at end of file
+        return self.chat_repository.delete_session_history(session_id)
+
+    async def get_session_history_async(self, session_id: str, limit: Optional[int] = None) -> List[ChatHistoryDTO]:
+        """Como get_session_history, pero a través de una unidad de trabajo."""
+        async with self._unit_of_work() as uow:
+            history = await _resolve(uow.chats.get_session_history(session_id, limit))
+        return [ChatHistoryDTO.from_entity(msg) for msg in history]
+
+    async def clear_session_history_async(self, session_id: str) -> int:
+        """Como clear_session_history, pero a través de una unidad de trabajo."""
+        async with self._unit_of_work() as uow:
+            return await _resolve(uow.chats.delete_session_history(session_id))
+
+
+@contextmanager
+def _stage(timings: Dict[str, float], name: str):
+    """Suma a `timings[name]` los segundos que tarda el bloque."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+
+class _ChatTurn:
+    """Datos leídos para un turno, entre la lectura y la escritura."""
+
+    __slots__ = ("products", "context", "previous_summary", "summary", "catalog_version")
+
+    def __init__(self, products, context: ChatContext, previous_summary, summary, catalog_version):
+        self.products = products
+        self.context = context
+        self.previous_summary = previous_summary
+        self.summary = summary
+        self.catalog_version = catalog_version
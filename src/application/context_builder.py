@@ -0,0 +1,70 @@
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from src.domain.entities import ChatContext, ChatMessage, ChatSummary
+
+# Mensajes que se leen del historial en cada turno
+CHAT_CONTEXT_WINDOW = int(os.getenv("CHAT_CONTEXT_WINDOW", "20"))
+# Mensajes y caracteres máximos que entran literales en el prompt
+CHAT_CONTEXT_MAX_MESSAGES = int(os.getenv("CHAT_CONTEXT_MAX_MESSAGES", "10"))
+CHAT_CONTEXT_MAX_CHARS = int(os.getenv("CHAT_CONTEXT_MAX_CHARS", "2000"))
+# Tamaño máximo del resumen de los turnos anteriores
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "800"))
+
+
+class ConversationSummarizer:
+    """
+    Resumen extractivo y local (sin llamar al LLM) de los turnos que salen
+    del contexto reciente. Cada mensaje se compacta a una línea corta y el
+    resumen se recorta por el inicio para no pasar de `max_chars`.
+    """
+
+    LINE_MAX_CHARS = 120
+
+    def __init__(self, max_chars: int = CHAT_SUMMARY_MAX_CHARS):
+        self.max_chars = max_chars
+
+    def update(self, previous: Optional[ChatSummary], session_id: str,
+               messages: List[ChatMessage]) -> Optional[ChatSummary]:
+        """
+        Incorpora al resumen los mensajes posteriores a previous.last_message_id.
+        Retorna el mismo objeto `previous` si no hay nada nuevo que agregar.
+        """
+        last_id = previous.last_message_id if previous else 0
+        new_messages = [m for m in messages if m.id is not None and m.id > last_id]
+        if not new_messages:
+            return previous
+        parts = [previous.summary] if previous else []
+        parts.extend(self._compact(m) for m in new_messages)
+        text = " | ".join(parts)
+        if len(text) > self.max_chars:
+            text = "…" + text[-(self.max_chars - 1):]
+        return ChatSummary(
+            session_id=session_id,
+            summary=text,
+            last_message_id=max(m.id for m in new_messages),
+            updated_at=datetime.utcnow(),
+        )
+
+    def _compact(self, message: ChatMessage) -> str:
+        rol = "Usuario" if message.is_from_user() else "Asistente"
+        text = " ".join(message.message.split())
+        if len(text) > self.LINE_MAX_CHARS:
+            text = text[:self.LINE_MAX_CHARS - 1] + "…"
+        return f"{rol}: {text}"
+
+
+def build_chat_context(session_id: str, messages: List[ChatMessage], previous: Optional[ChatSummary],
+                       summarizer: ConversationSummarizer,
+                       max_messages: int = CHAT_CONTEXT_MAX_MESSAGES,
+                       max_chars: int = CHAT_CONTEXT_MAX_CHARS) -> Tuple[ChatContext, Optional[ChatSummary]]:
+    """
+    Arma un ChatContext acotado: los mensajes que no entran en el presupuesto
+    se incorporan al resumen. Retorna el contexto y el resumen actualizado
+    (el mismo `previous` si no cambió, para no volver a guardarlo).
+    """
+    context = ChatContext(messages=messages, max_messages=max_messages, max_chars=max_chars)
+    summary = summarizer.update(previous, session_id, context.get_older_messages())
+    context.summary = summary.summary if summary else None
+    return context, summary
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, validator
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class ProductDTO(BaseModel):
@@ -12,6 +12,8 @@ class ProductDTO(BaseModel):
     price: float
     stock: int
     description: str
+    # Versión leída; en las actualizaciones, la que se espera encontrar
+    version: Optional[int] = None
 
     @validator('price')
     def price_must_be_positive(cls, v):
@@ -28,6 +30,29 @@ class ProductDTO(BaseModel):
     class Config:
         orm_mode = True  # CLAVE para FastAPI+SQLAlchemy
 
+class ProductPatchDTO(BaseModel):
+    """Cambios parciales de un producto: solo se escriben los campos enviados"""
+    name: Optional[str] = None
+    brand: Optional[str] = None
+    category: Optional[str] = None
+    size: Optional[str] = None
+    color: Optional[str] = None
+    price: Optional[float] = None
+    stock: Optional[int] = None
+    description: Optional[str] = None
+    # Si se envía, el cambio solo se aplica si el producto sigue en esta versión
+    version: Optional[int] = None
+
+    @validator('name', 'brand', 'category', 'size', 'color', 'price', 'stock', 'description')
+    def field_not_null(cls, v):
+        """Los campos de Product no admiten nulos: se omiten para no cambiarlos"""
+        if v is None:
+            raise ValueError("El campo no puede ser nulo.")
+        return v
+
+    def changes(self) -> dict:
+        return self.model_dump(exclude_unset=True, exclude={"version"})
+
 class ChatMessageRequestDTO(BaseModel):
     """DTO para recibir mensajes del usuario"""
     session_id: str
@@ -86,4 +111,51 @@ class ChatHistoryDTO(BaseModel):
             role=getattr(entity, "role", getattr(entity, "sender", "")),
             message=entity.message,
             timestamp=entity.timestamp,
-        )
\ No newline at end of file
+        )
+
+
+class ProductImportErrorDTO(BaseModel):
+    """Fila rechazada en una importación masiva"""
+    line: int
+    error: str
+
+
+class ProductImportReportDTO(BaseModel):
+    """Resultado de una importación masiva de productos"""
+    imported: int = 0
+    failed: int = 0
+    errors: List[ProductImportErrorDTO] = []
+    # True si hubo más errores de los que se listan
+    errors_truncated: bool = False
+
+
+class StockReservationDTO(BaseModel):
+    """Unidades a reservar de un producto"""
+    product_id: Optional[int] = None
+    quantity: int
+
+    @validator('quantity')
+    def quantity_must_be_positive(cls, v):
+        if v <= 0:
+            raise ValueError("La cantidad debe ser mayor a 0.")
+        return v
+
+
+class BulkStockReservationDTO(BaseModel):
+    """Reserva de varios productos: se reservan todos o ninguno"""
+    items: List[StockReservationDTO]
+
+    @validator('items')
+    def items_must_have_product(cls, v):
+        if not v:
+            raise ValueError("La reserva debe incluir al menos un producto.")
+        if any(item.product_id is None for item in v):
+            raise ValueError("Cada ítem debe indicar product_id.")
+        return v
+
+
+class StockReservationResultDTO(BaseModel):
+    """Reserva confirmada y stock restante del producto"""
+    product_id: int
+    quantity: int
+    stock: int
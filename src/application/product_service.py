@@ -1,8 +1,19 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Tuple
 from src.domain.entities import Product
 from src.domain.repositories import IProductRepository
 from src.domain.exceptions import ProductNotFoundError, InvalidProductDataError
-from src.application.dtos import ProductDTO
+from src.application.dtos import (
+    ProductDTO, ProductImportReportDTO, ProductImportErrorDTO, StockReservationDTO, StockReservationResultDTO,
+)
+
+# Filas por transacción en las importaciones masivas
+IMPORT_BATCH_SIZE = 5000
+# Errores que se detallan en el reporte; del resto solo se cuentan
+IMPORT_MAX_ERRORS = 100
+PRODUCT_TEXT_FIELDS = ("name", "brand", "category", "size", "color", "description")
+REQUIRED_FIELDS = ("name", "brand", "category", "price", "stock")
+# Columnas que Product y ProductDTO no admiten nulas
+NON_NULL_FIELDS = PRODUCT_TEXT_FIELDS + ("price", "stock")
 
 class ProductService:
     """
@@ -23,25 +34,15 @@ class ProductService:
             raise ProductNotFoundError(product_id)
         return product
 
-    def search_products(self, filters: Dict[str, Any]) -> List[Product]:
+    def search_products(self, filters: Dict[str, Any], limit: Optional[int] = None,
+                        offset: int = 0, after_id: Optional[int] = None) -> List[Product]:
         """
         Filtra productos por criterios.
-        filters: dict con posibles claves: 'brand', 'category', 'name', etc.
+        filters: dict con posibles claves: 'brand', 'category', 'name', 'size',
+        'color', 'min_price', 'max_price', 'in_stock'.
+        El filtrado y la paginación se resuelven en el repositorio (SQL).
         """
-        products = self.product_repository.get_all()
-        for key, value in filters.items():
-            if key == "brand":
-                products = [p for p in products if p.brand.lower() == value.lower()]
-            elif key == "category":
-                products = [p for p in products if p.category.lower() == value.lower()]
-            elif key == "name":
-                products = [p for p in products if value.lower() in p.name.lower()]
-            elif key == "size":
-                products = [p for p in products if value.lower() in p.size.lower()]
-            elif key == "color":
-                products = [p for p in products if value.lower() in p.color.lower()]
-            # Puedes agregar más filtros aquí si es necesario
-        return products
+        return self.product_repository.search(filters, limit=limit, offset=offset, after_id=after_id)
 
     def create_product(self, product_dto: ProductDTO) -> Product:
         """Crea un nuevo producto a partir del DTO"""
@@ -62,24 +63,129 @@ class ProductService:
         return self.product_repository.save(product)
 
     def update_product(self, product_id: int, product_dto: ProductDTO) -> Product:
-        """Actualiza producto existente, lanza excepción si no existe"""
-        product = self.product_repository.get_by_id(product_id)
-        if not product:
-            raise ProductNotFoundError(product_id)
-        # Actualizar campos
-        product.name = product_dto.name
-        product.brand = product_dto.brand
-        product.category = product_dto.category
-        product.size = product_dto.size
-        product.color = product_dto.color
-        product.price = product_dto.price
-        product.stock = product_dto.stock
-        product.description = product_dto.description
+        """
+        Reemplaza todos los campos del producto, lanza excepción si no existe.
+        Si el DTO trae `version`, solo se aplica sobre esa versión.
+        """
+        changes = product_dto.model_dump(exclude={"id", "version"})
+        return self.patch_product(product_id, changes, expected_version=product_dto.version)
+
+    def patch_product(self, product_id: int, changes: Dict[str, Any],
+                      expected_version: Optional[int] = None) -> Product:
+        """
+        Actualiza solo los campos de `changes` con un único UPDATE en el
+        repositorio, sin leer antes el producto. Lanza ProductNotFoundError,
+        InvalidProductDataError o ProductVersionConflictError.
+        """
+        null_fields = [f for f in NON_NULL_FIELDS if f in changes and changes[f] is None]
+        if null_fields:
+            raise InvalidProductDataError(f"Los campos {', '.join(null_fields)} no pueden ser nulos.")
         try:
-            product.__post_init__()  # Validar nuevos datos
+            Product.validate_changes(changes)
         except ValueError as e:
             raise InvalidProductDataError(str(e))
-        return self.product_repository.save(product)
+        if not changes and expected_version is None:
+            return self.get_product_by_id(product_id)
+        product = self.product_repository.update_fields(product_id, changes, expected_version)
+        if product is None:
+            raise ProductNotFoundError(product_id)
+        return product
+
+    def reserve_stock(self, product_id: int, quantity: int) -> StockReservationResultDTO:
+        """
+        Reserva `quantity` unidades de forma atómica en la BD (sin leer y
+        reescribir el producto). Lanza ProductNotFoundError o
+        InsufficientStockError si no se puede reservar.
+        """
+        if quantity <= 0:
+            raise InvalidProductDataError("La cantidad a reservar debe ser mayor a 0.")
+        product = self.product_repository.reserve_stock(product_id, quantity)
+        return StockReservationResultDTO(product_id=product_id, quantity=quantity, stock=product.stock)
+
+    def release_stock(self, product_id: int, quantity: int) -> StockReservationResultDTO:
+        """Devuelve al stock unidades de una reserva cancelada."""
+        if quantity <= 0:
+            raise InvalidProductDataError("La cantidad a liberar debe ser mayor a 0.")
+        product = self.product_repository.release_stock(product_id, quantity)
+        return StockReservationResultDTO(product_id=product_id, quantity=quantity, stock=product.stock)
+
+    def bulk_reserve(self, items: Iterable[StockReservationDTO]) -> List[StockReservationResultDTO]:
+        """
+        Reserva varios productos en una sola transacción: si alguno no
+        alcanza, no se reserva ninguno. Las cantidades de un mismo producto
+        se suman.
+        """
+        quantities: Dict[int, int] = {}
+        for item in items:
+            if item.quantity <= 0:
+                raise InvalidProductDataError("La cantidad a reservar debe ser mayor a 0.")
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        if not quantities:
+            return []
+        reserved = self.product_repository.bulk_reserve(quantities)
+        return [
+            StockReservationResultDTO(product_id=product_id, quantity=quantity, stock=reserved[product_id].stock)
+            for product_id, quantity in sorted(quantities.items())
+        ]
+
+    def import_products(self, rows: Iterable[Tuple[int, Any]], batch_size: int = IMPORT_BATCH_SIZE,
+                        max_errors: int = IMPORT_MAX_ERRORS) -> ProductImportReportDTO:
+        """
+        Importa productos por lotes desde `rows`: pares (línea, fila) donde
+        la fila es un dict con los campos de Product o la excepción con la que
+        falló su lectura. Cada fila se valida con las reglas de Product y las
+        válidas se guardan con bulk_upsert en lotes de `batch_size`. Si un lote
+        falla en la BD, todas sus filas se reportan como fallidas.
+        La memoria usada no depende de la cantidad de filas.
+        """
+        report = ProductImportReportDTO()
+        batch: List[Tuple[int, Product]] = []
+
+        def fail(line: int, error: str) -> None:
+            report.failed += 1
+            if len(report.errors) < max_errors:
+                report.errors.append(ProductImportErrorDTO(line=line, error=error))
+            else:
+                report.errors_truncated = True
+
+        def flush() -> None:
+            try:
+                report.imported += self.product_repository.bulk_upsert([p for _, p in batch])
+            except Exception as e:
+                for line, _ in batch:
+                    fail(line, f"Error al guardar el lote: {e}")
+            batch.clear()
+
+        for line, row in rows:
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append((line, self._row_to_product(row)))
+            except (ValueError, TypeError, KeyError) as e:
+                fail(line, str(e))
+                continue
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return report
+
+    @staticmethod
+    def _row_to_product(row: Dict[str, Any]) -> Product:
+        """Convierte una fila de texto o JSON en Product, validando tipos y reglas."""
+        if not isinstance(row, dict):
+            raise ValueError("La fila debe ser un objeto con los campos del producto.")
+        missing = [f for f in REQUIRED_FIELDS if row.get(f) in (None, "")]
+        if missing:
+            raise ValueError(f"Faltan campos obligatorios: {', '.join(missing)}")
+        try:
+            price = float(row["price"])
+            stock = int(row["stock"])
+            product_id = int(row["id"]) if row.get("id") not in (None, "") else None
+        except (TypeError, ValueError):
+            raise ValueError("id, price y stock deben ser numéricos (stock e id enteros).")
+        texts = {f: ("" if row.get(f) is None else str(row[f]).strip()) for f in PRODUCT_TEXT_FIELDS}
+        return Product(id=product_id, price=price, stock=stock, **texts)
 
     def delete_product(self, product_id: int) -> bool:
         """Elimina producto, lanza excepción si no existe"""
@@ -1,10 +1,10 @@
 from dataclasses import dataclass
-from typing import Optional
+from typing import Any, Dict, Optional
 from datetime import datetime
 
 #TODO: Implementar las entidades Product, ChatMessage y ChatContext
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     """
     Entidad que representa un producto en el e-commerce.
@@ -19,6 +19,8 @@ class Product:
     price: float
     stock: int
     description: str
+    # Versión de la fila para actualizaciones con bloqueo optimista
+    version: int = 1
 
     def __post_init__(self):
         """
@@ -29,13 +31,32 @@ class Product:
         - name no puede estar vacío
         Lanza ValueError si alguna validación falla
         """
-        if self.price <= 0:
+        self.validate_changes({"price": self.price, "stock": self.stock, "name": self.name})
+
+    @staticmethod
+    def validate_changes(changes: Dict[str, Any]) -> None:
+        """
+        Aplica las mismas reglas a una actualización parcial (solo los campos
+        presentes), sin necesidad de cargar el producto.
+        """
+        if "price" in changes and changes["price"] <= 0:
             raise ValueError("El precio debe ser mayor a 0.")
-        if self.stock < 0:
+        if "stock" in changes and changes["stock"] < 0:
             raise ValueError("El stock no puede ser negativo.")
-        if not self.name or self.name.strip() == "":
+        if "name" in changes and (not changes["name"] or changes["name"].strip() == ""):
             raise ValueError("El nombre no puede estar vacío.")
 
+    @classmethod
+    def from_row(cls, row) -> "Product":
+        """
+        Construye un producto desde una fila de la BD ya validada al
+        escribirse (mismo orden que los campos), sin repetir __post_init__.
+        """
+        product = cls.__new__(cls)
+        (product.id, product.name, product.brand, product.category, product.size,
+         product.color, product.price, product.stock, product.description, product.version) = row
+        return product
+
 
 
     def is_available(self) -> bool:
@@ -71,7 +92,7 @@ class Product:
         self.stock += quantity
 
 
-@dataclass
+@dataclass(slots=True)
 class ChatMessage:
     """
     Entidad que representa un mensaje en el chat.
@@ -98,6 +119,13 @@ class ChatMessage:
         if not self.session_id or self.session_id.strip() == "":
             raise ValueError("El session_id no puede estar vacío.")
 
+    @classmethod
+    def from_row(cls, row) -> "ChatMessage":
+        """Construye un mensaje desde una fila de la BD, sin repetir las validaciones."""
+        message = cls.__new__(cls)
+        message.id, message.session_id, message.role, message.message, message.timestamp = row
+        return message
+
 
     def is_from_user(self) -> bool:
         """
@@ -114,21 +142,51 @@ class ChatMessage:
         return self.role == 'assistant'
         
 
+@dataclass
+class ChatSummary:
+    """
+    Resumen acumulado de los turnos de una sesión que ya no entran en el
+    contexto reciente. `last_message_id` es el último mensaje incorporado.
+    """
+    session_id: str
+    summary: str
+    last_message_id: int
+    updated_at: datetime
+
+
 @dataclass
 class ChatContext:
     """
     Value Object que encapsula el contexto de una conversación.
     Mantiene los mensajes recientes para dar coherencia al chat.
+    Si max_chars está definido, los mensajes más antiguos se descartan hasta
+    que el texto entre en ese presupuesto (siempre se conserva el último).
     """
     messages: list[ChatMessage]
     max_messages: int = 6
+    max_chars: Optional[int] = None
+    summary: Optional[str] = None
 
     def get_recent_messages(self) -> list[ChatMessage]:
         """
         TODO: Retorna los últimos N mensajes (max_messages)
         Pista: Usa slicing de Python messages[-self.max_messages:]
         """
-        return self.messages[-self.max_messages:]
+        recent = self.messages[-self.max_messages:]
+        if self.max_chars is None:
+            return recent
+        total = 0
+        start = len(recent)
+        for i in range(len(recent) - 1, -1, -1):
+            total += len(recent[i].message)
+            if total > self.max_chars and start < len(recent):
+                break
+            start = i
+        return recent[start:]
+
+    def get_older_messages(self) -> list[ChatMessage]:
+        """Mensajes que quedaron fuera del contexto reciente (candidatos a resumir)."""
+        return self.messages[:len(self.messages) - len(self.get_recent_messages())]
 
     def format_for_prompt(self) -> str:
         """
@@ -146,9 +204,9 @@ class ChatContext:
             'assistant': 'Asistente'
         }
         formatted = []
+        if self.summary:
+            formatted.append(f"Resumen de la conversación anterior: {self.summary}")
         for msg in self.get_recent_messages():
             rol = role_map.get(msg.role, msg.role.capitalize())
             formatted.append(f"{rol}: {msg.message}")
         return "\n".join(formatted)
-        
-    
\ No newline at end of file
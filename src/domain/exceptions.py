@@ -17,10 +17,43 @@ class InvalidProductDataError(Exception):
         self.message = message
         super().__init__(self.message)
 
+class InsufficientStockError(Exception):
+    """
+    Se lanza cuando no hay stock suficiente para una reserva.
+    """
+    def __init__(self, product_id: int, requested: int, available: int = None):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        self.message = f"Stock insuficiente para el producto {product_id}: se pidieron {requested}"
+        if available is not None:
+            self.message += f", hay {available}"
+        super().__init__(self.message)
+
+class ProductVersionConflictError(Exception):
+    """
+    Se lanza cuando un producto cambió desde que el cliente lo leyó.
+    """
+    def __init__(self, product_id: int, expected_version: int, current_version: int = None):
+        self.product_id = product_id
+        self.expected_version = expected_version
+        self.current_version = current_version
+        self.message = (f"El producto {product_id} fue modificado: se esperaba la versión "
+                        f"{expected_version}, la actual es {current_version}")
+        super().__init__(self.message)
+
 class ChatServiceError(Exception):
     """
     Se lanza cuando hay un error en el servicio de chat.
     """
     def __init__(self, message: str = "Error en el servicio de chat"):
         self.message = message
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class LLMOverloadedError(Exception):
+    """
+    Se lanza cuando el servicio de IA no admite más peticiones en espera.
+    """
+    def __init__(self, message: str = "El servicio de IA está saturado, intenta nuevamente en unos segundos"):
+        self.message = message
+        super().__init__(self.message)
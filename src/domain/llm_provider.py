@@ -0,0 +1,38 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, List, Optional
+
+from .entities import Product
+
+
+class ILLMProvider(ABC):
+    """
+    Interface que define el contrato de un proveedor de IA para el chat.
+    Las implementaciones concretas (Gemini, simulado, etc.) están en la capa
+    de infraestructura.
+
+    `context` es un ChatContext o una lista de mensajes previos
+    [{'role': 'user'/'assistant', 'message': str}]. Ante un fallo del
+    proveedor las implementaciones retornan un mensaje de disculpa en lugar
+    de lanzar una excepción.
+    """
+
+    @abstractmethod
+    async def generate_response(self, user_message: str, products: List[Product], context,
+                                catalog_version: Optional[int] = None) -> str:
+        """Genera la respuesta completa al mensaje del usuario."""
+        pass
+
+    @abstractmethod
+    def stream_response(self, user_message: str, products: List[Product], context,
+                        catalog_version: Optional[int] = None) -> AsyncIterator[str]:
+        """Generador asíncrono con los fragmentos de la respuesta a medida que se producen."""
+        pass
+
+    def generate_response_sync(self, user_message: str, products: List[Product], context,
+                               catalog_version: Optional[int] = None) -> str:
+        """
+        Versión síncrona de generate_response para scripts y workers sin event loop.
+        No debe llamarse desde código que ya corre dentro de un event loop.
+        """
+        return asyncio.run(self.generate_response(user_message, products, context, catalog_version))
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
-from .entities import Product, ChatMessage
+from typing import Any, Dict, List, Optional
+from .entities import Product, ChatMessage, ChatSummary
 
 
 # TODO: Implementar las interfaces IProductRepository e IChatRepository
@@ -38,6 +38,18 @@ class IProductRepository(ABC):
         """Obtiene productos de una categoría específica."""
         pass
 
+    @abstractmethod
+    def search(self, filters: Dict[str, Any], limit: Optional[int] = None,
+               offset: int = 0, after_id: Optional[int] = None) -> List[Product]:
+        """
+        Busca productos aplicando los filtros en la fuente de datos.
+        Claves soportadas: 'brand', 'category' (coincidencia exacta),
+        'name', 'size', 'color' (contiene), 'min_price', 'max_price'
+        e 'in_stock'. Sin distinguir mayúsculas; ordenado por ID.
+        Pagina con limit/offset o, mejor, con after_id (último ID visto).
+        """
+        pass
+
     @abstractmethod
     def save(self, product: Product) -> Product:
         """
@@ -70,6 +82,15 @@ class IChatRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def save_messages(self, messages: List[ChatMessage]) -> List[ChatMessage]:
+        """
+        Guarda varios mensajes en una sola transacción (p. ej. el par
+        usuario/asistente de un turno). Retorna los mensajes con su ID,
+        en el mismo orden recibido.
+        """
+        pass
+
     @abstractmethod
     def get_session_history(self, session_id: str, limit: Optional[int] = None) -> List[ChatMessage]:
         """
@@ -93,4 +114,45 @@ class IChatRepository(ABC):
         Obtiene los últimos N mensajes de una sesión.
         Crucial para mantener el contexto conversacional.
         Retorna en orden cronológico.
-        """   
\ No newline at end of file
+        """
+        pass
+
+
+class IChatSummaryRepository(ABC):
+    """
+    Interface para el resumen acumulado de cada sesión de chat.
+    """
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[ChatSummary]:
+        """Retorna el resumen de la sesión o None si aún no tiene."""
+        pass
+
+    @abstractmethod
+    def save(self, summary: ChatSummary) -> ChatSummary:
+        """Crea o reemplaza el resumen de la sesión."""
+        pass
+
+
+class IUnitOfWork(ABC):
+    """
+    Unidad de trabajo corta sobre la base de datos.
+
+    Se usa con `async with`: al entrar abre una sesión y expone los
+    repositorios ligados a ella; al salir la cierra y devuelve la conexión
+    al pool. Está pensada para envolver solo lecturas o solo escrituras,
+    nunca una llamada lenta como la del LLM. Según la implementación, los
+    métodos de los repositorios pueden ser síncronos o corrutinas.
+    """
+
+    products: IProductRepository
+    chats: IChatRepository
+    summaries: Optional[IChatSummaryRepository]
+
+    @abstractmethod
+    async def __aenter__(self) -> "IUnitOfWork":
+        pass
+
+    @abstractmethod
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pass
@@ -0,0 +1,187 @@
+import logging
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from src.application.chat_service import ChatService
+from src.application.context_builder import ConversationSummarizer
+from src.application.product_service import ProductService
+from src.domain.llm_provider import ILLMProvider
+from src.infrastructure.db.database import SessionLocal, AsyncSessionLocal
+from src.infrastructure.llm_providers.factory import create_llm_provider
+from src.infrastructure.llm_providers.request_coalescing import (
+    LLMConcurrencyLimiter, SingleFlight, CoalescingLLMService,
+)
+from src.infrastructure.llm_providers.resilience import CircuitBreaker
+from src.infrastructure.observability.metrics import MetricsRegistry, install_query_counter
+from src.infrastructure.observability.structured_log import StructuredLogger, LOG_SLOW_REQUEST_MS
+from src.infrastructure.llm_providers.response_cache import ChatResponseCache, CachedLLMService
+from src.infrastructure.repositorie.cached_chat_repository import SessionContextCache
+from src.infrastructure.repositorie.cached_product_repository import ProductCatalogCache, CachedProductRepository
+from src.infrastructure.repositorie.chat_write_queue import ChatWriteBehindQueue, CHAT_WRITE_BEHIND
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+from src.infrastructure.repositorie.unit_of_work import AsyncSQLUnitOfWork
+from src.infrastructure.search.product_index import BM25ProductIndex
+
+
+class AppContainer:
+    """
+    Objetos de la aplicación que viven lo mismo que el proceso: cachés,
+    índice de búsqueda, proveedor de IA con sus límites y los servicios.
+    Se crea una vez en el lifespan de FastAPI y las dependencias lo leen
+    de `app.state.container`.
+
+    Sin `llm_provider` se crea el indicado por LLM_PROVIDER; si no está
+    configurado (p. ej. falta GEMINI_API_KEY) `llm_service` queda en None
+    y los endpoints de chat responden 503.
+    """
+
+    def __init__(self, session_factory=SessionLocal, async_session_factory=AsyncSessionLocal,
+                 llm_provider: Optional[ILLMProvider] = None, write_behind: bool = CHAT_WRITE_BEHIND):
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+        self.log = StructuredLogger("src.chat")
+
+        # Caché del catálogo compartida por todas las peticiones del proceso
+        self.product_cache = ProductCatalogCache()
+        # Índice de búsqueda para enviar al LLM solo los productos relevantes
+        self.product_index = BM25ProductIndex()
+        self.product_cache.add_listener(self.product_index)
+        # Respuestas del LLM a preguntas repetidas; se invalidan al cambiar precio o stock
+        self.response_cache = ChatResponseCache()
+        self.product_cache.add_listener(self.response_cache)
+        # Últimos mensajes de las sesiones activas, para armar el contexto sin leer la BD
+        self.chat_cache = SessionContextCache()
+        self.summarizer = ConversationSummarizer()
+        # Opcional: agrupa en un commit los mensajes de turnos concurrentes
+        self.write_queue = ChatWriteBehindQueue(async_session_factory) if write_behind else None
+
+        # Límite de llamadas simultáneas al LLM, agrupación de prompts idénticos y circuit breaker
+        self.llm_limiter = LLMConcurrencyLimiter()
+        self.llm_single_flight = SingleFlight()
+        self.llm_breaker = CircuitBreaker()
+        self.llm_provider: Optional[ILLMProvider] = None
+        self.llm_service = self._create_llm_service(llm_provider)
+
+        self.metrics = MetricsRegistry()
+        self._install_metrics()
+
+        # Sin proveedor de IA el servicio sigue atendiendo el historial
+        self.chat_service = ChatService(
+            None, None, self.llm_service,
+            product_retriever=self.product_index,
+            summarizer=self.summarizer,
+            unit_of_work_factory=self.chat_unit_of_work,
+            catalog_version=lambda: self.product_cache.version,
+            timing_observer=self.observe_chat_turn,
+        )
+
+    def chat_unit_of_work(self) -> AsyncSQLUnitOfWork:
+        # Sesión corta por etapa: ninguna conexión queda tomada mientras se espera al LLM
+        return AsyncSQLUnitOfWork(self.async_session_factory, self.product_cache, self.chat_cache,
+                                  self.write_queue)
+
+    def product_service(self, db: Session) -> ProductService:
+        """ProductService sobre la sesión de la petición, con lecturas desde la caché del catálogo."""
+        return ProductService(CachedProductRepository(SQLProductRepository(db), self.product_cache))
+
+    def health(self) -> dict:
+        return dict(self.llm_limiter.stats(), coalesced=self.llm_single_flight.coalesced,
+                    breaker=self.llm_breaker.stats())
+
+    def observe_chat_turn(self, timings: Dict[str, float]) -> None:
+        """Etapas de un turno de chat: al histograma, y al log si fue lento."""
+        for stage, seconds in timings.items():
+            self.chat_stage_seconds.observe(seconds, stage=stage)
+        fields = {f"{stage}_ms": round(seconds * 1000, 1) for stage, seconds in timings.items()}
+        if timings.get("total", 0) * 1000 >= LOG_SLOW_REQUEST_MS:
+            self.log.event(logging.WARNING, "chat.slow_turn", **fields)
+        else:
+            self.log.sampled(logging.INFO, "chat.turn", **fields)
+
+    async def close(self) -> None:
+        if self.write_queue is not None:
+            await self.write_queue.close()
+        for uninstall in self._query_counters:
+            uninstall()
+        self._query_counters = []
+
+    def _install_metrics(self) -> None:
+        metrics = self.metrics
+        self.http_request_seconds = metrics.histogram(
+            "http_request_duration_seconds", "Duración de las peticiones HTTP", ("method", "route", "status"))
+        self.chat_stage_seconds = metrics.histogram(
+            "chat_stage_duration_seconds", "Duración de cada etapa de un turno de chat", ("stage",))
+
+        db_queries = metrics.counter("db_queries_total", "Sentencias SQL ejecutadas", ("engine",))
+        self._query_counters = []
+        for name, factory in (("sync", self.session_factory), ("async", self.async_session_factory)):
+            engine = getattr(factory, "kw", {}).get("bind")
+            if engine is not None:
+                engine = getattr(engine, "sync_engine", engine)
+                self._query_counters.append(install_query_counter(engine, db_queries, {"engine": name}))
+
+        catalog, sessions, responses = self.product_cache, self.chat_cache, self.response_cache
+        metrics.collector("cache_requests_total", "Lecturas de las cachés por resultado", "counter", lambda: [
+            ({"cache": "catalog", "result": "hit"}, catalog.hits),
+            ({"cache": "catalog", "result": "miss"}, catalog.misses),
+            ({"cache": "session", "result": "hit"}, sessions.hits),
+            ({"cache": "session", "result": "miss"}, sessions.misses),
+            ({"cache": "response", "result": "hit"}, responses.hits),
+            ({"cache": "response", "result": "similar_hit"}, responses.similar_hits),
+            ({"cache": "response", "result": "miss"}, responses.misses),
+        ])
+        metrics.collector("cache_hit_ratio", "Aciertos / lecturas de cada caché", "gauge", lambda: [
+            ({"cache": "catalog"}, _ratio(catalog.hits, catalog.misses)),
+            ({"cache": "session"}, _ratio(sessions.hits, sessions.misses)),
+            ({"cache": "response"}, _ratio(responses.hits + responses.similar_hits, responses.misses)),
+        ])
+        metrics.collector("cache_evictions_total", "Entradas descartadas por tamaño", "counter", lambda: [
+            ({"cache": "session"}, sessions.evictions),
+            ({"cache": "response"}, responses.evictions),
+        ])
+
+        metrics.collector("llm_in_flight", "Llamadas al LLM en curso", "gauge",
+                          lambda: [({}, self.llm_limiter.in_flight)])
+        metrics.collector("llm_queued", "Llamadas al LLM esperando un hueco", "gauge",
+                          lambda: [({}, self.llm_limiter.queued)])
+        metrics.collector("llm_rejected_total", "Llamadas al LLM rechazadas con 429", "counter",
+                          lambda: [({}, self.llm_limiter.rejected)])
+        metrics.collector("llm_coalesced_total", "Llamadas al LLM resueltas por otra idéntica en curso",
+                          "counter", lambda: [({}, self.llm_single_flight.coalesced)])
+        metrics.collector("llm_breaker_open", "1 si el circuit breaker no está cerrado", "gauge",
+                          lambda: [({}, int(self.llm_breaker.state != CircuitBreaker.CLOSED))])
+        metrics.collector("llm_breaker_rejected_total", "Llamadas rechazadas por el circuit breaker",
+                          "counter", lambda: [({}, self.llm_breaker.rejected)])
+        metrics.collector("llm_fallbacks_total", "Respuestas reemplazadas por el mensaje de disculpa",
+                          "counter", lambda: [({}, self._llm_fallbacks())])
+        if self.write_queue is not None:
+            queue = self.write_queue
+            metrics.collector("chat_write_batches_total", "Commits de la cola write-behind", "counter",
+                              lambda: [({}, queue.batches_written)])
+
+    def _llm_fallbacks(self) -> int:
+        caller = getattr(self.llm_provider, "caller", None)
+        return caller.fallbacks if caller is not None else 0
+
+    def _create_llm_service(self, provider: Optional[ILLMProvider]) -> Optional[ILLMProvider]:
+        """Proveedor con la caché de respuestas y la agrupación/límites delante."""
+        if provider is None:
+            try:
+                provider = create_llm_provider(breaker=self.llm_breaker)
+            except ValueError as e:
+                self.log.event(logging.WARNING, "startup.llm_unavailable", error=str(e))
+                return None
+        self.llm_provider = provider
+        prompt_block = getattr(provider, "prompt_block", None)
+        if prompt_block is not None:
+            self.product_cache.add_listener(prompt_block)
+        service = CoalescingLLMService(provider, self.llm_limiter, self.llm_single_flight)
+        if self.response_cache.max_entries > 0:
+            service = CachedLLMService(service, self.response_cache)
+        return service
+
+
+def _ratio(hits: int, misses: int) -> float:
+    total = hits + misses
+    return hits / total if total else 0.0
@@ -1,26 +1,62 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+import json
 import logging
-from fastapi import FastAPI, Depends, HTTPException
+import tempfile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, HTTPException, Request, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from datetime import datetime
+from typing import Optional
 
-from src.infrastructure.db.database import init_db, get_db
+from src.infrastructure.db.database import init_db, async_engine
 from src.infrastructure.repositorie.product_repository import SQLProductRepository
-from src.infrastructure.repositorie.chat_repository import SQLChatRepository
-from src.infrastructure.llm_providers.gemini_service import GeminiService
+from src.infrastructure.api.container import AppContainer
+from src.infrastructure.importers.product_feed import (
+    detect_format, iter_rows, open_text, iter_csv_lines, iter_ndjson_lines,
+)
+from src.infrastructure.llm_providers.resilience import CircuitBreaker
+from src.infrastructure.observability.middleware import RequestMetricsMiddleware
+from src.infrastructure.observability.structured_log import StructuredLogger, configure_logging
+from src.domain.exceptions import (
+    LLMOverloadedError, ChatServiceError, ProductNotFoundError, InsufficientStockError,
+    InvalidProductDataError, ProductVersionConflictError,
+)
+
+from src.application.chat_service import ChatService
+from src.application.product_service import ProductService, IMPORT_BATCH_SIZE
+from src.application.dtos import (
+    ProductDTO, ChatMessageRequestDTO, ChatMessageResponseDTO, ChatHistoryDTO, ProductImportReportDTO,
+    StockReservationDTO, BulkStockReservationDTO, StockReservationResultDTO, ProductPatchDTO,
+)
+
+# Tamaño del cuerpo de /products/bulk que se guarda en memoria antes de pasar a disco
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+configure_logging()
+log = StructuredLogger("src.api")
 
-from src.application.dtos import ProductDTO, ChatMessageRequestDTO, ChatMessageResponseDTO, ChatHistoryDTO
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    log.event(logging.INFO, "startup.db_ready")
+    # Proveedor de IA, cachés y servicios: una sola instancia para todo el proceso
+    app.state.container = AppContainer()
+    yield
+    await app.state.container.close()
+    await async_engine.dispose()
 
-print("ANTES DE CREAR APP")
 app = FastAPI(
     title="E-commerce Shoes Chat API",
     description="API para e-commerce con chat AI y catálogo de productos de zapatos",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
-print("APP FASTAPI CREADA")
 
 # Configuración de CORS
 app.add_middleware(
@@ -31,126 +67,296 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.on_event("startup")
-def on_startup():
-    print("STARTUP: Antes de init_db")
-    init_db()
-    print("STARTUP: Después de init_db")
+def _request_histogram(scope):
+    container = getattr(scope["app"].state, "container", None)
+    return container.http_request_seconds if container is not None else None
+
+# Duración de cada petición por ruta; en lugar de un print por endpoint
+app.add_middleware(RequestMetricsMiddleware, histogram_for=_request_histogram, logger=log)
+
+def get_container(request: Request) -> AppContainer:
+    return request.app.state.container
+
+def get_chat_service(container: AppContainer = Depends(get_container)) -> ChatService:
+    if container.llm_service is None:
+        raise HTTPException(status_code=503, detail="El servicio de IA no está configurado")
+    return container.chat_service
+
+def get_session(container: AppContainer = Depends(get_container)):
+    db = container.session_factory()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_product_service(db: Session = Depends(get_session),
+                        container: AppContainer = Depends(get_container)) -> ProductService:
+    return container.product_service(db)
 
 @app.get("/", tags=["Root"])
 def read_root():
-    print("Entrando a endpoint raíz /")
     return {
         "api": "E-commerce Shoes Chat API",
         "version": app.version,
         "description": app.description,
         "endpoints": [
             "GET /products",
+            "GET /products/search",
             "GET /products/{product_id}",
+            "PATCH /products/{product_id}",
+            "POST /products/bulk",
+            "POST /products/reserve",
+            "POST /products/{product_id}/reserve",
             "POST /chat",
+            "POST /chat/stream",
+            "WS /chat/ws",
             "GET /chat/history/{session_id}",
             "DELETE /chat/history/{session_id}",
             "GET /health",
+            "GET /metrics",
             "GET /test"
         ]
     }
 
 @app.get("/test", tags=["Test"])
 def test():
-    print("Entrando a /test")
     return {"ok": True}
 
 @app.get("/products", response_model=list[ProductDTO], tags=["Products"])
-def get_all_products(db: Session = Depends(get_db)):
-    print("Entrando a /products")
-    repo = SQLProductRepository(db)
-    products = repo.get_all()
-    print("Productos encontrados:", products)
+def get_all_products(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Tamaño de página; sin él se retorna todo el catálogo"),
+    after: Optional[int] = Query(None, description="Último ID recibido (paginación por cursor)"),
+    format: str = Query("json", pattern="^(json|ndjson|csv)$", description="ndjson y csv transmiten el catálogo fila a fila"),
+    service: ProductService = Depends(get_product_service),
+    container: AppContainer = Depends(get_container)
+):
+    if format != "json":
+        media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+        return StreamingResponse(_stream_products(container, after, format), media_type=media_type)
+    if limit is None and after is None:
+        return service.get_all_products()
+    products = service.search_products({}, limit=limit, after_id=after)
+    if limit is not None and len(products) == limit:
+        response.headers["X-Next-Cursor"] = str(products[-1].id)
     return products
 
+def _stream_products(container: AppContainer, after: Optional[int], format: str):
+    # Sesión propia: el generador se consume después de retornar el endpoint
+    db = container.session_factory()
+    lines = iter_csv_lines if format == "csv" else iter_ndjson_lines
+    try:
+        yield from lines(SQLProductRepository(db).iter_all(after_id=after))
+    finally:
+        db.close()
+
+@app.post("/products/bulk", response_model=ProductImportReportDTO, tags=["Products"])
+async def import_products(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Por defecto según Content-Type"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=50_000),
+    container: AppContainer = Depends(get_container)
+):
+    """
+    Importación masiva en CSV (con encabezado) o NDJSON. El cuerpo se copia
+    a un archivo temporal mientras llega y se importa por lotes en un hilo;
+    las filas inválidas se reportan por número de línea sin detener el resto.
+    """
+    feed_format = format or detect_format(content_type=request.headers.get("content-type", ""))
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        report = await run_in_threadpool(_import_feed, container, spool, feed_format, batch_size)
+    log.event(logging.INFO, "products.bulk_import", format=feed_format,
+              imported=report.imported, failed=report.failed)
+    return report
+
+def _import_feed(container: AppContainer, binary, feed_format: str, batch_size: int) -> ProductImportReportDTO:
+    db = container.session_factory()
+    try:
+        rows = iter_rows(open_text(binary), feed_format)
+        return container.product_service(db).import_products(rows, batch_size=batch_size)
+    finally:
+        db.close()
+
+@app.get("/products/search", response_model=list[ProductDTO], tags=["Products"])
+def search_products(
+    brand: Optional[str] = None,
+    category: Optional[str] = None,
+    name: Optional[str] = None,
+    size: Optional[str] = None,
+    color: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    after: Optional[int] = Query(None, description="Último ID recibido (paginación por cursor)"),
+    service: ProductService = Depends(get_product_service)
+):
+    filters = {
+        "brand": brand, "category": category, "name": name, "size": size, "color": color,
+        "min_price": min_price, "max_price": max_price, "in_stock": in_stock,
+    }
+    return service.search_products(filters, limit=limit, offset=offset, after_id=after)
+
 @app.get("/products/{product_id}", response_model=ProductDTO, tags=["Products"])
-def get_product_by_id(product_id: int, db: Session = Depends(get_db)):
-    print(f"Entrando a /products/{product_id}")
-    repo = SQLProductRepository(db)
-    product = repo.get_by_id(product_id)
-    if not product:
+def get_product_by_id(product_id: int, service: ProductService = Depends(get_product_service)):
+    try:
+        product = service.get_product_by_id(product_id)
+    except ProductNotFoundError:
         raise HTTPException(status_code=404, detail="Producto no encontrado")
-    print("Producto encontrado:", product)
     return product
 
+@app.patch("/products/{product_id}", response_model=ProductDTO, tags=["Products"])
+def patch_product(product_id: int, request: ProductPatchDTO,
+                  service: ProductService = Depends(get_product_service)):
+    """
+    Actualiza solo los campos enviados con un único UPDATE. Con `version`,
+    responde 409 si el producto cambió desde que se leyó.
+    """
+    try:
+        return service.patch_product(product_id, request.changes(), expected_version=request.version)
+    except ProductNotFoundError:
+        raise HTTPException(status_code=404, detail="Producto no encontrado")
+    except InvalidProductDataError as e:
+        raise HTTPException(status_code=422, detail=e.message)
+    except ProductVersionConflictError as e:
+        raise HTTPException(status_code=409, detail=e.message)
+
+@app.post("/products/reserve", response_model=list[StockReservationResultDTO], tags=["Products"])
+def reserve_products(request: BulkStockReservationDTO, service: ProductService = Depends(get_product_service)):
+    """Reserva varios productos a la vez: si alguno no tiene stock, no se reserva ninguno."""
+    try:
+        return service.bulk_reserve(request.items)
+    except ProductNotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.message)
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=409, detail=e.message)
+
+@app.post("/products/{product_id}/reserve", response_model=StockReservationResultDTO, tags=["Products"])
+def reserve_product(product_id: int, request: StockReservationDTO,
+                    service: ProductService = Depends(get_product_service)):
+    """Descuenta stock con un UPDATE condicional; 409 si no alcanza."""
+    try:
+        return service.reserve_stock(product_id, request.quantity)
+    except ProductNotFoundError as e:
+        raise HTTPException(status_code=404, detail=e.message)
+    except InsufficientStockError as e:
+        raise HTTPException(status_code=409, detail=e.message)
+
 @app.post("/chat", response_model=ChatMessageResponseDTO, tags=["Chat"])
 async def chat(
     request: ChatMessageRequestDTO,
-    db: Session = Depends(get_db)
+    chat_service: ChatService = Depends(get_chat_service),
+    container: AppContainer = Depends(get_container)
 ):
     try:
-        print("Entrando a /chat")
-        chat_repo = SQLChatRepository(db)
-        product_repo = SQLProductRepository(db)
-        gemini = GeminiService()
-
-        products = product_repo.get_all()
-        context = chat_repo.get_session_history(request.session_id, limit=20)
-        context_fmt = [
-            {"role": m.role, "message": m.message} for m in context
-        ]
+        async with container.llm_limiter.session_slot(request.session_id):
+            response = await chat_service.process_message(request)
+        return response
+    except LLMOverloadedError as e:
+        raise _overloaded(e)
+    except ChatServiceError as e:
+        log.event(logging.WARNING, "chat.error", session_id=request.session_id, error=e.message)
+        raise HTTPException(status_code=500, detail=f"Error en el chat: {e.message}")
+
+def _overloaded(error: LLMOverloadedError) -> HTTPException:
+    return HTTPException(status_code=429, detail=error.message, headers={"Retry-After": "1"})
 
-        response_text = await gemini.generate_response(
-            user_message=request.message,
-            products=products,
-            context=context_fmt
-        )
-
-        # Guarda el mensaje del usuario y de la IA en el historial
-        from src.domain.entities import ChatMessage
-        now = datetime.utcnow()
-        user_msg = ChatMessage(
-            id=None,
-            session_id=request.session_id,
-            role="user",
-            message=request.message,
-            timestamp=now
-        )
-        assistant_msg = ChatMessage(
-            id=None,
-            session_id=request.session_id,
-            role="assistant",
-            message=response_text,
-            timestamp=now
-        )
-        chat_repo.save_message(user_msg)
-        chat_repo.save_message(assistant_msg)
-
-        print("Respondiendo mensaje de chat")
-        return ChatMessageResponseDTO(
-            session_id=request.session_id,
-            user_message=request.message,
-            assistant_message=response_text,
-            timestamp=now  # ¡IMPORTANTE! Ahora sí lo incluyes.
-        )
-    except Exception as e:
-        print("ERROR EN /chat", str(e))
-        raise HTTPException(status_code=500, detail=f"Error en el chat: {str(e)}")
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _stream_chat_turn(container: AppContainer, chat_service: ChatService, request: ChatMessageRequestDTO):
+    """
+    Eventos del turno ({"type": "token"|"done"|"error", ...}) con los
+    errores convertidos en un evento final en lugar de cortar el stream.
+    """
+    try:
+        async with container.llm_limiter.session_slot(request.session_id):
+            async for item in chat_service.stream_message(request):
+                yield item
+    except LLMOverloadedError as e:
+        yield {"type": "error", "detail": e.message, "status": 429}
+    except ChatServiceError as e:
+        log.event(logging.WARNING, "chat.stream_error", session_id=request.session_id, error=e.message)
+        yield {"type": "error", "detail": f"Error en el chat: {e.message}"}
+
+@app.post("/chat/stream", tags=["Chat"])
+async def chat_stream(
+    request: ChatMessageRequestDTO,
+    chat_service: ChatService = Depends(get_chat_service),
+    container: AppContainer = Depends(get_container)
+):
+    """
+    Igual que /chat, pero envía la respuesta como Server-Sent Events a medida
+    que el proveedor la genera: eventos `token`, y al final `done` (o `error`).
+    """
+    # Con la cola llena se rechaza antes de abrir el stream
+    limiter = container.llm_limiter
+    if limiter.is_full() or limiter.session_is_full(request.session_id):
+        raise _overloaded(LLMOverloadedError())
+
+    async def events():
+        async for item in _stream_chat_turn(container, chat_service, request):
+            event = item.pop("type")
+            yield _sse_event(event, item)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/chat/ws")
+async def chat_websocket(websocket: WebSocket):
+    """
+    Variante WebSocket de /chat/stream. Cada mensaje del cliente es un JSON
+    {"session_id", "message"} y se responde con los mismos eventos en JSON.
+    """
+    container = websocket.app.state.container
+    await websocket.accept()
+    if container.llm_service is None:
+        await websocket.send_json({"type": "error", "detail": "El servicio de IA no está configurado"})
+        await websocket.close(code=1011)
+        return
+    try:
+        while True:
+            data = await websocket.receive_json()
+            try:
+                request = ChatMessageRequestDTO(**data)
+            except ValidationError as e:
+                await websocket.send_json({"type": "error", "detail": e.errors()})
+                continue
+            async for item in _stream_chat_turn(container, container.chat_service, request):
+                await websocket.send_json(item)
+    except WebSocketDisconnect:
+        pass
 
 @app.get("/chat/history/{session_id}", response_model=list[ChatHistoryDTO], tags=["Chat"])
-def get_chat_history(session_id: str, limit: int = 10, db: Session = Depends(get_db)):
-    print(f"Entrando a /chat/history/{session_id}")
-    chat_repo = SQLChatRepository(db)
-    history = chat_repo.get_session_history(session_id, limit=limit)
-    print("Historial encontrado:", history)
-    return [ChatHistoryDTO.from_entity(m) for m in history]
+async def get_chat_history(session_id: str, limit: int = 10,
+                           container: AppContainer = Depends(get_container)):
+    history = await container.chat_service.get_session_history_async(session_id, limit=limit)
+    return history
 
 @app.delete("/chat/history/{session_id}", tags=["Chat"])
-def delete_chat_history(session_id: str, db: Session = Depends(get_db)):
-    print(f"Entrando a DELETE /chat/history/{session_id}")
-    chat_repo = SQLChatRepository(db)
-    deleted = chat_repo.delete_session_history(session_id)
-    print("Mensajes eliminados:", deleted)
+async def delete_chat_history(session_id: str, container: AppContainer = Depends(get_container)):
+    deleted = await container.chat_service.clear_session_history_async(session_id)
+    log.event(logging.INFO, "chat.history_deleted", session_id=session_id, deleted=deleted)
     return {"deleted": deleted}
 
 @app.get("/health", tags=["Health"])
-def health_check():
-    print("Entrando a /health")
-    return {"status": "ok", "timestamp": datetime.utcnow().isoformat()}
+def health_check(container: AppContainer = Depends(get_container)):
+    llm = container.health()
+    return {
+        # degraded: el chat responde con el mensaje de disculpa hasta que el circuito se cierre
+        "status": "ok" if llm["breaker"]["state"] == CircuitBreaker.CLOSED else "degraded",
+        "timestamp": datetime.utcnow().isoformat(),
+        "llm": llm,
+    }
 
-logging.basicConfig(level=logging.DEBUG)
\ No newline at end of file
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+def metrics(container: AppContainer = Depends(get_container)):
+    """Histogramas de latencia y contadores en formato de texto de Prometheus."""
+    return PlainTextResponse(container.metrics.render(), media_type="text/plain; version=0.0.4")
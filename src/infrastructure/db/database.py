@@ -1,20 +1,43 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from contextlib import contextmanager
 import os
 
+from src.infrastructure.db.engine_profile import engine_options, sqlite_pragmas, install_sqlite_pragmas
+
 # URL de la base de datos (puedes obtenerla de variables de entorno si lo deseas)
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/ecommerce_chat.db")
 
-# Motor de conexión a SQLite
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Necesario para SQLite
-)
+# Motor de conexión; pool y PRAGMAs según DB_PROFILE (ver engine_profile.py)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+install_sqlite_pragmas(engine, sqlite_pragmas())
 
 # Factory de sesiones
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Drivers asíncronos equivalentes a cada driver síncrono
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def to_async_url(url: str) -> str:
+    """Convierte una URL síncrona (sqlite://, postgresql://) a su driver asíncrono."""
+    scheme, sep, rest = url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+# Motor asíncrono para el camino de las peticiones (no bloquea el event loop)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, is_async=True))
+install_sqlite_pragmas(async_engine.sync_engine, sqlite_pragmas())
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
 # Clase base para modelos ORM
 Base = declarative_base()
 
@@ -26,7 +49,14 @@ def get_db():
     finally:
         db.close()
 
+# Versión asíncrona de get_db para endpoints async
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 # Inicializa BD y carga datos (crea las tablas si no existen)
 def init_db():
     import src.infrastructure.db.models  # importa los modelos para que Base los conozca
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from src.infrastructure.db.migrations import run_migrations
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
\ No newline at end of file
@@ -0,0 +1,87 @@
+"""
+Perfiles de configuración del motor de base de datos.
+
+DB_PROFILE=default mantiene la configuración mínima de siempre.
+DB_PROFILE=production activa en SQLite WAL y pragmas pensados para que las
+escrituras del chat no bloqueen las lecturas del catálogo. En ambos perfiles
+el pool se elige por backend y se dimensiona con variables de entorno.
+"""
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool, StaticPool
+
+DB_PROFILE = os.getenv("DB_PROFILE", "default")
+
+# auto | queue | null | static
+DB_POOL_CLASS = os.getenv("DB_POOL_CLASS", "auto")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+PRODUCTION_SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negativo = tamaño en KiB (64 MiB por conexión)
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", "-65536")),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000")),
+    "temp_store": os.getenv("SQLITE_TEMP_STORE", "MEMORY"),
+}
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return is_sqlite(url) and database in (None, "", ":memory:")
+
+
+def engine_options(url: str, is_async: bool = False, pool_class: str = None) -> dict:
+    """
+    Argumentos para create_engine/create_async_engine según backend y pool.
+    """
+    pool_class = pool_class or DB_POOL_CLASS
+    options = {}
+    if is_sqlite(url) and not is_async:
+        options["connect_args"] = {"check_same_thread": False}  # Necesario para SQLite
+    if pool_class == "auto":
+        # Una BD en memoria solo existe dentro de su conexión
+        pool_class = "static" if is_memory_sqlite(url) else "queue"
+    if pool_class == "null":
+        options["poolclass"] = NullPool
+    elif pool_class == "static":
+        options["poolclass"] = StaticPool
+    else:
+        options["poolclass"] = AsyncAdaptedQueuePool if is_async else QueuePool
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                       pool_timeout=DB_POOL_TIMEOUT)
+        if not is_sqlite(url):
+            options["pool_pre_ping"] = True
+    return options
+
+
+def sqlite_pragmas(profile: str = None) -> dict:
+    profile = profile or DB_PROFILE
+    return dict(PRODUCTION_SQLITE_PRAGMAS) if profile == "production" else {}
+
+
+def install_sqlite_pragmas(engine, pragmas: dict) -> None:
+    """
+    Ejecuta los PRAGMA en cada conexión nueva del pool.
+    Acepta motores síncronos o el `sync_engine` de un AsyncEngine.
+    """
+    if not pragmas or engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
@@ -0,0 +1,64 @@
+"""
+Migraciones idempotentes para bases de datos creadas con versiones
+anteriores de los modelos. `create_all` solo crea tablas nuevas, así que
+aquí se agregan columnas e índices que falten en tablas existentes.
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from src.infrastructure.db.database import Base
+from src.infrastructure.db.models import ProductModel, ChatMemoryModel
+
+
+def run_migrations(engine: Engine) -> None:
+    _add_product_search_columns(engine)
+    _add_product_version_column(engine)
+    _drop_legacy_chat_indexes(engine)
+    _create_missing_indexes(engine)
+
+
+def _add_product_search_columns(engine: Engine) -> None:
+    existing = {c["name"] for c in inspect(engine).get_columns(ProductModel.__tablename__)}
+    missing = [c for c in ProductModel.SEARCH_COLUMNS if c not in existing]
+    if not missing:
+        return
+    source_columns = list(ProductModel.SEARCH_COLUMNS.values())
+    with engine.begin() as conn:
+        for column in missing:
+            conn.execute(text(f"ALTER TABLE products ADD COLUMN {column} VARCHAR"))
+        # Rellenar con str.lower() de Python, igual que el evento del modelo
+        rows = conn.execute(text(f"SELECT id, {', '.join(source_columns)} FROM products")).all()
+        params = [
+            {"id": row[0], **{
+                lower: (value.lower() if value is not None else None)
+                for lower, value in zip(ProductModel.SEARCH_COLUMNS, row[1:])
+            }}
+            for row in rows
+        ]
+        if params:
+            assignments = ", ".join(f"{c} = :{c}" for c in ProductModel.SEARCH_COLUMNS)
+            conn.execute(text(f"UPDATE products SET {assignments} WHERE id = :id"), params)
+
+
+def _add_product_version_column(engine: Engine) -> None:
+    existing = {c["name"] for c in inspect(engine).get_columns(ProductModel.__tablename__)}
+    if "version" in existing:
+        return
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE products ADD COLUMN version INTEGER NOT NULL DEFAULT 1"))
+
+
+def _drop_legacy_chat_indexes(engine: Engine) -> None:
+    existing = {i["name"] for i in inspect(engine).get_indexes(ChatMemoryModel.__tablename__)}
+    legacy = [name for name in ChatMemoryModel.LEGACY_INDEXES if name in existing]
+    if not legacy:
+        return
+    with engine.begin() as conn:
+        for name in legacy:
+            conn.execute(text(f"DROP INDEX {name}"))
+
+
+def _create_missing_indexes(engine: Engine) -> None:
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Index
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, Index, event
 from sqlalchemy.sql import func
 from src.infrastructure.db.database import Base
 
@@ -14,16 +14,61 @@ class ProductModel(Base):
     price = Column(Float)
     stock = Column(Integer)
     description = Column(String)
+    # Se incrementa en cada actualización; permite detectar ediciones concurrentes
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # Copias en minúsculas para filtrar sin distinguir mayúsculas usando índices
+    name_lower = Column(String)
+    brand_lower = Column(String)
+    category_lower = Column(String)
+    size_lower = Column(String)
+    color_lower = Column(String)
+
+    __table_args__ = (
+        Index('idx_products_brand_lower', 'brand_lower'),
+        Index('idx_products_category_lower', 'category_lower'),
+        Index('idx_products_price', 'price'),
+    )
+
+    # Columnas normalizadas y la columna de la que se derivan
+    SEARCH_COLUMNS = {
+        "name_lower": "name",
+        "brand_lower": "brand",
+        "category_lower": "category",
+        "size_lower": "size",
+        "color_lower": "color",
+    }
+
+@event.listens_for(ProductModel, "before_insert")
+@event.listens_for(ProductModel, "before_update")
+def _normalize_search_columns(mapper, connection, target):
+    """Mantiene sincronizadas las columnas *_lower en cada escritura ORM."""
+    for lower_column, column in ProductModel.SEARCH_COLUMNS.items():
+        value = getattr(target, column)
+        setattr(target, lower_column, value.lower() if value is not None else None)
 
 class ChatMemoryModel(Base):
     __tablename__ = "chat_memory"
 
     id = Column(Integer, primary_key=True, autoincrement=True, doc="ID único del mensaje")
-    session_id = Column(String(100), index=True, nullable=False, doc="ID de la sesión de chat")
+    session_id = Column(String(100), nullable=False, doc="ID de la sesión de chat")
     role = Column(String(20), nullable=False, doc="Rol del mensaje: 'user' o 'assistant'")
     message = Column(Text, nullable=False, doc="Contenido del mensaje")
     timestamp = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), doc="Fecha y hora del mensaje (UTC)")
 
     __table_args__ = (
-        Index('idx_chat_memory_session_id', 'session_id'),
-    )
\ No newline at end of file
+        # Filtra por sesión y entrega los mensajes ya ordenados: leer los
+        # últimos N es un recorrido de rango del índice, sin ordenar el historial
+        Index('idx_chat_memory_session_ts_id', 'session_id', 'timestamp', 'id'),
+    )
+
+    # Índices de versiones anteriores, reemplazados por el compuesto
+    LEGACY_INDEXES = ('ix_chat_memory_session_id', 'idx_chat_memory_session_id')
+
+class ChatSummaryModel(Base):
+    __tablename__ = "chat_summaries"
+
+    session_id = Column(String(100), primary_key=True, doc="ID de la sesión de chat")
+    summary = Column(Text, nullable=False, doc="Resumen de los turnos fuera del contexto reciente")
+    last_message_id = Column(Integer, nullable=False, doc="Último mensaje de chat_memory incluido en el resumen")
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now(), doc="Fecha de la última actualización (UTC)")
@@ -0,0 +1,118 @@
+"""
+Lectura y escritura de catálogos de productos en CSV o NDJSON, fila a fila.
+
+Las funciones de lectura producen pares (línea, fila) para
+ProductService.import_products; una línea NDJSON inválida se entrega como
+la excepción para que se reporte sin detener la importación.
+
+Uso:
+    python -m src.infrastructure.importers.product_feed import catalogo.csv [--batch-size 5000]
+    python -m src.infrastructure.importers.product_feed export catalogo.ndjson
+"""
+import argparse
+import csv
+import io
+import json
+import sys
+import time
+from dataclasses import asdict
+from typing import IO, Any, Iterable, Iterator, Tuple
+
+PRODUCT_FIELDS = ("id", "name", "brand", "category", "size", "color", "price", "stock", "description")
+FEED_FORMATS = ("csv", "ndjson")
+# Tipos de contenido aceptados por POST /products/bulk
+CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+
+def detect_format(filename: str = "", content_type: str = "") -> str:
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in CONTENT_TYPES:
+        return CONTENT_TYPES[media_type]
+    return "ndjson" if filename.lower().endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def iter_csv_rows(stream: IO[str]) -> Iterator[Tuple[int, Any]]:
+    """Filas de un CSV con encabezado; admite campos entre comillas con saltos de línea."""
+    reader = csv.DictReader(stream)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def iter_ndjson_rows(stream: IO[str]) -> Iterator[Tuple[int, Any]]:
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f"JSON inválido: {e}")
+
+
+def iter_rows(stream: IO[str], feed_format: str) -> Iterator[Tuple[int, Any]]:
+    if feed_format not in FEED_FORMATS:
+        raise ValueError(f"Formato no soportado: {feed_format}")
+    return iter_csv_rows(stream) if feed_format == "csv" else iter_ndjson_rows(stream)
+
+
+def open_text(binary: IO[bytes]) -> IO[str]:
+    """Vista de texto UTF-8 (sin BOM) sobre un archivo binario, sin cargarlo en memoria."""
+    return io.TextIOWrapper(binary, encoding="utf-8-sig", newline="")
+
+
+def iter_csv_lines(products: Iterable) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(PRODUCT_FIELDS)
+    for product in products:
+        row = asdict(product)
+        writer.writerow([row[f] for f in PRODUCT_FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def iter_ndjson_lines(products: Iterable) -> Iterator[str]:
+    for product in products:
+        yield json.dumps(asdict(product), ensure_ascii=False) + "\n"
+
+
+def _import(args) -> int:
+    from src.application.product_service import ProductService
+    from src.infrastructure.db.database import SessionLocal, init_db
+    from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+    init_db()
+    started = time.perf_counter()
+    feed_format = args.format or detect_format(args.path)
+    with open(args.path, "rb") as binary, SessionLocal() as db:
+        report = ProductService(SQLProductRepository(db)).import_products(
+            iter_rows(open_text(binary), feed_format), batch_size=args.batch_size
+        )
+    summary = dict(report.model_dump(), elapsed_s=round(time.perf_counter() - started, 2))
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 1 if report.failed else 0
+
+
+def _export(args) -> int:
+    from src.infrastructure.db.database import SessionLocal
+    from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+    feed_format = args.format or detect_format(args.path)
+    lines = iter_csv_lines if feed_format == "csv" else iter_ndjson_lines
+    with open(args.path, "w", encoding="utf-8", newline="") as out, SessionLocal() as db:
+        out.writelines(lines(SQLProductRepository(db).iter_all()))
+    return 0
+
+
+if __name__ == "__main__":
+    from src.application.product_service import IMPORT_BATCH_SIZE
+
+    parser = argparse.ArgumentParser(description="Importa o exporta el catálogo en CSV/NDJSON")
+    parser.add_argument("command", choices=("import", "export"))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FEED_FORMATS, help="Por defecto según la extensión del archivo")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+    sys.exit(_import(args) if args.command == "import" else _export(args))
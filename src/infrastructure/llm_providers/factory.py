@@ -0,0 +1,30 @@
+import os
+
+from src.domain.llm_provider import ILLMProvider
+from src.infrastructure.llm_providers.resilience import CircuitBreaker
+
+# gemini | fake | simulated
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+
+
+def create_llm_provider(name: str = None, breaker: CircuitBreaker = None) -> ILLMProvider:
+    """
+    Crea el proveedor de IA indicado por LLM_PROVIDER.
+
+    - gemini: GeminiService (requiere GEMINI_API_KEY; lanza ValueError si falta)
+    - fake: FakeLLMService, respuesta determinista e inmediata
+    - simulated: SimulatedLLMService, con la latencia y errores de LLM_SIM_*
+
+    `breaker` permite compartir el circuit breaker (p. ej. para exponerlo en /health).
+    """
+    name = (name or LLM_PROVIDER).lower()
+    if name == "fake":
+        from src.infrastructure.llm_providers.fake_llm_service import FakeLLMService
+        return FakeLLMService()
+    if name == "simulated":
+        from src.infrastructure.llm_providers.simulated_llm_service import SimulatedLLMService
+        return SimulatedLLMService(breaker=breaker)
+    if name == "gemini":
+        from src.infrastructure.llm_providers.gemini_service import GeminiService
+        return GeminiService(breaker=breaker)
+    raise ValueError(f"LLM_PROVIDER desconocido: {name}")
@@ -0,0 +1,37 @@
+import asyncio
+
+from src.domain.llm_provider import ILLMProvider
+from src.infrastructure.llm_providers.product_prompt_block import ProductPromptBlock
+
+
+class FakeLLMService(ILLMProvider):
+    """
+    Proveedor de IA falso y determinista para pruebas sin red.
+
+    Responde con los nombres de los productos recibidos y entrega la
+    respuesta palabra por palabra en `stream_response`, con una pausa
+    opcional entre fragmentos para simular la generación de tokens.
+    """
+
+    def __init__(self, chunk_delay: float = 0.0):
+        self.chunk_delay = chunk_delay
+        self.prompt_block = ProductPromptBlock()
+        self.calls = 0
+
+    def reply_for(self, user_message, products):
+        names = ", ".join(p.name for p in products[:3])
+        if not names:
+            return f"Recibí tu mensaje: {user_message}. No hay productos disponibles."
+        return f"Recibí tu mensaje: {user_message}. Te recomiendo: {names}."
+
+    async def generate_response(self, user_message, products, context, catalog_version=None):
+        self.calls += 1
+        return self.reply_for(user_message, products)
+
+    async def stream_response(self, user_message, products, context, catalog_version=None):
+        self.calls += 1
+        words = self.reply_for(user_message, products).split(" ")
+        for i, word in enumerate(words):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield word if i == 0 else " " + word
@@ -1,38 +1,86 @@
+import asyncio
 import os
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 
-class GeminiService:
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
+from src.domain.llm_provider import ILLMProvider
+from src.infrastructure.llm_providers.resilience import (
+    CircuitBreaker, CircuitOpenError, ResilientCaller, RetryPolicy,
+)
+from src.infrastructure.llm_providers.product_prompt_block import (
+    ProductPromptBlock, format_product_line, NO_PRODUCTS_TEXT,
+)
+
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+# Errores transitorios de Gemini que se reintentan y cuentan para el circuit breaker
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    google_exceptions.ServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.DeadlineExceeded,
+)
+
+FALLBACK_MESSAGE = "Lo siento, hubo un problema al contactar con el asistente de IA. Intenta nuevamente más tarde."
+
+
+class GeminiService(ILLMProvider):
+    """
+    Proveedor de IA basado en Gemini.
+
+    Está pensado para crearse una sola vez por proceso: `genai.configure`
+    deja un único cliente (y su canal gRPC) que se reutiliza entre peticiones.
+    Las llamadas simultáneas las limita el LLMConcurrencyLimiter de
+    CoalescingLLMService (LLM_MAX_CONCURRENCY), fuera de los deadlines.
+    """
+
+    def __init__(self, api_key: str = None, model_name: str = GEMINI_MODEL,
+                 breaker: CircuitBreaker = None, caller: ResilientCaller = None):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY no está definida en variables de entorno.")
         genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel("gemini-2.5-flash")
+        self.model = genai.GenerativeModel(model_name)
+        self.in_flight = 0
+        # Deadline por intento, reintentos con backoff y circuit breaker (ver resilience.py)
+        self.caller = caller or ResilientCaller(
+            retry_policy=RetryPolicy(retryable=RETRYABLE_ERRORS), breaker=breaker
+        )
+        # Se sincroniza con el catálogo registrándolo en ProductCatalogCache.add_listener
+        self.prompt_block = ProductPromptBlock()
 
-    def format_products_info(self, products):
+    def format_products_info(self, products, catalog_version=None):
         """
         Convierte una lista de productos a un string legible.
         Formato: "- Nombre | Marca | Precio | Stock"
+        Si catalog_version coincide con la del bloque precalculado, se reutiliza.
         """
-        lines = []
-        for p in products:
-            lines.append(f"- {p.name} | {p.brand} | ${p.price} | Stock: {p.stock}")
-        return "\n".join(lines) if lines else "No hay productos disponibles."
+        cached = self.prompt_block.render(products, catalog_version)
+        if cached is not None:
+            return cached
+        lines = [format_product_line(p) for p in products]
+        return "\n".join(lines) if lines else NO_PRODUCTS_TEXT
 
-    async def generate_response(self, user_message, products, context):
+    def build_prompt(self, user_message, products, context, catalog_version=None):
         """
         user_message: str
         products: lista de entidades Product (con atributos name, brand, price, stock)
-        context: lista de mensajes previos [{'role': 'user'/'assistant', 'message': str}]
+        context: ChatContext o lista de mensajes previos [{'role': 'user'/'assistant', 'message': str}]
+        catalog_version: versión de ProductCatalogCache de la que provienen los productos
         """
-        productos_txt = self.format_products_info(products)
-        
+        productos_txt = self.format_products_info(products, catalog_version)
+
         historial = ""
-        for entry in context:
-            rol = "Usuario" if entry["role"] == "user" else "Asistente"
-            historial += f"{rol}: {entry['message']}\n"
+        if hasattr(context, "format_for_prompt"):
+            # ChatContext: ya viene acotado y con el resumen de turnos anteriores
+            formatted = context.format_for_prompt()
+            historial = f"{formatted}\n" if formatted else ""
+        else:
+            for entry in context:
+                rol = "Usuario" if entry["role"] == "user" else "Asistente"
+                historial += f"{rol}: {entry['message']}\n"
 
-        prompt = f"""Eres un asistente virtual experto en ventas de zapatos para un e-commerce.
+        return f"""Eres un asistente virtual experto en ventas de zapatos para un e-commerce.
 Tu objetivo es ayudar a los clientes a encontrar los zapatos perfectos.
 
 PRODUCTOS DISPONIBLES:
@@ -49,8 +97,74 @@ INSTRUCCIONES:
 
 Asistente:"""
 
+    async def generate_response(self, user_message, products, context, catalog_version=None):
+        """
+        Genera la respuesta completa. Mismos parámetros que build_prompt.
+        Con el circuito abierto o tras agotar los reintentos retorna el mensaje de disculpa.
+        """
+        prompt = self.build_prompt(user_message, products, context, catalog_version)
         try:
-            response = await self.model.generate_content_async(prompt)
+            response = await self.caller.call(lambda: self._generate(prompt))
             return response.text.strip() if hasattr(response, "text") else str(response)
         except Exception as e:
-            return "Lo siento, hubo un problema al contactar con el asistente de IA. Intenta nuevamente más tarde."
\ No newline at end of file
+            self.caller.record_fallback(e, provider="gemini")
+            return FALLBACK_MESSAGE
+
+    async def stream_response(self, user_message, products, context, catalog_version=None):
+        """
+        Generador asíncrono que entrega el texto a medida que Gemini lo produce.
+        Si falla antes del primer fragmento, entrega el mensaje de disculpa;
+        si falla después, propaga la excepción. Cada fragmento tiene el mismo
+        deadline que una llamada completa.
+        """
+        prompt = self.build_prompt(user_message, products, context, catalog_version)
+        if not self.caller.breaker.allow():
+            self.caller.record_fallback(CircuitOpenError(), provider="gemini", stream=True)
+            yield FALLBACK_MESSAGE
+            return
+        timeout = self.caller.timeout_seconds
+        emitted = False
+        try:
+            self.in_flight += 1
+            try:
+                # Solo se reintenta abrir el stream, nunca a mitad de respuesta
+                response = await self.caller.attempts(
+                    lambda: self.model.generate_content_async(prompt, stream=True)
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                    except StopAsyncIteration:
+                        break
+                    text = getattr(chunk, "text", "")
+                    if text:
+                        emitted = True
+                        yield text
+            finally:
+                self.in_flight -= 1
+        except Exception as e:
+            self.caller.record_error(e)
+            if emitted:
+                # La respuesta quedó a medias: que el llamador lo informe
+                raise
+            self.caller.record_fallback(e, provider="gemini", stream=True)
+            yield FALLBACK_MESSAGE
+        except BaseException:
+            # El cliente se desconectó (GeneratorExit o CancelledError en un yield):
+            # si Gemini ya estaba respondiendo cuenta como éxito; si no, no dice
+            # nada del proveedor y solo se libera la llamada de prueba
+            if emitted:
+                self.caller.breaker.record_success()
+            else:
+                self.caller.breaker.release_probe()
+            raise
+        else:
+            self.caller.breaker.record_success()
+
+    async def _generate(self, prompt):
+        self.in_flight += 1
+        try:
+            return await self.model.generate_content_async(prompt)
+        finally:
+            self.in_flight -= 1
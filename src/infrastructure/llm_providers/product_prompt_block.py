@@ -0,0 +1,72 @@
+import threading
+from typing import Dict, List, Optional
+
+NO_PRODUCTS_TEXT = "No hay productos disponibles."
+
+
+def format_product_line(product) -> str:
+    """Formato: "- Nombre | Marca | $Precio | Stock: N" """
+    return f"- {product.name} | {product.brand} | ${product.price} | Stock: {product.stock}"
+
+
+class ProductPromptBlock:
+    """
+    Bloque de productos del prompt, precalculado y mantenido de forma incremental.
+
+    Se registra como listener de ProductCatalogCache: una recarga completa
+    vuelve a formatear todo el catálogo, pero guardar o eliminar un producto
+    solo re-renderiza su línea. `version` es la versión del catálogo que
+    refleja el bloque.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lines: Dict[int, str] = {}
+        self._text: Optional[str] = None
+        self.version: Optional[int] = None
+
+    # Eventos de ProductCatalogCache
+    def on_catalog_loaded(self, products, version: int) -> None:
+        with self._lock:
+            self._lines = {p.id: format_product_line(p) for p in products}
+            self._text = None
+            self.version = version
+
+    def on_product_saved(self, product, version: int) -> None:
+        with self._lock:
+            self._lines[product.id] = format_product_line(product)
+            self._text = None
+            self.version = version
+
+    def on_product_removed(self, product_id: int, version: int) -> None:
+        with self._lock:
+            self._lines.pop(product_id, None)
+            self._text = None
+            self.version = version
+
+    def on_catalog_invalidated(self, version: int) -> None:
+        # El catálogo se recargará de la BD: hasta entonces no hay bloque válido
+        with self._lock:
+            self._lines = {}
+            self._text = None
+            self.version = None
+
+    def render(self, products, version: Optional[int] = None) -> Optional[str]:
+        """
+        Retorna el texto de `products` reutilizando las líneas precalculadas.
+        Retorna None si el bloque no corresponde a `version`; en ese caso el
+        llamador debe formatear los productos por su cuenta.
+        """
+        with self._lock:
+            if version is None or version != self.version:
+                return None
+            if len(products) == len(self._lines) and {p.id for p in products} == self._lines.keys():
+                # Catálogo completo (mismos IDs): se une una sola vez por versión
+                if self._text is None:
+                    self._text = "\n".join(self._lines.values()) or NO_PRODUCTS_TEXT
+                return self._text
+            lines: List[str] = []
+            for p in products:
+                line = self._lines.get(p.id)
+                lines.append(line if line is not None else format_product_line(p))
+            return "\n".join(lines) if lines else NO_PRODUCTS_TEXT
@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict
+
+from src.domain.exceptions import LLMOverloadedError
+from src.domain.llm_provider import ILLMProvider
+from src.infrastructure.llm_providers.response_cache import context_fingerprint, products_snapshot
+
+# Llamadas simultáneas al proveedor en todo el proceso (único límite; los
+# proveedores no tienen semáforo propio)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Peticiones que pueden esperar un hueco; las siguientes se rechazan con 429
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+# Turnos simultáneos de una misma sesión
+LLM_MAX_PER_SESSION = int(os.getenv("LLM_MAX_PER_SESSION", "2"))
+
+
+def prompt_fingerprint(user_message, products, context) -> str:
+    """Huella de todo lo que entra al prompt: mensaje, contexto y productos."""
+    digest = hashlib.sha1(user_message.strip().encode("utf-8"))
+    digest.update(context_fingerprint(context).encode("ascii"))
+    digest.update(repr(products_snapshot(products)).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class _SharedCall:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Agrupa las llamadas concurrentes con la misma clave: la primera ejecuta
+    la función y las demás esperan su resultado (o su excepción).
+
+    La función corre en una tarea propia de SingleFlight, no en la del
+    primer llamador: si cualquiera de ellos se cancela (p. ej. el cliente se
+    desconectó) los demás siguen esperando, y la llamada solo se cancela
+    cuando ya nadie espera su resultado.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, _SharedCall] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        call = self._calls.get(key)
+        if call is None:
+            call = _SharedCall(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        call.waiters += 1
+        try:
+            # shield: cancelar a quien espera no cancela la llamada compartida
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+    def _forget(self, key: str, call: _SharedCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class LLMConcurrencyLimiter:
+    """
+    Control de admisión de las llamadas al proveedor de IA.
+
+    `slot()` limita las llamadas simultáneas del proceso a `max_concurrency`
+    y deja esperar como mucho `max_queue`; `session_slot()` limita los turnos
+    en curso de una sesión. Al superar cualquiera de los límites se lanza
+    LLMOverloadedError de inmediato en lugar de encolar sin límite.
+    """
+
+    def __init__(self, max_concurrency: int = LLM_MAX_CONCURRENCY, max_queue: int = LLM_MAX_QUEUE,
+                 max_per_session: int = LLM_MAX_PER_SESSION):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_per_session = max_per_session
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._sessions: Dict[str, int] = {}
+        self.in_flight = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.rejected = 0
+
+    def is_full(self) -> bool:
+        return self._semaphore.locked() and self.queued >= self.max_queue
+
+    def session_is_full(self, session_id: str) -> bool:
+        return self._sessions.get(session_id, 0) >= self.max_per_session
+
+    @asynccontextmanager
+    async def slot(self):
+        if self.is_full():
+            self.rejected += 1
+            raise LLMOverloadedError()
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def session_slot(self, session_id: str):
+        if self.session_is_full(session_id):
+            self.rejected += 1
+            raise LLMOverloadedError("Ya hay mensajes en curso para esta sesión, espera la respuesta")
+        self._sessions[session_id] = self._sessions.get(session_id, 0) + 1
+        try:
+            yield
+        finally:
+            remaining = self._sessions[session_id] - 1
+            if remaining:
+                self._sessions[session_id] = remaining
+            else:
+                del self._sessions[session_id]
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "peak_queued": self.peak_queued,
+            "rejected": self.rejected,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+        }
+
+
+class CoalescingLLMService(ILLMProvider):
+    """
+    Decorador de un proveedor de IA que comparte una sola llamada entre las
+    peticiones concurrentes con el mismo prompt y limita las llamadas reales
+    con un LLMConcurrencyLimiter. Las peticiones agrupadas no ocupan hueco.
+
+    El streaming no se agrupa (cada cliente consume su propio stream), pero
+    sí pasa por el limitador.
+    """
+
+    def __init__(self, provider: ILLMProvider, limiter: LLMConcurrencyLimiter,
+                 single_flight: SingleFlight = None):
+        self.provider = provider
+        self.limiter = limiter
+        self.single_flight = single_flight or SingleFlight()
+
+    @property
+    def prompt_block(self):
+        return getattr(self.provider, "prompt_block", None)
+
+    async def generate_response(self, user_message, products, context, catalog_version=None):
+        async def call():
+            async with self.limiter.slot():
+                return await self.provider.generate_response(user_message, products, context, catalog_version)
+
+        key = prompt_fingerprint(user_message, products, context)
+        return await self.single_flight.do(key, call)
+
+    async def stream_response(self, user_message, products, context, catalog_version=None):
+        async with self.limiter.slot():
+            async for chunk in self.provider.stream_response(user_message, products, context, catalog_version):
+                yield chunk
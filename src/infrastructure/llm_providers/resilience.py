@@ -0,0 +1,218 @@
+"""
+Timeouts, reintentos con backoff exponencial y circuit breaker para las
+llamadas a proveedores de IA externos.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Tuple, Type
+
+from src.infrastructure.observability.structured_log import StructuredLogger
+
+# Tiempo máximo de cada intento (y de espera entre fragmentos en streaming)
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+# Tiempo máximo de todos los intentos juntos, incluido el backoff entre ellos
+LLM_TOTAL_TIMEOUT_SECONDS = float(os.getenv("LLM_TOTAL_TIMEOUT_SECONDS", "30"))
+# Reintentos tras el primer intento, solo para errores transitorios
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BASE_DELAY_MS = float(os.getenv("LLM_RETRY_BASE_DELAY_MS", "200"))
+LLM_RETRY_MAX_DELAY_MS = float(os.getenv("LLM_RETRY_MAX_DELAY_MS", "2000"))
+# Fallos consecutivos que abren el circuito y segundos hasta probar de nuevo
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+log = StructuredLogger("src.llm")
+
+
+class CircuitOpenError(Exception):
+    """Se lanza cuando el circuito está abierto y la llamada no se intenta."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de tres estados.
+
+    - closed: las llamadas pasan; `failure_threshold` fallos seguidos lo abren.
+    - open: las llamadas se rechazan sin contactar al proveedor durante
+      `reset_seconds`.
+    - half_open: se deja pasar una sola llamada de prueba; si funciona se
+      cierra, si falla vuelve a abrirse.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds: float = LLM_BREAKER_RESET_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+        self.consecutive_failures = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        """True si la llamada puede intentarse; en half_open solo la de prueba."""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._probe_in_flight = False
+            self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._probe_in_flight or self.consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """
+        Libera la llamada de prueba sin registrar resultado (p. ej. si se
+        canceló): en half_open la siguiente llamada puede probar de nuevo.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self.consecutive_failures,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+            }
+
+    def _current_state(self) -> str:
+        if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            self._state = self.HALF_OPEN
+        return self._state
+
+
+class RetryPolicy:
+    """
+    Reintentos acotados con backoff exponencial y jitter completo:
+    antes del intento n se espera un valor aleatorio en [0, min(max, base * 2^n)].
+    """
+
+    def __init__(self, max_retries: int = LLM_MAX_RETRIES,
+                 base_delay_ms: float = LLM_RETRY_BASE_DELAY_MS,
+                 max_delay_ms: float = LLM_RETRY_MAX_DELAY_MS,
+                 retryable: Tuple[Type[BaseException], ...] = (asyncio.TimeoutError,),
+                 rng: random.Random = None,
+                 sleep: Callable[[float], Awaitable] = asyncio.sleep):
+        self.max_retries = max_retries
+        self.base_delay = base_delay_ms / 1000
+        self.max_delay = max_delay_ms / 1000
+        self.retryable = retryable
+        self._random = rng or random.Random()
+        self._sleep = sleep
+        self.retries = 0
+
+    def backoff(self, attempt: int) -> float:
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def is_retryable(self, error: BaseException) -> bool:
+        return isinstance(error, self.retryable)
+
+    async def run(self, attempt_fn: Callable[[], Awaitable]):
+        """Ejecuta `attempt_fn` y la reintenta ante errores transitorios."""
+        attempt = 0
+        while True:
+            try:
+                return await attempt_fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not self.is_retryable(e):
+                    raise
+            attempt += 1
+            self.retries += 1
+            await self._sleep(self.backoff(attempt - 1))
+
+
+class ResilientCaller:
+    """
+    Combina timeout por intento, presupuesto total, RetryPolicy y
+    CircuitBreaker alrededor de una llamada a un proveedor externo. Solo los errores reintentables
+    (caídas, timeouts, cuota) cuentan como fallos para el circuito; un error
+    del cliente significa que el proveedor respondió.
+    """
+
+    def __init__(self, timeout_seconds: float = LLM_TIMEOUT_SECONDS,
+                 retry_policy: RetryPolicy = None, breaker: CircuitBreaker = None,
+                 total_timeout_seconds: float = LLM_TOTAL_TIMEOUT_SECONDS):
+        self.timeout_seconds = timeout_seconds
+        self.total_timeout_seconds = total_timeout_seconds
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        # Respuestas reemplazadas por el mensaje de disculpa
+        self.fallbacks = 0
+
+    async def call(self, attempt_fn: Callable[[], Awaitable]):
+        """
+        Ejecuta `attempt_fn` con deadline y reintentos.
+        Lanza CircuitOpenError sin intentarlo si el circuito está abierto.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError()
+        try:
+            result = await self.attempts(attempt_fn)
+        except Exception as e:
+            self.record_error(e)
+            raise
+        except BaseException:
+            # Cancelada (p. ej. el cliente se desconectó): no dice nada del proveedor
+            self.breaker.release_probe()
+            raise
+        self.breaker.record_success()
+        return result
+
+    async def attempts(self, attempt_fn: Callable[[], Awaitable]):
+        """
+        Ejecuta `attempt_fn` con deadline por intento y reintentos, todo dentro
+        de `total_timeout_seconds`; no consulta ni actualiza el circuito.
+        """
+        return await asyncio.wait_for(
+            self.retry_policy.run(lambda: asyncio.wait_for(attempt_fn(), self.timeout_seconds)),
+            self.total_timeout_seconds,
+        )
+
+    def record_error(self, error: BaseException) -> None:
+        if self.retry_policy.is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+    def record_fallback(self, error: BaseException, **fields) -> None:
+        """El proveedor respondió con el mensaje de disculpa en vez de una respuesta: se cuenta y se registra."""
+        self.fallbacks += 1
+        log.event(logging.WARNING, "llm.fallback", error_type=type(error).__name__, error=str(error), **fields)
+
+    def stats(self) -> dict:
+        return dict(self.breaker.stats(), retries=self.retry_policy.retries, fallbacks=self.fallbacks)
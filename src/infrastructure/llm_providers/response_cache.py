@@ -0,0 +1,248 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, FrozenSet, Optional, Set, Tuple
+
+from src.domain.llm_provider import ILLMProvider
+from src.infrastructure.llm_providers.gemini_service import FALLBACK_MESSAGE
+from src.infrastructure.search.product_index import tokenize
+
+# Respuestas guardadas como máximo (0 desactiva la caché)
+CHAT_RESPONSE_CACHE_SIZE = int(os.getenv("CHAT_RESPONSE_CACHE_SIZE", "1000"))
+CHAT_RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("CHAT_RESPONSE_CACHE_TTL_SECONDS", "600"))
+# Similitud mínima (Jaccard de trigramas) para reutilizar una pregunta parecida; 0 = solo exactas
+CHAT_RESPONSE_CACHE_SIMILARITY = float(os.getenv("CHAT_RESPONSE_CACHE_SIMILARITY", "0"))
+
+
+def normalize_message(text: str) -> str:
+    """Minúsculas, sin tildes, signos ni stopwords: "¿Tienen Nike talla 42?" -> "nike talla 42"."""
+    return " ".join(tokenize(text))
+
+
+def shingles(normalized: str, n: int = 3) -> FrozenSet[str]:
+    padded = f" {normalized} "
+    if len(padded) <= n:
+        return frozenset({padded})
+    return frozenset(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+def context_fingerprint(context) -> str:
+    """Huella del contexto que ve el LLM: mensajes recientes y resumen."""
+    digest = hashlib.sha1()
+    if hasattr(context, "get_recent_messages"):
+        digest.update((context.summary or "").encode("utf-8"))
+        entries = [(m.role, m.message) for m in context.get_recent_messages()]
+    else:
+        entries = [(e["role"], e["message"]) for e in (context or [])]
+    for role, message in entries:
+        digest.update(f"\0{role}\0{message}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def products_snapshot(products) -> Tuple[Tuple[int, float, int], ...]:
+    """(id, precio, stock) de los productos enviados al LLM, ordenados por ID."""
+    return tuple(sorted((p.id, p.price, p.stock) for p in products))
+
+
+class _CacheEntry:
+    __slots__ = ("response", "created_at", "bucket", "shingles", "products")
+
+    def __init__(self, response, created_at, bucket, shingles, products):
+        self.response = response
+        self.created_at = created_at
+        self.bucket = bucket
+        self.shingles = shingles
+        self.products = products
+
+
+class ChatResponseCache:
+    """
+    LRU con TTL de respuestas del LLM para preguntas repetidas.
+
+    La clave es el mensaje normalizado, la huella del contexto y el
+    (id, precio, stock) de los productos incluidos en el prompt. En vez de la
+    versión global del catálogo, que cambia con cualquier escritura, se usa
+    el estado de los productos referenciados: así un cambio en otro producto
+    no vacía la caché.
+
+    Se registra como listener de ProductCatalogCache y descarta las
+    respuestas cuyos productos cambiaron de precio o stock, o se eliminaron.
+    Con `similarity` > 0 también reutiliza preguntas parecidas (Jaccard de
+    trigramas) que comparten contexto y productos.
+    """
+
+    def __init__(self, max_entries: int = CHAT_RESPONSE_CACHE_SIZE,
+                 ttl_seconds: float = CHAT_RESPONSE_CACHE_TTL_SECONDS,
+                 similarity: float = CHAT_RESPONSE_CACHE_SIMILARITY,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, _CacheEntry]" = OrderedDict()
+        self._buckets: Dict[tuple, Set[tuple]] = {}
+        self._by_product: Dict[int, Set[tuple]] = {}
+        self.hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, user_message: str, context, products) -> Optional[str]:
+        normalized = normalize_message(user_message)
+        bucket = (context_fingerprint(context), products_snapshot(products))
+        with self._lock:
+            key = (normalized,) + bucket
+            entry = self._live(key)
+            if entry is None and self.similarity > 0:
+                key, entry = self._most_similar(normalized, bucket)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if key[0] == normalized:
+                self.hits += 1
+            else:
+                self.similar_hits += 1
+            return entry.response
+
+    def put(self, user_message: str, context, products, response: str) -> None:
+        if self.max_entries <= 0:
+            return
+        normalized = normalize_message(user_message)
+        snapshot = products_snapshot(products)
+        bucket = (context_fingerprint(context), snapshot)
+        key = (normalized,) + bucket
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = _CacheEntry(
+                response, self._clock(), bucket, shingles(normalized),
+                {product_id: (price, stock) for product_id, price, stock in snapshot},
+            )
+            self._buckets.setdefault(bucket, set()).add(key)
+            for product_id, _, _ in snapshot:
+                self._by_product.setdefault(product_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self._by_product.clear()
+
+    # Eventos de ProductCatalogCache
+    def on_catalog_loaded(self, products, version: int) -> None:
+        current = {p.id: p for p in products}
+        with self._lock:
+            for product_id in list(self._by_product):
+                product = current.get(product_id)
+                if product is None:
+                    self._invalidate_product(product_id)
+                else:
+                    self._invalidate_if_changed(product)
+
+    def on_product_saved(self, product, version: int) -> None:
+        with self._lock:
+            self._invalidate_if_changed(product)
+
+    def on_product_removed(self, product_id: int, version: int) -> None:
+        with self._lock:
+            self._invalidate_product(product_id)
+
+    def on_catalog_invalidated(self, version: int) -> None:
+        # Las entradas se comparan con los productos de la próxima recarga
+        # (on_catalog_loaded); hasta entonces cada respuesta ya va atada a
+        # la foto de productos con que se generó
+        pass
+
+    # Métodos auxiliares (llamar con el lock tomado)
+    def _live(self, key) -> Optional[_CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None and self._clock() - entry.created_at >= self.ttl_seconds:
+            self._drop(key)
+            return None
+        return entry
+
+    def _most_similar(self, normalized: str, bucket) -> tuple:
+        query = shingles(normalized)
+        best_key, best_entry, best_score = None, None, self.similarity
+        for key in list(self._buckets.get(bucket, ())):
+            entry = self._live(key)
+            if entry is None:
+                continue
+            score = len(query & entry.shingles) / len(query | entry.shingles)
+            if score >= best_score:
+                best_key, best_entry, best_score = key, entry, score
+        return best_key, best_entry
+
+    def _invalidate_if_changed(self, product) -> None:
+        for key in list(self._by_product.get(product.id, ())):
+            if self._entries[key].products.get(product.id) != (product.price, product.stock):
+                self._drop(key)
+                self.invalidations += 1
+
+    def _invalidate_product(self, product_id: int) -> None:
+        for key in list(self._by_product.get(product_id, ())):
+            self._drop(key)
+            self.invalidations += 1
+
+    def _drop(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._buckets.get(entry.bucket)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._buckets[entry.bucket]
+        for product_id in entry.products:
+            keys = self._by_product.get(product_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_product[product_id]
+
+
+class CachedLLMService(ILLMProvider):
+    """
+    Decorador de un proveedor de IA que responde desde una ChatResponseCache
+    las preguntas repetidas. Los mensajes de error del proveedor no se guardan.
+    """
+
+    def __init__(self, provider: ILLMProvider, cache: ChatResponseCache):
+        self.provider = provider
+        self.cache = cache
+
+    @property
+    def prompt_block(self):
+        return getattr(self.provider, "prompt_block", None)
+
+    async def generate_response(self, user_message, products, context, catalog_version=None):
+        cached = self.cache.get(user_message, context, products)
+        if cached is not None:
+            return cached
+        response = await self.provider.generate_response(user_message, products, context, catalog_version)
+        if response != FALLBACK_MESSAGE:
+            self.cache.put(user_message, context, products, response)
+        return response
+
+    async def stream_response(self, user_message, products, context, catalog_version=None):
+        cached = self.cache.get(user_message, context, products)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        async for chunk in self.provider.stream_response(user_message, products, context, catalog_version):
+            parts.append(chunk)
+            yield chunk
+        response = "".join(parts)
+        if response != FALLBACK_MESSAGE:
+            self.cache.put(user_message, context, products, response)
@@ -0,0 +1,133 @@
+import asyncio
+import math
+import os
+import random
+from typing import Optional
+
+from src.infrastructure.llm_providers.fake_llm_service import FakeLLMService
+from src.infrastructure.llm_providers.gemini_service import FALLBACK_MESSAGE
+from src.infrastructure.llm_providers.resilience import (
+    CircuitBreaker, CircuitOpenError, ResilientCaller, RetryPolicy,
+)
+
+# Latencia hasta el primer token; distribución fixed | uniform | lognormal
+LLM_SIM_LATENCY_MS = float(os.getenv("LLM_SIM_LATENCY_MS", "800"))
+LLM_SIM_LATENCY_DISTRIBUTION = os.getenv("LLM_SIM_LATENCY_DISTRIBUTION", "fixed")
+# uniform: ± jitter; lognormal: desviación estándar aproximada
+LLM_SIM_LATENCY_JITTER_MS = float(os.getenv("LLM_SIM_LATENCY_JITTER_MS", "200"))
+# Velocidad de generación después del primer token (0 = instantánea)
+LLM_SIM_TOKENS_PER_SECOND = float(os.getenv("LLM_SIM_TOKENS_PER_SECOND", "50"))
+# Fracción de intentos que fallan con un error transitorio (se reintentan)
+LLM_SIM_ERROR_RATE = float(os.getenv("LLM_SIM_ERROR_RATE", "0"))
+LLM_SIM_SEED = os.getenv("LLM_SIM_SEED")
+
+
+class SimulatedUpstreamError(Exception):
+    """Fallo transitorio inyectado por SimulatedLLMService."""
+
+
+class SimulatedLLMService(FakeLLMService):
+    """
+    Proveedor simulado para pruebas de carga sin red: misma respuesta
+    determinista que FakeLLMService, pero con la latencia, la velocidad de
+    tokens y la tasa de error configuradas. Los fallos pasan por el mismo
+    ResilientCaller que GeminiService (timeout, reintentos y circuit breaker),
+    así que también sirve para probar esos caminos sin red.
+    """
+
+    def __init__(self, latency_ms: float = LLM_SIM_LATENCY_MS,
+                 distribution: str = LLM_SIM_LATENCY_DISTRIBUTION,
+                 jitter_ms: float = LLM_SIM_LATENCY_JITTER_MS,
+                 tokens_per_second: float = LLM_SIM_TOKENS_PER_SECOND,
+                 error_rate: float = LLM_SIM_ERROR_RATE,
+                 seed: Optional[int] = LLM_SIM_SEED, breaker: CircuitBreaker = None,
+                 caller: ResilientCaller = None):
+        super().__init__()
+        if distribution not in ("fixed", "uniform", "lognormal"):
+            raise ValueError(f"Distribución de latencia desconocida: {distribution}")
+        self.latency_ms = latency_ms
+        self.distribution = distribution
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self._random = random.Random(int(seed) if seed is not None else None)
+        self.in_flight = 0
+        self.errors = 0
+        self.caller = caller or ResilientCaller(
+            retry_policy=RetryPolicy(retryable=(asyncio.TimeoutError, SimulatedUpstreamError)),
+            breaker=breaker,
+        )
+
+    def sample_latency(self) -> float:
+        """Latencia hasta el primer token, en segundos."""
+        if self.distribution == "uniform":
+            ms = self._random.uniform(self.latency_ms - self.jitter_ms, self.latency_ms + self.jitter_ms)
+        elif self.distribution == "lognormal" and self.latency_ms > 0:
+            # Parámetros de la normal subyacente para la media y desviación pedidas
+            variance = (self.jitter_ms / self.latency_ms) ** 2
+            sigma = math.sqrt(math.log1p(variance))
+            mu = math.log(self.latency_ms) - sigma ** 2 / 2
+            ms = self._random.lognormvariate(mu, sigma)
+        else:
+            ms = self.latency_ms
+        return max(0.0, ms) / 1000
+
+    def _token_delay(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    async def generate_response(self, user_message, products, context, catalog_version=None):
+        self.calls += 1
+        try:
+            return await self.caller.call(lambda: self._complete(user_message, products))
+        except Exception as e:
+            self.caller.record_fallback(e, provider="simulated")
+            return FALLBACK_MESSAGE
+
+    async def stream_response(self, user_message, products, context, catalog_version=None):
+        self.calls += 1
+        if not self.caller.breaker.allow():
+            self.caller.record_fallback(CircuitOpenError(), provider="simulated", stream=True)
+            yield FALLBACK_MESSAGE
+            return
+        try:
+            # Igual que GeminiService: solo se reintenta hasta el primer token
+            await self.caller.attempts(self._first_token)
+        except Exception as e:
+            self.caller.record_error(e)
+            self.caller.record_fallback(e, provider="simulated", stream=True)
+            yield FALLBACK_MESSAGE
+            return
+        except BaseException:
+            # Desconexión antes del primer token: se libera la llamada de prueba
+            self.caller.breaker.release_probe()
+            raise
+        self.caller.breaker.record_success()
+        self.in_flight += 1
+        try:
+            words = self.reply_for(user_message, products).split(" ")
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(self._token_delay())
+                yield word if i == 0 else " " + word
+        finally:
+            self.in_flight -= 1
+
+    async def _complete(self, user_message, products):
+        reply = self.reply_for(user_message, products)
+        await self._first_token()
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self._token_delay() * len(reply.split(" ")))
+        finally:
+            self.in_flight -= 1
+        return reply
+
+    async def _first_token(self):
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self.sample_latency())
+            if self._random.random() < self.error_rate:
+                self.errors += 1
+                raise SimulatedUpstreamError("Error simulado del proveedor")
+        finally:
+            self.in_flight -= 1
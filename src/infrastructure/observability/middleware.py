@@ -0,0 +1,64 @@
+import logging
+import time
+from typing import Callable, Optional
+
+from src.infrastructure.observability.metrics import Histogram
+from src.infrastructure.observability.structured_log import StructuredLogger, LOG_SLOW_REQUEST_MS
+
+
+def route_template(scope) -> str:
+    """
+    Ruta con los parámetros sustituidos por su nombre (/products/{product_id}),
+    para que las etiquetas de las métricas no crezcan con cada ID.
+    """
+    if "endpoint" not in scope:
+        return "unmatched"
+    names = {str(value): f"{{{name}}}" for name, value in scope.get("path_params", {}).items()}
+    if not names:
+        return scope["path"]
+    return "/".join(names.get(segment, segment) for segment in scope["path"].split("/"))
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware ASGI que mide cada petición HTTP hasta el último byte de la
+    respuesta (en streaming, hasta el final del stream). Las peticiones se
+    registran muestreadas y las lentas siempre.
+
+    `histogram_for(scope)` retorna el histograma donde anotar la duración
+    (o None): los middlewares se montan antes del lifespan que crea las métricas.
+    """
+
+    def __init__(self, app, histogram_for: Callable[[dict], Optional[Histogram]],
+                 logger: StructuredLogger, slow_ms: float = LOG_SLOW_REQUEST_MS):
+        self.app = app
+        self.histogram_for = histogram_for
+        self.logger = logger
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = route_template(scope)
+            histogram = self.histogram_for(scope)
+            if histogram is not None:
+                histogram.observe(elapsed, method=scope["method"], route=route, status=status["code"])
+            fields = dict(method=scope["method"], route=route, status=status["code"],
+                          duration_ms=round(elapsed * 1000, 1))
+            if elapsed * 1000 >= self.slow_ms:
+                self.logger.event(logging.WARNING, "http.slow_request", **fields)
+            else:
+                self.logger.sampled(logging.INFO, "http.request", **fields)
@@ -0,0 +1,69 @@
+"""
+Logging estructurado (una línea JSON por evento) con muestreo.
+
+Los eventos por petición se registran con `sampled()`: primero se comprueba
+el nivel y después la tasa de muestreo, así que con el nivel desactivado no
+se formatea nada. Los errores y las peticiones lentas usan `event()` y se
+registran siempre.
+"""
+import json
+import logging
+import os
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Callable
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# Fracción de los eventos por petición que se registran (0 = ninguno, 1 = todos)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+# Las peticiones y turnos de chat más lentos que esto se registran siempre
+LOG_SLOW_REQUEST_MS = float(os.getenv("LOG_SLOW_REQUEST_MS", "2000"))
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        payload.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def configure_logging(level: str = LOG_LEVEL) -> None:
+    """
+    Nivel global y salida JSON a stderr. Si el proceso ya configuró
+    handlers (uvicorn --log-config, pytest) se respetan y solo se fija el nivel.
+    """
+    root = logging.getLogger()
+    root.setLevel(level)
+    if not root.handlers:
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(JsonFormatter())
+        root.addHandler(handler)
+
+
+class StructuredLogger:
+    """Envoltorio de logging.Logger que recibe el evento y sus campos por separado."""
+
+    def __init__(self, name: str, sample_rate: float = LOG_SAMPLE_RATE,
+                 rng: Callable[[], float] = random.random):
+        self.logger = logging.getLogger(name)
+        self.sample_rate = sample_rate
+        self._rng = rng
+
+    def event(self, level: int, event: str, **fields) -> None:
+        if self.logger.isEnabledFor(level):
+            self.logger.log(level, event, extra={"fields": fields})
+
+    def sampled(self, level: int, event: str, **fields) -> None:
+        if self.logger.isEnabledFor(level) and self._rng() < self.sample_rate:
+            self.logger.log(level, event, extra={"fields": dict(fields, sampled=self.sample_rate)})
+
+    def exception(self, event: str, **fields) -> None:
+        self.logger.error(event, exc_info=True, extra={"fields": fields})
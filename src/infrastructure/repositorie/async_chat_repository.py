@@ -0,0 +1,58 @@
+from dataclasses import replace
+from typing import List
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import ChatMessage
+from src.infrastructure.db.models import ChatMemoryModel, ChatSummaryModel
+from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+
+
+class AsyncSQLChatRepository:
+    """
+    Variante asíncrona de SQLChatRepository sobre AsyncSession.
+    Expone los mismos métodos que IChatRepository, pero como corrutinas.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def save_message(self, message: ChatMessage):
+        model = self._entity_to_model(message)
+        self.db.add(model)
+        await self.db.commit()
+        await self.db.refresh(model)
+        return self._model_to_entity(model)
+
+    async def save_messages(self, messages: List[ChatMessage]):
+        models = [self._entity_to_model(m) for m in messages]
+        self.db.add_all(models)
+        await self.db.flush()
+        ids = [m.id for m in models]
+        await self.db.commit()
+        return [replace(msg, id=msg_id) for msg, msg_id in zip(messages, ids)]
+
+    async def get_session_history(self, session_id: str, limit: int = 50):
+        return await self._latest(session_id, limit)
+
+    async def delete_session_history(self, session_id: str):
+        result = await self.db.execute(
+            delete(ChatMemoryModel).where(ChatMemoryModel.session_id == session_id)
+        )
+        await self.db.execute(delete(ChatSummaryModel).where(ChatSummaryModel.session_id == session_id))
+        await self.db.commit()
+        return result.rowcount
+
+    async def get_recent_messages(self, session_id: str, n: int):
+        return await self._latest(session_id, n)
+
+    # Métodos auxiliares (mismo mapeo que el repositorio síncrono)
+    async def _latest(self, session_id: str, limit: int):
+        result = await self.db.execute(SQLChatRepository.latest_messages_query(session_id, limit))
+        rows = result.all()
+        rows.reverse()
+        return [ChatMessage.from_row(row) for row in rows]
+
+    _model_to_entity = SQLChatRepository._model_to_entity
+    _entity_to_model = SQLChatRepository._entity_to_model
@@ -0,0 +1,27 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import ChatSummary
+from src.infrastructure.db.models import ChatSummaryModel
+from src.infrastructure.repositorie.chat_summary_repository import SQLChatSummaryRepository
+
+
+class AsyncSQLChatSummaryRepository:
+    """
+    Variante asíncrona de SQLChatSummaryRepository sobre AsyncSession.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(self, session_id: str):
+        model = await self.db.get(ChatSummaryModel, session_id)
+        return self._model_to_entity(model)
+
+    async def save(self, summary: ChatSummary):
+        await self.db.merge(self._entity_to_model(summary))
+        await self.db.commit()
+        return summary
+
+    # Métodos auxiliares (mismo mapeo que el repositorio síncrono)
+    _model_to_entity = SQLChatSummaryRepository._model_to_entity
+    _entity_to_model = SQLChatSummaryRepository._entity_to_model
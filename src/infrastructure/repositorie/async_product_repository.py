@@ -0,0 +1,84 @@
+from typing import Any, Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.entities import Product
+from src.infrastructure.db.models import ProductModel
+from src.infrastructure.repositorie.product_repository import SQLProductRepository, ENTITY_COLUMNS
+
+
+class AsyncSQLProductRepository:
+    """
+    Variante asíncrona de SQLProductRepository sobre AsyncSession.
+    Expone los mismos métodos que IProductRepository, pero como corrutinas.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_all(self):
+        return await self._fetch(select(*ENTITY_COLUMNS))
+
+    async def get_by_id(self, product_id: int):
+        result = await self.db.execute(select(*ENTITY_COLUMNS).where(ProductModel.id == product_id))
+        row = result.first()
+        return Product.from_row(row) if row else None
+
+    async def get_by_brand(self, brand: str):
+        return await self._fetch(select(*ENTITY_COLUMNS).where(ProductModel.brand == brand))
+
+    async def get_by_category(self, category: str):
+        return await self._fetch(select(*ENTITY_COLUMNS).where(ProductModel.category == category))
+
+    async def search(self, filters: Dict[str, Any], limit: Optional[int] = None,
+                     offset: int = 0, after_id: Optional[int] = None):
+        stmt = SQLProductRepository.build_search_query(select(*ENTITY_COLUMNS), filters, limit, offset, after_id)
+        return await self._fetch(stmt)
+
+    async def save(self, product: Product):
+        if product.id:
+            # Actualizar producto existente: un UPDATE ... RETURNING, sin leer la fila
+            return await self.update_fields(product.id, SQLProductRepository._entity_values(product))
+        model = self._entity_to_model(product)
+        self.db.add(model)
+        await self.db.flush()  # Para generar el id
+        product.id = model.id
+        await self.db.commit()
+        return self._model_to_entity(model)
+
+    async def update_fields(self, product_id: int, changes: Dict[str, Any],
+                            expected_version: Optional[int] = None) -> Optional[Product]:
+        """
+        Igual que SQLProductRepository.update_fields: un único UPDATE ...
+        RETURNING de las columnas de `changes` que incrementa `version` y,
+        con `expected_version`, lanza ProductVersionConflictError si la fila
+        cambió. Retorna el producto actualizado o None si no existe.
+        """
+        stmt = SQLProductRepository.build_update_statement(product_id, changes, expected_version)
+        current_version = None
+        try:
+            row = (await self.db.execute(stmt)).first()
+            if row is None and expected_version is not None:
+                current_version = (await self.db.execute(SQLProductRepository.version_query(product_id))).scalar()
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        return SQLProductRepository.updated_product(row, product_id, expected_version, current_version)
+
+    async def delete(self, product_id: int):
+        model = await self.db.get(ProductModel, product_id)
+        if model:
+            await self.db.delete(model)
+            await self.db.commit()
+            return True
+        return False
+
+    # Métodos auxiliares (mismo mapeo que el repositorio síncrono)
+    async def _fetch(self, stmt):
+        result = await self.db.execute(stmt)
+        return [Product.from_row(row) for row in result]
+
+    _model_to_entity = SQLProductRepository._model_to_entity
+    _entity_to_model = SQLProductRepository._entity_to_model
@@ -0,0 +1,387 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional
+
+from src.domain.entities import ChatMessage, ChatSummary
+from src.domain.repositories import IChatRepository, IChatSummaryRepository
+
+# Mensajes recientes que se guardan por sesión (cubre el contexto de /chat)
+CHAT_CONTEXT_CACHE_MESSAGES = int(os.getenv("CHAT_CONTEXT_CACHE_MESSAGES", "20"))
+# Una sesión sin actividad durante este tiempo se descarta
+CHAT_CONTEXT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CONTEXT_CACHE_TTL_SECONDS", "900"))
+CHAT_CONTEXT_CACHE_MAX_BYTES = int(os.getenv("CHAT_CONTEXT_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Costo aproximado de una entidad ChatMessage sin contar el texto
+_MESSAGE_OVERHEAD_BYTES = 400
+
+# Marca un resumen que todavía no se leyó de la BD (None significa "no tiene")
+_UNSET = object()
+
+
+class _SessionEntry:
+    __slots__ = ("messages", "complete", "size", "last_access", "summary")
+
+    def __init__(self, max_messages: int, now: float):
+        self.messages = deque(maxlen=max_messages)
+        # True si `messages` contiene todo el historial de la sesión
+        self.complete = False
+        self.size = 0
+        self.last_access = now
+        self.summary = _UNSET
+
+
+class SessionContextCache:
+    """
+    LRU en memoria de los últimos mensajes de cada sesión activa.
+
+    Cada sesión guarda una deque acotada a `max_messages`. Las sesiones
+    inactivas más de `ttl_seconds` expiran, y si el tamaño estimado supera
+    `max_bytes` se descartan las sesiones usadas hace más tiempo.
+
+    Una lectura de la BD para llenar la caché se abre con `begin_fill`, que
+    retorna la generación de la sesión; `append`, `invalidate` y las
+    escrituras del resumen la incrementan, y `fill` (o `set_summary` con
+    generación) descarta la foto si cambió mientras se leía (otro turno
+    guardó mensajes o se borró el historial).
+    """
+
+    def __init__(self, max_messages: int = CHAT_CONTEXT_CACHE_MESSAGES,
+                 ttl_seconds: float = CHAT_CONTEXT_CACHE_TTL_SECONDS,
+                 max_bytes: int = CHAT_CONTEXT_CACHE_MAX_BYTES,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, _SessionEntry]" = OrderedDict()
+        # Sesiones con lecturas de la BD en curso: [generación, lectores]
+        self._fills: Dict[str, List[int]] = {}
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str, count: int) -> Optional[List[ChatMessage]]:
+        """
+        Retorna los últimos `count` mensajes en orden cronológico,
+        o None si la caché no puede responder sin ir a la BD.
+        """
+        with self._lock:
+            entry = self._touch(session_id)
+            if entry is None or count > self.max_messages or (
+                    not entry.complete and len(entry.messages) < count):
+                self.misses += 1
+                return None
+            self.hits += 1
+            messages = list(entry.messages)
+            return messages[-count:] if count > 0 else []
+
+    def begin_fill(self, session_id: str) -> int:
+        """Registra una lectura de la BD en curso; retorna la generación para `fill`."""
+        with self._lock:
+            state = self._fills.setdefault(session_id, [0, 0])
+            state[1] += 1
+            return state[0]
+
+    def cancel_fill(self, session_id: str) -> None:
+        """Cierra una lectura iniciada con `begin_fill` que no llegó a `fill`."""
+        with self._lock:
+            self._end_fill(session_id)
+
+    def fill(self, session_id: str, messages: List[ChatMessage], complete: bool,
+             generation: Optional[int] = None) -> None:
+        """
+        Guarda los mensajes leídos de la BD; `complete` si son todo el historial.
+        Con `generation` (de `begin_fill`) no hace nada si la sesión cambió
+        desde que empezó la lectura.
+        """
+        with self._lock:
+            if generation is not None and self._end_fill(session_id) != generation:
+                return
+            previous = self._sessions.get(session_id)
+            self._drop(session_id)
+            entry = _SessionEntry(self.max_messages, self._clock())
+            if previous is not None:
+                entry.summary = previous.summary
+                self._account(entry, self._summary_size(entry.summary))
+            self._sessions[session_id] = entry
+            self._extend(entry, messages)
+            entry.complete = complete and len(messages) <= self.max_messages
+            self._evict()
+
+    def append(self, session_id: str, messages: List[ChatMessage]) -> None:
+        """Agrega mensajes recién guardados; crea la sesión si no existía."""
+        with self._lock:
+            self._changed(session_id)
+            entry = self._touch(session_id)
+            if entry is None:
+                entry = _SessionEntry(self.max_messages, self._clock())
+                self._sessions[session_id] = entry
+            self._extend(entry, messages)
+            self._evict()
+
+    def get_summary(self, session_id: str):
+        """Retorna (True, resumen o None) si se conoce, (False, None) si hay que leerlo."""
+        with self._lock:
+            entry = self._touch(session_id)
+            if entry is None or entry.summary is _UNSET:
+                return False, None
+            return True, entry.summary
+
+    def set_summary(self, session_id: str, summary: Optional[ChatSummary],
+                    generation: Optional[int] = None) -> None:
+        """
+        Guarda el resumen de la sesión. Con `generation` (de `begin_fill`) es
+        el resultado de una lectura de la BD y se descarta si la sesión cambió
+        mientras se leía; sin ella es una escritura y cuenta como cambio.
+        """
+        with self._lock:
+            if generation is None:
+                self._changed(session_id)
+            elif self._end_fill(session_id) != generation:
+                return
+            entry = self._touch(session_id)
+            if entry is None:
+                entry = _SessionEntry(self.max_messages, self._clock())
+                self._sessions[session_id] = entry
+            delta = self._summary_size(summary) - self._summary_size(entry.summary)
+            entry.summary = summary
+            self._account(entry, delta)
+            self._evict()
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._changed(session_id)
+            self._drop(session_id)
+
+    # Métodos auxiliares (llamar con el lock tomado)
+    def _changed(self, session_id: str) -> None:
+        state = self._fills.get(session_id)
+        if state is not None:
+            state[0] += 1
+
+    def _end_fill(self, session_id: str) -> Optional[int]:
+        """Quita un lector; retorna la generación actual de la sesión."""
+        state = self._fills.get(session_id)
+        if state is None:
+            return None
+        state[1] -= 1
+        if not state[1]:
+            del self._fills[session_id]
+        return state[0]
+
+    def _touch(self, session_id: str) -> Optional[_SessionEntry]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        now = self._clock()
+        if now - entry.last_access >= self.ttl_seconds:
+            self._drop(session_id)
+            return None
+        entry.last_access = now
+        self._sessions.move_to_end(session_id)
+        return entry
+
+    def _extend(self, entry: _SessionEntry, messages: List[ChatMessage]) -> None:
+        for message in messages:
+            if len(entry.messages) == entry.messages.maxlen:
+                dropped = entry.messages.popleft()
+                entry.complete = False
+                self._account(entry, -self._estimate(dropped))
+            entry.messages.append(message)
+            self._account(entry, self._estimate(message))
+
+    def _account(self, entry: _SessionEntry, delta: int) -> None:
+        entry.size += delta
+        self.size_bytes += delta
+
+    def _drop(self, session_id: str) -> None:
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self.size_bytes -= entry.size
+
+    def _evict(self) -> None:
+        now = self._clock()
+        # Primero las sesiones expiradas al inicio del LRU, luego por presupuesto
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            expired = now - entry.last_access >= self.ttl_seconds
+            if not expired and self.size_bytes <= self.max_bytes:
+                break
+            self._drop(session_id)
+            self.evictions += 1
+
+    @staticmethod
+    def _estimate(message: ChatMessage) -> int:
+        return _MESSAGE_OVERHEAD_BYTES + sys.getsizeof(message.message)
+
+    @staticmethod
+    def _summary_size(summary) -> int:
+        if summary is _UNSET or summary is None:
+            return 0
+        return _MESSAGE_OVERHEAD_BYTES + sys.getsizeof(summary.summary)
+
+
+class CachedChatRepository(IChatRepository):
+    """
+    Decorador de IChatRepository que responde el contexto reciente de las
+    sesiones activas desde una SessionContextCache. Las escrituras pasan al
+    repositorio envuelto y luego se agregan a la caché.
+
+    Los mensajes retornados se comparten con la caché: son de solo lectura.
+    """
+
+    def __init__(self, repository: IChatRepository, cache: SessionContextCache):
+        self.repository = repository
+        self.cache = cache
+
+    def save_message(self, message: ChatMessage):
+        saved = self.repository.save_message(message)
+        self.cache.append(saved.session_id, [saved])
+        return saved
+
+    def save_messages(self, messages: List[ChatMessage]):
+        saved = self.repository.save_messages(messages)
+        for session_id in dict.fromkeys(m.session_id for m in saved):
+            self.cache.append(session_id, [m for m in saved if m.session_id == session_id])
+        return saved
+
+    def get_session_history(self, session_id: str, limit: Optional[int] = None):
+        if limit is None or limit > self.cache.max_messages:
+            return self.repository.get_session_history(session_id, limit)
+        return self.get_recent_messages(session_id, limit)
+
+    def delete_session_history(self, session_id: str):
+        deleted = self.repository.delete_session_history(session_id)
+        self.cache.invalidate(session_id)
+        return deleted
+
+    def get_recent_messages(self, session_id: str, count: int):
+        cached = self.cache.get(session_id, count)
+        if cached is not None:
+            return cached
+        if count > self.cache.max_messages:
+            return self.repository.get_recent_messages(session_id, count)
+        # Se lee la ventana completa para que los próximos turnos no vayan a la BD
+        generation = self.cache.begin_fill(session_id)
+        try:
+            messages = self.repository.get_recent_messages(session_id, self.cache.max_messages)
+        except BaseException:
+            self.cache.cancel_fill(session_id)
+            raise
+        self.cache.fill(session_id, messages, complete=len(messages) < self.cache.max_messages,
+                        generation=generation)
+        return messages[-count:] if count > 0 else []
+
+
+class AsyncCachedChatRepository:
+    """
+    Equivalente asíncrono de CachedChatRepository para envolver
+    AsyncSQLChatRepository; comparte la misma SessionContextCache.
+    """
+
+    def __init__(self, repository, cache: SessionContextCache):
+        self.repository = repository
+        self.cache = cache
+
+    async def save_message(self, message: ChatMessage):
+        saved = await self.repository.save_message(message)
+        self.cache.append(saved.session_id, [saved])
+        return saved
+
+    async def save_messages(self, messages: List[ChatMessage]):
+        saved = await self.repository.save_messages(messages)
+        for session_id in dict.fromkeys(m.session_id for m in saved):
+            self.cache.append(session_id, [m for m in saved if m.session_id == session_id])
+        return saved
+
+    async def get_session_history(self, session_id: str, limit: Optional[int] = None):
+        if limit is None or limit > self.cache.max_messages:
+            return await self.repository.get_session_history(session_id, limit)
+        return await self.get_recent_messages(session_id, limit)
+
+    async def delete_session_history(self, session_id: str):
+        deleted = await self.repository.delete_session_history(session_id)
+        self.cache.invalidate(session_id)
+        return deleted
+
+    async def get_recent_messages(self, session_id: str, count: int):
+        cached = self.cache.get(session_id, count)
+        if cached is not None:
+            return cached
+        if count > self.cache.max_messages:
+            return await self.repository.get_recent_messages(session_id, count)
+        # Otro turno de la sesión puede guardar mensajes durante el await:
+        # fill descarta la foto si la sesión cambió
+        generation = self.cache.begin_fill(session_id)
+        try:
+            messages = await self.repository.get_recent_messages(session_id, self.cache.max_messages)
+        except BaseException:
+            self.cache.cancel_fill(session_id)
+            raise
+        self.cache.fill(session_id, messages, complete=len(messages) < self.cache.max_messages,
+                        generation=generation)
+        return messages[-count:] if count > 0 else []
+
+
+class CachedChatSummaryRepository(IChatSummaryRepository):
+    """
+    Decorador de IChatSummaryRepository que guarda el resumen de cada sesión
+    activa en la misma SessionContextCache que sus mensajes.
+    """
+
+    def __init__(self, repository: IChatSummaryRepository, cache: SessionContextCache):
+        self.repository = repository
+        self.cache = cache
+
+    def get(self, session_id: str):
+        found, summary = self.cache.get_summary(session_id)
+        if not found:
+            generation = self.cache.begin_fill(session_id)
+            try:
+                summary = self.repository.get(session_id)
+            except BaseException:
+                self.cache.cancel_fill(session_id)
+                raise
+            self.cache.set_summary(session_id, summary, generation=generation)
+        return summary
+
+    def save(self, summary: ChatSummary):
+        saved = self.repository.save(summary)
+        self.cache.set_summary(saved.session_id, saved)
+        return saved
+
+
+class AsyncCachedChatSummaryRepository:
+    """
+    Equivalente asíncrono de CachedChatSummaryRepository.
+    """
+
+    def __init__(self, repository, cache: SessionContextCache):
+        self.repository = repository
+        self.cache = cache
+
+    async def get(self, session_id: str):
+        found, summary = self.cache.get_summary(session_id)
+        if not found:
+            # Un borrado del historial durante el await no debe revivir el resumen
+            generation = self.cache.begin_fill(session_id)
+            try:
+                summary = await self.repository.get(session_id)
+            except BaseException:
+                self.cache.cancel_fill(session_id)
+                raise
+            self.cache.set_summary(session_id, summary, generation=generation)
+        return summary
+
+    async def save(self, summary: ChatSummary):
+        saved = await self.repository.save(summary)
+        self.cache.set_summary(saved.session_id, saved)
+        return saved
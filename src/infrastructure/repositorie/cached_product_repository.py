@@ -0,0 +1,293 @@
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from src.domain.entities import Product
+from src.domain.repositories import IProductRepository
+
+# Segundos que una copia del catálogo se considera vigente (0 desactiva la caché)
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "300"))
+
+
+class ProductCatalogCache:
+    """
+    Copia en memoria del catálogo de productos, compartida por todo el proceso.
+
+    Guarda los productos indexados por ID junto con un contador de versión
+    que aumenta con cada recarga o escritura. La copia expira tras `ttl_seconds`
+    para recoger cambios hechos por otros procesos.
+
+    Los listeners registrados con `add_listener` reciben cada cambio con la
+    nueva versión: `on_catalog_loaded(products, version)`,
+    `on_product_saved(product, version)`, `on_product_removed(product_id, version)`
+    y `on_catalog_invalidated(version)`.
+    """
+
+    def __init__(self, ttl_seconds: float = PRODUCT_CACHE_TTL_SECONDS,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._products: Dict[int, Product] = {}
+        self._all: Optional[List[Product]] = None
+        self._by_brand: Optional[Dict[str, List[Product]]] = None
+        self._by_category: Optional[Dict[str, List[Product]]] = None
+        self._loaded_at: Optional[float] = None
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self._listeners = []
+
+    def add_listener(self, listener) -> None:
+        """Registra un objeto que se mantiene sincronizado con el catálogo."""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._loaded_at is not None:
+                listener.on_catalog_loaded(self.get_all(), self.version)
+
+    def is_fresh(self) -> bool:
+        """Retorna True si hay una copia cargada y no ha expirado."""
+        with self._lock:
+            if self._loaded_at is None or self.ttl_seconds <= 0:
+                return False
+            return self._clock() - self._loaded_at < self.ttl_seconds
+
+    def load(self, products: List[Product], expected_version: Optional[int] = None) -> bool:
+        """
+        Reemplaza la copia completa con los productos leídos de la BD.
+        Con `expected_version` (la versión tomada antes de la consulta) no
+        hace nada si hubo escrituras mientras se leía, para no pisar datos
+        más nuevos con la foto. Retorna True si se cargó.
+        """
+        with self._lock:
+            if expected_version is not None and expected_version != self.version:
+                return False
+            self._products = {p.id: p for p in products}
+            self._reset_views()
+            self._loaded_at = self._clock()
+            self.version += 1
+            for listener in self._listeners:
+                listener.on_catalog_loaded(self.get_all(), self.version)
+            return True
+
+    def upsert(self, product: Product) -> None:
+        """
+        Inserta o reemplaza un producto tras una escritura confirmada. Si la
+        copia ya tiene una versión posterior del producto (otra escritura
+        concurrente se aplicó antes), se descarta.
+        """
+        with self._lock:
+            current = self._products.get(product.id)
+            if current is not None and current.version > product.version:
+                return
+            self._products[product.id] = copy.copy(product)
+            self._reset_views()
+            self.version += 1
+            for listener in self._listeners:
+                listener.on_product_saved(product, self.version)
+
+    def remove(self, product_id: int) -> None:
+        """Quita un producto eliminado de la copia."""
+        with self._lock:
+            self._products.pop(product_id, None)
+            self._reset_views()
+            self.version += 1
+            for listener in self._listeners:
+                listener.on_product_removed(product_id, self.version)
+
+    def invalidate(self) -> None:
+        """Marca la copia como expirada; la próxima lectura recarga desde la BD."""
+        with self._lock:
+            self._loaded_at = None
+            self.version += 1
+            for listener in self._listeners:
+                listener.on_catalog_invalidated(self.version)
+
+    def get_all(self) -> List[Product]:
+        with self._lock:
+            if self._all is None:
+                self._all = sorted(self._products.values(), key=lambda p: p.id)
+            return list(self._all)
+
+    def get(self, product_id: int) -> Optional[Product]:
+        with self._lock:
+            product = self._products.get(product_id)
+            # Copia para que las mutaciones del llamador no alteren la caché
+            return copy.copy(product) if product else None
+
+    def get_by_brand(self, brand: str) -> List[Product]:
+        with self._lock:
+            if self._by_brand is None:
+                self._by_brand = self._group_by("brand")
+            return list(self._by_brand.get(brand, []))
+
+    def get_by_category(self, category: str) -> List[Product]:
+        with self._lock:
+            if self._by_category is None:
+                self._by_category = self._group_by("category")
+            return list(self._by_category.get(category, []))
+
+    # Métodos auxiliares
+    def _group_by(self, attribute: str) -> Dict[str, List[Product]]:
+        groups: Dict[str, List[Product]] = {}
+        for product in self.get_all():
+            groups.setdefault(getattr(product, attribute), []).append(product)
+        return groups
+
+    def _reset_views(self) -> None:
+        self._all = None
+        self._by_brand = None
+        self._by_category = None
+
+
+def _loaded(cache: ProductCatalogCache, products: List[Product], version: int) -> ProductCatalogCache:
+    """Carga `products` en `cache` si sigue en `version`; si no, en una copia de un solo uso."""
+    if cache.load(products, expected_version=version):
+        return cache
+    snapshot = ProductCatalogCache(ttl_seconds=0)
+    snapshot.load(products)
+    return snapshot
+
+
+class CachedProductRepository(IProductRepository):
+    """
+    Decorador de IProductRepository que sirve las lecturas desde una
+    ProductCatalogCache y aplica las escrituras al repositorio envuelto
+    antes de actualizar la caché (write-through).
+
+    Las listas retornadas comparten las entidades de la caché y deben
+    tratarse como de solo lectura; get_by_id retorna una copia.
+    """
+
+    def __init__(self, repository: IProductRepository, cache: ProductCatalogCache):
+        self.repository = repository
+        self.cache = cache
+
+    def get_all(self):
+        return self._catalog().get_all()
+
+    def get_by_id(self, product_id: int):
+        return self._catalog().get(product_id)
+
+    def get_by_brand(self, brand: str):
+        return self._catalog().get_by_brand(brand)
+
+    def get_by_category(self, category: str):
+        return self._catalog().get_by_category(category)
+
+    def search(self, filters: Dict[str, Any], limit: Optional[int] = None,
+               offset: int = 0, after_id: Optional[int] = None):
+        # La búsqueda paginada se resuelve con los índices de la BD
+        return self.repository.search(filters, limit, offset, after_id)
+
+    def save(self, product: Product):
+        saved = self.repository.save(product)
+        if saved is not None:
+            self.cache.upsert(saved)
+        return saved
+
+    def update_fields(self, product_id: int, changes: Dict[str, Any],
+                      expected_version: Optional[int] = None):
+        updated = self.repository.update_fields(product_id, changes, expected_version)
+        if updated is not None:
+            self.cache.upsert(updated)
+        return updated
+
+    def delete(self, product_id: int):
+        deleted = self.repository.delete(product_id)
+        if deleted:
+            self.cache.remove(product_id)
+        return deleted
+
+    def bulk_upsert(self, products: List[Product]) -> int:
+        written = self.repository.bulk_upsert(products)
+        # Un lote puede tocar miles de productos: se recarga el catálogo completo
+        self.cache.invalidate()
+        return written
+
+    def reserve_stock(self, product_id: int, quantity: int) -> Product:
+        product = self.repository.reserve_stock(product_id, quantity)
+        self.cache.upsert(product)
+        return product
+
+    def release_stock(self, product_id: int, quantity: int) -> Product:
+        product = self.repository.release_stock(product_id, quantity)
+        self.cache.upsert(product)
+        return product
+
+    def bulk_reserve(self, items: Dict[int, int]) -> Dict[int, Product]:
+        reserved = self.repository.bulk_reserve(items)
+        for product in reserved.values():
+            self.cache.upsert(product)
+        return reserved
+
+    # Métodos auxiliares
+    def _catalog(self) -> ProductCatalogCache:
+        """
+        La caché compartida, recargándola si expiró. Si otra escritura la
+        cambió durante la lectura, la foto no se guarda y esta llamada se
+        responde con una copia aparte.
+        """
+        if self.cache.is_fresh():
+            self.cache.hits += 1
+            return self.cache
+        self.cache.misses += 1
+        version = self.cache.version
+        return _loaded(self.cache, self.repository.get_all(), version)
+
+
+class AsyncCachedProductRepository:
+    """
+    Equivalente asíncrono de CachedProductRepository para envolver
+    AsyncSQLProductRepository; comparte la misma ProductCatalogCache.
+    """
+
+    def __init__(self, repository, cache: ProductCatalogCache):
+        self.repository = repository
+        self.cache = cache
+
+    async def get_all(self):
+        return (await self._catalog()).get_all()
+
+    async def get_by_id(self, product_id: int):
+        return (await self._catalog()).get(product_id)
+
+    async def get_by_brand(self, brand: str):
+        return (await self._catalog()).get_by_brand(brand)
+
+    async def get_by_category(self, category: str):
+        return (await self._catalog()).get_by_category(category)
+
+    async def search(self, filters: Dict[str, Any], limit: Optional[int] = None,
+                     offset: int = 0, after_id: Optional[int] = None):
+        return await self.repository.search(filters, limit, offset, after_id)
+
+    async def save(self, product: Product):
+        saved = await self.repository.save(product)
+        if saved is not None:
+            self.cache.upsert(saved)
+        return saved
+
+    async def update_fields(self, product_id: int, changes: Dict[str, Any],
+                            expected_version: Optional[int] = None):
+        updated = await self.repository.update_fields(product_id, changes, expected_version)
+        if updated is not None:
+            self.cache.upsert(updated)
+        return updated
+
+    async def delete(self, product_id: int):
+        deleted = await self.repository.delete(product_id)
+        if deleted:
+            self.cache.remove(product_id)
+        return deleted
+
+    # Métodos auxiliares
+    async def _catalog(self) -> ProductCatalogCache:
+        if self.cache.is_fresh():
+            self.cache.hits += 1
+            return self.cache
+        self.cache.misses += 1
+        version = self.cache.version
+        return _loaded(self.cache, await self.repository.get_all(), version)
@@ -1,7 +1,14 @@
 from src.domain.repositories import IChatRepository
 from src.domain.entities import ChatMessage
-from src.infrastructure.db.models import ChatMemoryModel
+from src.infrastructure.db.models import ChatMemoryModel, ChatSummaryModel
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from dataclasses import replace
+from typing import List
+
+# Columnas en el orden de los campos de ChatMessage (para ChatMessage.from_row)
+MESSAGE_COLUMNS = (ChatMemoryModel.id, ChatMemoryModel.session_id, ChatMemoryModel.role,
+                   ChatMemoryModel.message, ChatMemoryModel.timestamp)
 
 class SQLChatRepository(IChatRepository):
     def __init__(self, db: Session):
@@ -14,33 +21,45 @@ class SQLChatRepository(IChatRepository):
         self.db.refresh(model)
         return self._model_to_entity(model)
 
+    def save_messages(self, messages: List[ChatMessage]):
+        # Un solo INSERT y un solo commit; los IDs se leen tras el flush,
+        # sin refresh (los mensajes llegan con su timestamp asignado)
+        models = [self._entity_to_model(m) for m in messages]
+        self.db.add_all(models)
+        self.db.flush()
+        ids = [m.id for m in models]
+        self.db.commit()
+        return [replace(msg, id=msg_id) for msg, msg_id in zip(messages, ids)]
+
     def get_session_history(self, session_id: str, limit: int = 50):
-        models = (
-            self.db.query(ChatMemoryModel)
-            .filter(ChatMemoryModel.session_id == session_id)
-            .order_by(ChatMemoryModel.timestamp.desc())
-            .limit(limit)
-            .all()
-        )
-        models.reverse()
-        return [self._model_to_entity(m) for m in models]
+        return self._latest(session_id, limit)
 
     def delete_session_history(self, session_id: str):
-        self.db.query(ChatMemoryModel).filter(ChatMemoryModel.session_id == session_id).delete()
+        deleted = self.db.query(ChatMemoryModel).filter(ChatMemoryModel.session_id == session_id).delete()
+        # El resumen de la sesión deja de tener sentido sin su historial
+        self.db.query(ChatSummaryModel).filter(ChatSummaryModel.session_id == session_id).delete()
         self.db.commit()
+        return deleted
 
     def get_recent_messages(self, session_id: str, n: int):
-        models = (
-            self.db.query(ChatMemoryModel)
-            .filter(ChatMemoryModel.session_id == session_id)
-            .order_by(ChatMemoryModel.timestamp.desc())
-            .limit(n)
-            .all()
-        )
-        models.reverse()
-        return [self._model_to_entity(m) for m in models]
+        return self._latest(session_id, n)
 
     # Métodos auxiliares
+    @staticmethod
+    def latest_messages_query(session_id: str, limit: int):
+        """Últimos `limit` mensajes de la sesión, del más reciente al más antiguo."""
+        return (
+            select(*MESSAGE_COLUMNS)
+            .where(ChatMemoryModel.session_id == session_id)
+            .order_by(ChatMemoryModel.timestamp.desc(), ChatMemoryModel.id.desc())
+            .limit(limit)
+        )
+
+    def _latest(self, session_id: str, limit: int):
+        rows = self.db.execute(self.latest_messages_query(session_id, limit)).all()
+        rows.reverse()
+        return [ChatMessage.from_row(row) for row in rows]
+
     def _model_to_entity(self, model):
         if not model:
             return None
@@ -0,0 +1,37 @@
+from src.domain.repositories import IChatSummaryRepository
+from src.domain.entities import ChatSummary
+from src.infrastructure.db.models import ChatSummaryModel
+from sqlalchemy.orm import Session
+
+class SQLChatSummaryRepository(IChatSummaryRepository):
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get(self, session_id: str):
+        model = self.db.get(ChatSummaryModel, session_id)
+        return self._model_to_entity(model)
+
+    def save(self, summary: ChatSummary):
+        # merge hace INSERT o UPDATE según exista la fila (clave: session_id)
+        self.db.merge(self._entity_to_model(summary))
+        self.db.commit()
+        return summary
+
+    # Métodos auxiliares
+    def _model_to_entity(self, model):
+        if not model:
+            return None
+        return ChatSummary(
+            session_id=model.session_id,
+            summary=model.summary,
+            last_message_id=model.last_message_id,
+            updated_at=model.updated_at,
+        )
+
+    def _entity_to_model(self, entity):
+        return ChatSummaryModel(
+            session_id=entity.session_id,
+            summary=entity.summary,
+            last_message_id=entity.last_message_id,
+            updated_at=entity.updated_at,
+        )
@@ -0,0 +1,117 @@
+import asyncio
+import os
+from typing import List, Optional, Tuple
+
+from src.domain.entities import ChatMessage
+from src.infrastructure.repositorie.async_chat_repository import AsyncSQLChatRepository
+
+# Write-behind desactivado por defecto: cada turno hace su propio commit
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "100"))
+CHAT_WRITE_MAX_DELAY_MS = float(os.getenv("CHAT_WRITE_MAX_DELAY_MS", "5"))
+
+
+class ChatWriteBehindQueue:
+    """
+    Cola de escritura que agrupa los mensajes de varias sesiones concurrentes
+    en una sola transacción (group commit).
+
+    `enqueue` espera a que el lote que contiene sus mensajes se confirme, así
+    que la durabilidad es la misma que con save_messages; lo que cambia es que
+    N turnos simultáneos comparten un commit en lugar de hacer N.
+    El lote se escribe al llegar a `max_batch` mensajes o tras `max_delay_ms`.
+    """
+
+    def __init__(self, session_factory, max_batch: int = CHAT_WRITE_BATCH_SIZE,
+                 max_delay_ms: float = CHAT_WRITE_MAX_DELAY_MS):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self._pending: List[Tuple[List[ChatMessage], asyncio.Future]] = []
+        self._pending_count = 0
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks = set()
+        self._write_lock = asyncio.Lock()
+        self.batches_written = 0
+
+    async def enqueue(self, messages: List[ChatMessage]) -> List[ChatMessage]:
+        """Encola los mensajes y retorna sus copias con ID una vez confirmados."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((messages, future))
+        self._pending_count += len(messages)
+        if self._pending_count >= self.max_batch:
+            self._spawn(self.flush())
+        elif self._timer is None:
+            self._timer = self._spawn(self._flush_after_delay())
+        return await future
+
+    async def flush(self) -> None:
+        """Escribe de inmediato todo lo pendiente."""
+        batch, self._pending, self._pending_count = self._pending, [], 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not batch:
+            return
+        messages = [m for msgs, _ in batch for m in msgs]
+        try:
+            async with self._write_lock:
+                async with self.session_factory() as db:
+                    saved = await AsyncSQLChatRepository(db).save_messages(messages)
+            self.batches_written += 1
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        offset = 0
+        for msgs, future in batch:
+            if not future.done():
+                future.set_result(saved[offset:offset + len(msgs)])
+            offset += len(msgs)
+
+    async def close(self) -> None:
+        """Vacía la cola; llamar al apagar la aplicación."""
+        await self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # Métodos auxiliares
+    async def _flush_after_delay(self) -> None:
+        await asyncio.sleep(self.max_delay)
+        # Desde aquí el temporizador ya no se puede cancelar a mitad de escritura
+        self._timer = None
+        await self.flush()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+
+class QueuedChatRepository:
+    """
+    Decorador de AsyncSQLChatRepository cuyas escrituras pasan por una
+    ChatWriteBehindQueue; las lecturas van directo al repositorio envuelto.
+    """
+
+    def __init__(self, repository: AsyncSQLChatRepository, queue: ChatWriteBehindQueue):
+        self.repository = repository
+        self.queue = queue
+
+    async def save_message(self, message: ChatMessage):
+        saved = await self.queue.enqueue([message])
+        return saved[0]
+
+    async def save_messages(self, messages: List[ChatMessage]):
+        return await self.queue.enqueue(messages)
+
+    async def get_session_history(self, session_id: str, limit: Optional[int] = None):
+        return await self.repository.get_session_history(session_id, limit)
+
+    async def delete_session_history(self, session_id: str):
+        return await self.repository.delete_session_history(session_id)
+
+    async def get_recent_messages(self, session_id: str, count: int):
+        return await self.repository.get_recent_messages(session_id, count)
@@ -1,47 +1,257 @@
 from src.domain.repositories import IProductRepository
 from src.domain.entities import Product
+from src.domain.exceptions import ProductNotFoundError, InsufficientStockError, ProductVersionConflictError
 from src.infrastructure.db.models import ProductModel
+from sqlalchemy import insert, select, update, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterator, List, Optional
+
+# Dialectos con INSERT ... ON CONFLICT DO UPDATE
+UPSERT_DIALECTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+# Columnas que se pueden actualizar y columnas con las que se arma un Product
+EDITABLE_COLUMNS = ("name", "brand", "category", "size", "color", "price", "stock", "description")
+ENTITY_COLUMNS = [ProductModel.__table__.c[c] for c in ("id",) + EDITABLE_COLUMNS + ("version",)]
 
 class SQLProductRepository(IProductRepository):
     def __init__(self, db: Session):
         self.db = db
 
+    # Las lecturas seleccionan tuplas de columnas (sin objetos ORM ni mapa de
+    # identidad) y arman las entidades por la vía confiable de Product.from_row
+
     def get_all(self):
-        models = self.db.query(ProductModel).all()
-        return [self._model_to_entity(m) for m in models]
+        return self._fetch(select(*ENTITY_COLUMNS))
 
     def get_by_id(self, product_id: int):
-        model = self.db.query(ProductModel).filter(ProductModel.id == product_id).first()
-        return self._model_to_entity(model) if model else None
+        row = self.db.execute(select(*ENTITY_COLUMNS).where(ProductModel.id == product_id)).first()
+        return Product.from_row(row) if row else None
 
     def get_by_brand(self, brand: str):
-        models = self.db.query(ProductModel).filter(ProductModel.brand == brand).all()
-        return [self._model_to_entity(m) for m in models]
+        return self._fetch(select(*ENTITY_COLUMNS).where(ProductModel.brand == brand))
 
     def get_by_category(self, category: str):
-        models = self.db.query(ProductModel).filter(ProductModel.category == category).all()
-        return [self._model_to_entity(m) for m in models]
+        return self._fetch(select(*ENTITY_COLUMNS).where(ProductModel.category == category))
+
+    def search(self, filters: Dict[str, Any], limit: Optional[int] = None,
+               offset: int = 0, after_id: Optional[int] = None):
+        return self._fetch(self.build_search_query(select(*ENTITY_COLUMNS), filters, limit, offset, after_id))
+
+    @staticmethod
+    def build_search_query(query, filters: Dict[str, Any], limit: Optional[int] = None,
+                           offset: int = 0, after_id: Optional[int] = None):
+        """Aplica filtros y paginación a un Query o select() sobre ProductModel."""
+        for key, value in filters.items():
+            if value is None:
+                continue
+            if key == "brand":
+                query = query.filter(ProductModel.brand_lower == value.lower())
+            elif key == "category":
+                query = query.filter(ProductModel.category_lower == value.lower())
+            elif key == "name":
+                query = query.filter(ProductModel.name_lower.contains(value.lower(), autoescape=True))
+            elif key == "size":
+                query = query.filter(ProductModel.size_lower.contains(value.lower(), autoescape=True))
+            elif key == "color":
+                query = query.filter(ProductModel.color_lower.contains(value.lower(), autoescape=True))
+            elif key == "min_price":
+                query = query.filter(ProductModel.price >= value)
+            elif key == "max_price":
+                query = query.filter(ProductModel.price <= value)
+            elif key == "in_stock":
+                query = query.filter(ProductModel.stock > 0 if value else ProductModel.stock <= 0)
+        if after_id is not None:
+            query = query.filter(ProductModel.id > after_id)
+        query = query.order_by(ProductModel.id)
+        if offset:
+            query = query.offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def iter_all(self, after_id: Optional[int] = None, batch_size: int = 1000) -> Iterator[Product]:
+        """
+        Recorre el catálogo en orden de ID con un cursor del lado del servidor,
+        cargando `batch_size` filas a la vez (memoria constante).
+        """
+        stmt = select(*ENTITY_COLUMNS).order_by(ProductModel.id)
+        if after_id is not None:
+            stmt = stmt.where(ProductModel.id > after_id)
+        for row in self.db.execute(stmt.execution_options(yield_per=batch_size)):
+            yield Product.from_row(row)
 
     def save(self, product: Product):
         if product.id:
-            # Actualizar producto existente
-            model = self.db.query(ProductModel).filter(ProductModel.id == product.id).first()
-            if not model:
-                return None
-            for key, value in self._entity_to_model(product).__dict__.items():
-                if key != "_sa_instance_state":
-                    setattr(model, key, value)
-        else:
-            # Crear nuevo producto
-            model = self._entity_to_model(product)
-            self.db.add(model)
-            self.db.flush()  # Para generar el id
-            self.db.refresh(model)
-            product.id = model.id
+            # Actualizar producto existente: un UPDATE ... RETURNING, sin leer la fila
+            return self.update_fields(product.id, self._entity_values(product))
+        # Crear nuevo producto
+        model = self._entity_to_model(product)
+        self.db.add(model)
+        self.db.flush()  # Para generar el id
+        self.db.refresh(model)
+        product.id = model.id
         self.db.commit()
         return self._model_to_entity(model)
 
+    def update_fields(self, product_id: int, changes: Dict[str, Any],
+                      expected_version: Optional[int] = None) -> Optional[Product]:
+        """
+        Actualiza solo las columnas de `changes` con un único UPDATE ...
+        RETURNING (sin SELECT previo ni modelo ORM intermedio) e incrementa
+        `version`. Con `expected_version` el UPDATE solo aplica si la fila
+        sigue en esa versión; si no, lanza ProductVersionConflictError.
+        Retorna el producto actualizado o None si no existe.
+        """
+        stmt = self.build_update_statement(product_id, changes, expected_version)
+        current_version = None
+        try:
+            row = self.db.execute(stmt).first()
+            if row is None and expected_version is not None:
+                # Solo en el caso de fallo: distinguir "no existe" de "cambió"
+                current_version = self.db.execute(self.version_query(product_id)).scalar()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return self.updated_product(row, product_id, expected_version, current_version)
+
+    @classmethod
+    def build_update_statement(cls, product_id: int, changes: Dict[str, Any],
+                               expected_version: Optional[int] = None):
+        """UPDATE ... RETURNING de update_fields; lo comparte el repositorio asíncrono."""
+        unknown = set(changes) - set(EDITABLE_COLUMNS)
+        if unknown:
+            raise ValueError(f"Campos no editables: {', '.join(sorted(unknown))}")
+        table = ProductModel.__table__
+        stmt = update(table).where(table.c.id == product_id)
+        if expected_version is not None:
+            stmt = stmt.where(table.c.version == expected_version)
+        stmt = stmt.values(**cls._with_search_columns(changes), version=table.c.version + 1)
+        return stmt.returning(*ENTITY_COLUMNS)
+
+    @staticmethod
+    def version_query(product_id: int):
+        table = ProductModel.__table__
+        return select(table.c.version).where(table.c.id == product_id)
+
+    @staticmethod
+    def updated_product(row, product_id: int, expected_version: Optional[int],
+                        current_version: Optional[int]) -> Optional[Product]:
+        """Resultado de update_fields: el producto, None si no existe o el conflicto de versión."""
+        if row is not None:
+            return Product.from_row(row)
+        if current_version is not None:
+            raise ProductVersionConflictError(product_id, expected_version, current_version)
+        return None
+
+    def bulk_upsert(self, products: List[Product]) -> int:
+        """
+        Guarda un lote en una sola transacción con executemany: los productos
+        sin ID se insertan y los que traen ID se insertan o actualizan por ID.
+        No pasa por la unidad de trabajo del ORM ni refresca los IDs nuevos.
+        Retorna la cantidad de filas escritas.
+        """
+        new_rows, keyed_rows = [], []
+        for product in products:
+            (keyed_rows if product.id else new_rows).append(self._entity_to_row(product))
+        table = ProductModel.__table__
+        try:
+            if new_rows:
+                self.db.execute(insert(table), new_rows)
+            if keyed_rows:
+                upsert = UPSERT_DIALECTS.get(self.db.get_bind().dialect.name)
+                if upsert is None:
+                    for row in keyed_rows:
+                        self.db.merge(ProductModel(**row))
+                else:
+                    stmt = upsert(table)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[table.c.id],
+                        set_=dict({c: stmt.excluded[c] for c in keyed_rows[0] if c != "id"},
+                                  version=table.c.version + 1),
+                    )
+                    self.db.execute(stmt, keyed_rows)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return len(new_rows) + len(keyed_rows)
+
+    def reserve_stock(self, product_id: int, quantity: int) -> Product:
+        """
+        Descuenta `quantity` con un único UPDATE condicional
+        (stock = stock - q WHERE id = :id AND stock >= q), sin leer ni copiar
+        la fila: dos reservas concurrentes nunca dejan el stock negativo.
+        Como toda escritura, incrementa `version`: una actualización con la
+        versión leída antes de la reserva falla en vez de pisar el stock.
+        Retorna el producto con el stock restante. Lanza ProductNotFoundError
+        o InsufficientStockError si no se pudo reservar.
+        """
+        table = ProductModel.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == product_id, table.c.stock >= quantity)
+            .values(stock=table.c.stock - quantity, version=table.c.version + 1)
+            .returning(*ENTITY_COLUMNS)
+        )
+        try:
+            row = self.db.execute(stmt).first()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        if row is None:
+            raise self._reservation_error(product_id, quantity)
+        return Product.from_row(row)
+
+    def release_stock(self, product_id: int, quantity: int) -> Product:
+        """Devuelve `quantity` al stock (reserva cancelada). Retorna el producto actualizado."""
+        table = ProductModel.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == product_id)
+            .values(stock=table.c.stock + quantity, version=table.c.version + 1)
+            .returning(*ENTITY_COLUMNS)
+        )
+        try:
+            row = self.db.execute(stmt).first()
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        if row is None:
+            raise ProductNotFoundError(product_id)
+        return Product.from_row(row)
+
+    def bulk_reserve(self, items: Dict[int, int]) -> Dict[int, Product]:
+        """
+        Reserva varios productos ({id: cantidad}) en una transacción con un
+        executemany del mismo UPDATE condicional: o se reservan todos o
+        ninguno. Los IDs se procesan en orden para que dos pedidos con los
+        mismos productos tomen los bloqueos de fila en el mismo orden.
+        Retorna cada producto con su stock restante.
+        """
+        table = ProductModel.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("product_id"), table.c.stock >= bindparam("quantity"))
+            .values(stock=table.c.stock - bindparam("quantity"), version=table.c.version + 1)
+        )
+        params = [{"product_id": pid, "quantity": qty} for pid, qty in sorted(items.items())]
+        try:
+            result = self.db.execute(stmt, params)
+            if result.rowcount != len(params):
+                self.db.rollback()
+                raise self._bulk_reservation_error(items)
+            reserved = {p.id: p for p in self._fetch(select(*ENTITY_COLUMNS).where(table.c.id.in_(list(items))))}
+            self.db.commit()
+        except (ProductNotFoundError, InsufficientStockError):
+            raise
+        except Exception:
+            self.db.rollback()
+            raise
+        return reserved
+
     def delete(self, product_id: int):
         model = self.db.query(ProductModel).filter(ProductModel.id == product_id).first()
         if model:
@@ -51,19 +261,57 @@ class SQLProductRepository(IProductRepository):
         return False
 
     # Métodos auxiliares
+    def _fetch(self, stmt) -> List[Product]:
+        return [Product.from_row(row) for row in self.db.execute(stmt)]
+
+    def _reservation_error(self, product_id: int, quantity: int) -> Exception:
+        available = self.db.execute(
+            select(ProductModel.stock).where(ProductModel.id == product_id)
+        ).scalar()
+        if available is None:
+            return ProductNotFoundError(product_id)
+        return InsufficientStockError(product_id, quantity, available)
+
+    def _bulk_reservation_error(self, items: Dict[int, int]) -> Exception:
+        """Primer producto que impidió la reserva (ya sin la transacción)."""
+        stock = dict(self.db.execute(
+            select(ProductModel.id, ProductModel.stock).where(ProductModel.id.in_(list(items)))
+        ).all())
+        for product_id, quantity in sorted(items.items()):
+            if product_id not in stock:
+                return ProductNotFoundError(product_id)
+            if stock[product_id] < quantity:
+                return InsufficientStockError(product_id, quantity, stock[product_id])
+        # Otra transacción repuso stock entre el UPDATE y la lectura
+        return InsufficientStockError(min(items), items[min(items)])
+
     def _model_to_entity(self, model):
         if not model: return None
-        return Product(
-            id=model.id,
-            name=model.name,
-            brand=model.brand,
-            category=model.category,
-            size=model.size,
-            color=model.color,
-            price=model.price,
-            stock=model.stock,
-            description=model.description,
-        )
+        return Product.from_row((
+            model.id, model.name, model.brand, model.category, model.size,
+            model.color, model.price, model.stock, model.description, model.version,
+        ))
+
+    def _entity_to_row(self, entity) -> Dict[str, Any]:
+        """Fila para executemany; calcula las columnas *_lower que en el ORM pone el evento."""
+        row = self._with_search_columns(self._entity_values(entity))
+        if entity.id:
+            row["id"] = entity.id
+        return row
+
+    @staticmethod
+    def _entity_values(entity) -> Dict[str, Any]:
+        return {column: getattr(entity, column) for column in EDITABLE_COLUMNS}
+
+    @staticmethod
+    def _with_search_columns(values: Dict[str, Any]) -> Dict[str, Any]:
+        """Agrega las columnas *_lower de los campos de texto presentes en `values`."""
+        row = dict(values)
+        for lower_column, column in ProductModel.SEARCH_COLUMNS.items():
+            if column in values:
+                value = values[column]
+                row[lower_column] = value.lower() if value is not None else None
+        return row
 
     def _entity_to_model(self, entity):
         return ProductModel(
@@ -0,0 +1,83 @@
+from typing import Optional
+
+from src.domain.repositories import IUnitOfWork
+from src.infrastructure.repositorie.async_chat_repository import AsyncSQLChatRepository
+from src.infrastructure.repositorie.async_chat_summary_repository import AsyncSQLChatSummaryRepository
+from src.infrastructure.repositorie.async_product_repository import AsyncSQLProductRepository
+from src.infrastructure.repositorie.cached_chat_repository import (
+    SessionContextCache, CachedChatRepository, AsyncCachedChatRepository,
+    CachedChatSummaryRepository, AsyncCachedChatSummaryRepository,
+)
+from src.infrastructure.repositorie.cached_product_repository import (
+    ProductCatalogCache, CachedProductRepository, AsyncCachedProductRepository,
+)
+from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+from src.infrastructure.repositorie.chat_summary_repository import SQLChatSummaryRepository
+from src.infrastructure.repositorie.chat_write_queue import ChatWriteBehindQueue, QueuedChatRepository
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+
+class AsyncSQLUnitOfWork(IUnitOfWork):
+    """
+    Unidad de trabajo sobre AsyncSession con los repositorios asíncronos.
+    Si se pasan las cachés, los repositorios se envuelven con sus decoradores
+    para que las lecturas calientes ni siquiera abran una conexión; con
+    `write_queue` los mensajes se guardan agrupados (write-behind).
+    """
+
+    def __init__(self, session_factory, product_cache: Optional[ProductCatalogCache] = None,
+                 chat_cache: Optional[SessionContextCache] = None,
+                 write_queue: Optional[ChatWriteBehindQueue] = None):
+        self.session_factory = session_factory
+        self.product_cache = product_cache
+        self.chat_cache = chat_cache
+        self.write_queue = write_queue
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = self.session_factory()
+        self.products = AsyncSQLProductRepository(self.session)
+        self.chats = AsyncSQLChatRepository(self.session)
+        self.summaries = AsyncSQLChatSummaryRepository(self.session)
+        if self.write_queue is not None:
+            self.chats = QueuedChatRepository(self.chats, self.write_queue)
+        if self.product_cache is not None:
+            self.products = AsyncCachedProductRepository(self.products, self.product_cache)
+        if self.chat_cache is not None:
+            self.chats = AsyncCachedChatRepository(self.chats, self.chat_cache)
+            self.summaries = AsyncCachedChatSummaryRepository(self.summaries, self.chat_cache)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        # close() hace rollback de lo no confirmado y devuelve la conexión al pool
+        await self.session.close()
+        self.session = None
+
+
+class SQLUnitOfWork(IUnitOfWork):
+    """
+    Equivalente de AsyncSQLUnitOfWork sobre una Session síncrona.
+    """
+
+    def __init__(self, session_factory, product_cache: Optional[ProductCatalogCache] = None,
+                 chat_cache: Optional[SessionContextCache] = None):
+        self.session_factory = session_factory
+        self.product_cache = product_cache
+        self.chat_cache = chat_cache
+        self.session = None
+
+    async def __aenter__(self):
+        self.session = self.session_factory()
+        self.products = SQLProductRepository(self.session)
+        self.chats = SQLChatRepository(self.session)
+        self.summaries = SQLChatSummaryRepository(self.session)
+        if self.product_cache is not None:
+            self.products = CachedProductRepository(self.products, self.product_cache)
+        if self.chat_cache is not None:
+            self.chats = CachedChatRepository(self.chats, self.chat_cache)
+            self.summaries = CachedChatSummaryRepository(self.summaries, self.chat_cache)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.session.close()
+        self.session = None
@@ -0,0 +1,159 @@
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+# Cantidad de productos relevantes que se incluyen en el prompt
+CHAT_PRODUCTS_TOP_K = int(os.getenv("CHAT_PRODUCTS_TOP_K", "8"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "al", "algo", "algun", "alguna", "alguno", "busco", "como", "con", "cual",
+    "de", "del", "el", "en", "es", "esta", "este", "hay", "hola", "la", "las", "lo",
+    "los", "me", "mi", "para", "por", "que", "quiero", "se", "si", "su", "tiene",
+    "tienen", "un", "una", "unas", "unos", "y", "yo",
+})
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sin tildes y sin stopwords."""
+    if not text:
+        return []
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    normalized = "".join(c for c in normalized if not unicodedata.combining(c))
+    return [t for t in _TOKEN_RE.findall(normalized) if t not in STOPWORDS]
+
+
+class BM25ProductIndex:
+    """
+    Índice invertido BM25 en memoria sobre nombre, marca, categoría,
+    talla, color y descripción de los productos.
+
+    Se registra como listener de ProductCatalogCache, de modo que guardar o
+    eliminar un producto solo actualiza sus postings. Se usa para enviar al
+    LLM únicamente los productos relevantes para el mensaje del usuario.
+    """
+
+    # Nombre y marca pesan el doble que el resto de campos
+    FIELD_WEIGHTS = (("name", 2), ("brand", 2), ("category", 1), ("size", 1),
+                     ("color", 1), ("description", 1))
+    # Peso de los mensajes anteriores del usuario frente al mensaje actual
+    CONTEXT_WEIGHT = 0.5
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    # Eventos de ProductCatalogCache
+    def on_catalog_loaded(self, products, version: int) -> None:
+        with self._lock:
+            self._clear()
+            for product in products:
+                self._add(product)
+
+    def on_product_saved(self, product, version: int) -> None:
+        with self._lock:
+            self._remove(product.id)
+            self._add(product)
+
+    def on_product_removed(self, product_id: int, version: int) -> None:
+        with self._lock:
+            self._remove(product_id)
+
+    def on_catalog_invalidated(self, version: int) -> None:
+        # Se reconstruye con la próxima recarga del catálogo
+        with self._lock:
+            self._clear()
+
+    def search(self, user_message: str, k: int = CHAT_PRODUCTS_TOP_K,
+               context: Optional[Iterable] = None) -> List[int]:
+        """
+        Retorna los IDs de los k productos con mayor puntaje BM25 para el
+        mensaje. Los mensajes previos del usuario en `context` (entidades
+        ChatMessage) también aportan términos, con menor peso.
+        """
+        query = self._build_query(user_message, context)
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not query or n_docs == 0:
+                return []
+            avg_len = self._total_len / n_docs
+            scores: Dict[int, float] = {}
+            for term, weight in query.items():
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                    score = weight * idf * tf * (self.k1 + 1) / (tf + norm)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + score
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [doc_id for doc_id, _ in ranked[:k]]
+
+    def select(self, products, user_message: str, context: Optional[Iterable] = None,
+               k: int = CHAT_PRODUCTS_TOP_K) -> list:
+        """
+        Filtra `products` a los k más relevantes, ordenados por puntaje.
+        Si ningún producto coincide con la consulta, retorna los primeros k
+        para que el asistente tenga algo que recomendar.
+        """
+        if len(products) <= k:
+            return list(products)
+        by_id = {p.id: p for p in products}
+        selected = [by_id[i] for i in self.search(user_message, k, context) if i in by_id]
+        return selected if selected else list(products[:k])
+
+    # Métodos auxiliares
+    def _build_query(self, user_message: str, context) -> Counter:
+        query = Counter()
+        for term in tokenize(user_message):
+            query[term] += 1.0
+        for msg in context or []:
+            if msg.role == "user":
+                for term in tokenize(msg.message):
+                    query[term] += self.CONTEXT_WEIGHT
+        return query
+
+    def _clear(self) -> None:
+        self._postings = {}
+        self._doc_terms = {}
+        self._doc_len = {}
+        self._total_len = 0
+
+    def _add(self, product) -> None:
+        terms = Counter()
+        for field, weight in self.FIELD_WEIGHTS:
+            for term in tokenize(str(getattr(product, field) or "")):
+                terms[term] += weight
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[product.id] = tf
+        length = sum(terms.values())
+        self._doc_terms[product.id] = terms
+        self._doc_len[product.id] = length
+        self._total_len += length
+
+    def _remove(self, product_id: int) -> None:
+        terms = self._doc_terms.pop(product_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(product_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(product_id)
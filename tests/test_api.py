@@ -0,0 +1,215 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from src.domain.entities import Product
+from src.infrastructure.api import main
+from src.infrastructure.api.container import AppContainer
+from src.infrastructure.db.database import Base
+import src.infrastructure.db.models  # registra los modelos en Base
+from src.infrastructure.llm_providers.fake_llm_service import FakeLLMService
+from src.infrastructure.llm_providers.request_coalescing import LLMConcurrencyLimiter
+from src.infrastructure.llm_providers.resilience import CircuitBreaker
+from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+# ----- Fixtures -----
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # BD en archivo: TestClient ejecuta cada petición en su propio event loop
+    path = tmp_path / "api.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def client(tmp_path, session_factory):
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'api.db'}", poolclass=NullPool)
+    async_session_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    db = session_factory()
+    SQLProductRepository(db).save(Product(id=None, name="Pegasus", brand="Nike", category="Running",
+                                          size="42", color="Negro", price=120.0, stock=3,
+                                          description="Zapato de prueba"))
+    db.close()
+
+    # Sin `with`: no se ejecuta el lifespan (init_db sobre la BD real); el contenedor se arma aquí
+    main.app.state.container = AppContainer(session_factory, async_session_factory,
+                                            llm_provider=FakeLLMService(), write_behind=False)
+    yield TestClient(main.app)
+
+    del main.app.state.container
+
+def parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+# ----- Tests de /chat/stream -----
+
+def test_chat_stream_sends_tokens_and_persists_reply(client, session_factory):
+    response = client.post("/chat/stream", json={"session_id": "s1", "message": "Busco Nike"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_sse(response.text)
+    tokens = [data["text"] for event, data in events if event == "token"]
+    assert len(tokens) > 1
+    assert events[-1][0] == "done"
+    assert events[-1][1]["assistant_message"] == "".join(tokens)
+    assert "Pegasus" in events[-1][1]["assistant_message"]
+
+    db = session_factory()
+    history = SQLChatRepository(db).get_session_history("s1")
+    db.close()
+    assert [(m.role, m.message) for m in history] == [
+        ("user", "Busco Nike"),
+        ("assistant", "".join(tokens)),
+    ]
+
+def test_chat_stream_reports_provider_errors(client):
+    class BrokenLLM(FakeLLMService):
+        async def stream_response(self, *args, **kwargs):
+            yield "Hola"
+            raise RuntimeError("se cortó")
+
+    main.app.state.container.chat_service.ai_service = BrokenLLM()
+    events = parse_sse(client.post("/chat/stream", json={"session_id": "s1", "message": "Hola"}).text)
+    assert events[0] == ("token", {"text": "Hola"})
+    assert events[-1][0] == "error"
+
+def test_chat_websocket_streams_reply(client):
+    with client.websocket_connect("/chat/ws") as ws:
+        ws.send_json({"session_id": "s2", "message": "Hola"})
+        items = []
+        while not items or items[-1]["type"] not in ("done", "error"):
+            items.append(ws.receive_json())
+    assert items[-1]["type"] == "done"
+    assert "".join(i["text"] for i in items if i["type"] == "token") == items[-1]["assistant_message"]
+
+def test_chat_rejects_with_429_when_session_is_busy(client):
+    main.app.state.container.llm_limiter = LLMConcurrencyLimiter(max_per_session=0)
+    for path in ("/chat", "/chat/stream"):
+        response = client.post(path, json={"session_id": "s1", "message": "Hola"})
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+
+def test_health_reports_breaker_state(client):
+    breaker = CircuitBreaker(failure_threshold=1)
+    main.app.state.container.llm_breaker = breaker
+    assert client.get("/health").json()["llm"]["breaker"]["state"] == "closed"
+    breaker.record_failure()
+    body = client.get("/health").json()
+    assert body["status"] == "degraded"
+    assert body["llm"]["breaker"]["state"] == "open"
+
+# ----- Tests de endpoints sobre los servicios -----
+
+def test_chat_and_history_go_through_chat_service(client):
+    response = client.post("/chat", json={"session_id": "s3", "message": "Busco Nike"})
+    assert response.status_code == 200
+    assert "Pegasus" in response.json()["assistant_message"]
+
+    history = client.get("/chat/history/s3").json()
+    assert [m["role"] for m in history] == ["user", "assistant"]
+    assert client.delete("/chat/history/s3").json() == {"deleted": 2}
+    assert client.get("/chat/history/s3").json() == []
+
+def test_product_endpoints_share_catalog_cache(client):
+    cache = main.app.state.container.product_cache
+    assert [p["name"] for p in client.get("/products").json()] == ["Pegasus"]
+    product_id = client.get("/products").json()[0]["id"]
+    assert client.get(f"/products/{product_id}").json()["name"] == "Pegasus"
+    assert cache.misses == 1
+    assert client.get("/products/999").status_code == 404
+
+def test_chat_returns_503_without_llm_provider(client):
+    main.app.state.container.llm_service = None
+    assert client.post("/chat", json={"session_id": "s1", "message": "Hola"}).status_code == 503
+
+def test_metrics_expose_chat_stages_and_db_queries(client):
+    assert client.post("/chat", json={"session_id": "s4", "message": "Busco Nike"}).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    for stage in ("products", "context", "prompt", "llm", "persist", "total"):
+        assert f'chat_stage_duration_seconds_count{{stage="{stage}"}} 1' in body
+    assert 'http_request_duration_seconds_count{method="POST",route="/chat",status="200"} 1' in body
+    assert 'db_queries_total{engine="async"}' in body
+    assert 'cache_requests_total{cache="catalog",result="miss"} 1' in body
+    assert "llm_in_flight 0" in body
+    assert "llm_fallbacks_total 0" in body
+
+def test_bulk_import_endpoint_reports_rows_and_refreshes_catalog(client):
+    assert len(client.get("/products").json()) == 1
+    feed = (
+        '{"name": "Samba", "brand": "Adidas", "category": "Casual", "size": "40", "color": "Blanco",'
+        ' "price": 90, "stock": 7, "description": "x"}\n'
+        '{"name": "Samba", "price": -1}\n'
+    )
+    response = client.post("/products/bulk", content=feed, headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["imported"], report["failed"]) == (1, 1)
+    assert report["errors"][0]["line"] == 2
+    assert [p["name"] for p in client.get("/products").json()] == ["Pegasus", "Samba"]
+
+    exported = client.get("/products?format=csv")
+    assert exported.headers["content-type"].startswith("text/csv")
+    assert exported.text.splitlines()[0] == "id,name,brand,category,size,color,price,stock,description"
+    assert len(exported.text.splitlines()) == 3
+
+def test_reserve_endpoints_return_remaining_stock_and_409_on_oversell(client):
+    product_id = client.get("/products").json()[0]["id"]
+    response = client.post(f"/products/{product_id}/reserve", json={"quantity": 2})
+    assert response.status_code == 200
+    assert response.json() == {"product_id": product_id, "quantity": 2, "stock": 1}
+    assert client.get(f"/products/{product_id}").json()["stock"] == 1
+
+    assert client.post(f"/products/{product_id}/reserve", json={"quantity": 2}).status_code == 409
+    assert client.post("/products/999/reserve", json={"quantity": 1}).status_code == 404
+    assert client.post(f"/products/{product_id}/reserve", json={"quantity": 0}).status_code == 422
+
+    bulk = client.post("/products/reserve", json={"items": [{"product_id": product_id, "quantity": 1}]})
+    assert bulk.status_code == 200 and bulk.json()[0]["stock"] == 0
+    assert client.post("/products/reserve", json={"items": [{"product_id": product_id, "quantity": 1}]}).status_code == 409
+
+def test_patch_product_updates_only_sent_fields_with_version_check(client):
+    product = client.get("/products").json()[0]
+    assert product["version"] == 1
+
+    response = client.patch(f"/products/{product['id']}", json={"price": 99.5, "version": 1})
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["price"], body["stock"], body["name"], body["version"]) == (99.5, 3, "Pegasus", 2)
+    # La caché del catálogo ya tiene el cambio
+    assert client.get(f"/products/{product['id']}").json()["price"] == 99.5
+
+    assert client.patch(f"/products/{product['id']}", json={"stock": 1, "version": 1}).status_code == 409
+    assert client.patch(f"/products/{product['id']}", json={"price": -1}).status_code == 422
+    assert client.patch(f"/products/{product['id']}", json={"name": None}).status_code == 422
+    assert client.patch("/products/999", json={"stock": 1}).status_code == 404
+
+
+def test_patch_product_rejects_null_for_any_product_column(client):
+    product = client.get("/products").json()[0]
+
+    for field in ("size", "color", "description"):
+        response = client.patch(f"/products/{product['id']}", json={field: None})
+        assert response.status_code == 422
+    # Nada se escribió: el catálogo sigue serializándose completo
+    listing = client.get("/products")
+    assert listing.status_code == 200
+    assert listing.json()[0]["size"] == product["size"]
+    assert listing.json()[0]["version"] == product["version"]
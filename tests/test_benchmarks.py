@@ -0,0 +1,45 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from benchmarks.results import compare, document, result
+
+BENCHMARKS = sorted(p.stem for p in (Path(__file__).parent.parent / "benchmarks").glob("bench_*.py"))
+
+# ----- Tests de comparación de resultados -----
+
+def make_run(p95_ms, requests_per_s):
+    return document("api", [
+        result("POST /chat", {"concurrency": 10}, {"p95_ms": p95_ms, "requests_per_s": requests_per_s,
+                                                   "statuses": {"200": 100}}),
+        result("GET /products", {"concurrency": 10}, {"p95_ms": 5.0}),
+    ])
+
+def test_compare_flags_latency_and_throughput_regressions():
+    rows = compare(make_run(100.0, 50.0), make_run(130.0, 40.0), threshold=0.10)
+    flagged = {(r["name"], r["metric"]) for r in rows if r["regression"]}
+    assert flagged == {("POST /chat", "p95_ms"), ("POST /chat", "requests_per_s")}
+    # statuses no es una métrica comparable
+    assert all(r["metric"] != "statuses" for r in rows)
+
+def test_compare_tolerates_changes_within_threshold_and_improvements():
+    rows = compare(make_run(100.0, 50.0), make_run(105.0, 80.0), threshold=0.10)
+    assert rows and not any(r["regression"] for r in rows)
+
+def test_compare_matches_results_by_params():
+    baseline = make_run(100.0, 50.0)
+    current = document("api", [result("POST /chat", {"concurrency": 50}, {"p95_ms": 500.0})])
+    assert compare(baseline, current) == []
+
+# ----- Tests de la interfaz de los scripts -----
+
+@pytest.mark.parametrize("name", BENCHMARKS)
+def test_benchmark_scripts_share_the_results_interface(name):
+    completed = subprocess.run([sys.executable, "-m", f"benchmarks.{name}", "--help"],
+                               capture_output=True, text=True, timeout=60,
+                               cwd=Path(__file__).parent.parent)
+    assert completed.returncode == 0, completed.stderr
+    # Todas escriben con results.emit y pueden compararse con una corrida previa
+    assert "--output" in completed.stdout and "--compare" in completed.stdout
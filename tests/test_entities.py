@@ -62,4 +62,36 @@ def test_chat_context_format_for_prompt():
     assert prompt[0]["role"] == "user"
     assert prompt[0]["message"] == "Hola"
     assert prompt[1]["role"] == "assistant"
-    assert "puedo ayudarte" in prompt[1]["message"]
\ No newline at end of file
+    assert "puedo ayudarte" in prompt[1]["message"]
+
+
+def test_chat_context_respects_char_budget():
+    messages = [
+        ChatMessage(id=i, session_id="abc", role="user" if i % 2 else "assistant", message="x" * 100,
+                    timestamp=datetime.utcnow())
+        for i in range(1, 9)
+    ]
+    context = ChatContext(messages=messages, max_messages=6, max_chars=250)
+    assert [m.id for m in context.get_recent_messages()] == [7, 8]
+    assert [m.id for m in context.get_older_messages()] == [1, 2, 3, 4, 5, 6]
+
+    # El último mensaje se conserva aunque por sí solo exceda el presupuesto
+    assert len(ChatContext(messages=messages, max_chars=10).get_recent_messages()) == 1
+
+def test_chat_context_format_includes_summary():
+    messages = [ChatMessage(id=1, session_id="abc", role="user", message="Hola", timestamp=datetime.utcnow())]
+    context = ChatContext(messages=messages, summary="Usuario: busca Nike talla 42")
+    assert context.format_for_prompt() == (
+        "Resumen de la conversación anterior: Usuario: busca Nike talla 42\nUsuario: Hola"
+    )
+
+def test_entities_are_slotted_and_from_row_skips_validation():
+    product = Product.from_row((1, "Pegasus", "Nike", "Running", "42", "Negro", 120.0, 3, "x", 2))
+    assert (product.name, product.stock, product.version) == ("Pegasus", 3, 2)
+    assert not hasattr(product, "__dict__")
+    # Las filas de la BD ya se validaron al escribirse
+    assert Product.from_row((1, "Viejo", "Nike", "Running", "42", "Negro", 0.0, 0, "x", 1)).price == 0.0
+
+    message = ChatMessage.from_row((5, "s1", "user", "Hola", datetime(2024, 1, 1)))
+    assert message.is_from_user() and message.id == 5
+    assert not hasattr(message, "__dict__")
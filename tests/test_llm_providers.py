@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+
+from src.domain.entities import Product
+from src.domain.llm_provider import ILLMProvider
+from src.infrastructure.llm_providers.factory import create_llm_provider
+from src.infrastructure.llm_providers.fake_llm_service import FakeLLMService
+from src.infrastructure.llm_providers.gemini_service import GeminiService, FALLBACK_MESSAGE
+from src.infrastructure.llm_providers.simulated_llm_service import SimulatedLLMService
+from src.infrastructure.llm_providers.product_prompt_block import ProductPromptBlock
+from src.infrastructure.repositorie.cached_product_repository import ProductCatalogCache
+
+# ----- Fixtures -----
+
+def make_product(id, name="Zapato", brand="Nike", price=100.0, stock=5):
+    return Product(id=id, name=name, brand=brand, category="Running", size="42",
+                   color="Negro", price=price, stock=stock, description="Zapato de prueba")
+
+@pytest.fixture
+def gemini():
+    return GeminiService(api_key="test-key")
+
+# ----- Tests de ProductPromptBlock -----
+
+def test_prompt_block_follows_catalog_changes():
+    cache = ProductCatalogCache(ttl_seconds=60)
+    block = ProductPromptBlock()
+    cache.add_listener(block)
+    cache.load([make_product(1, "Pegasus"), make_product(2, "Gazelle", "Adidas")])
+
+    products = cache.get_all()
+    assert block.render(products, cache.version) == (
+        "- Pegasus | Nike | $100.0 | Stock: 5\n- Gazelle | Adidas | $100.0 | Stock: 5"
+    )
+
+    cache.upsert(make_product(2, "Gazelle", "Adidas", stock=0))
+    cache.remove(1)
+    assert block.version == cache.version
+    assert block.render(cache.get_all(), cache.version) == "- Gazelle | Adidas | $100.0 | Stock: 0"
+
+def test_prompt_block_full_catalog_text_requires_same_ids():
+    block = ProductPromptBlock()
+    block.on_catalog_loaded([make_product(1, "Pegasus"), make_product(2, "Gazelle", "Adidas")], version=1)
+    # Mismo tamaño que el catálogo, pero otra lista de productos
+    other = [make_product(1, "Pegasus"), make_product(3, "Samba", "Adidas")]
+    assert block.render(other, version=1) == (
+        "- Pegasus | Nike | $100.0 | Stock: 5\n- Samba | Adidas | $100.0 | Stock: 5"
+    )
+    assert block.render([make_product(1), make_product(1)], version=1) == (
+        "- Pegasus | Nike | $100.0 | Stock: 5\n- Pegasus | Nike | $100.0 | Stock: 5"
+    )
+
+def test_prompt_block_drops_invalidated_catalog():
+    cache = ProductCatalogCache(ttl_seconds=60)
+    block = ProductPromptBlock()
+    cache.add_listener(block)
+    cache.load([make_product(1, "Pegasus")])
+
+    cache.invalidate()
+    assert block.version is None
+    assert block.render([make_product(1, "Pegasus")], cache.version) is None
+
+def test_prompt_block_ignores_other_versions():
+    block = ProductPromptBlock()
+    block.on_catalog_loaded([make_product(1)], version=3)
+    assert block.render([make_product(1)], version=2) is None
+    assert block.render([make_product(1)], version=None) is None
+
+def test_format_products_info_uses_prompt_block(gemini):
+    gemini.prompt_block.on_catalog_loaded([make_product(1, "Pegasus")], version=1)
+    # Con la versión vigente se reutiliza el bloque precalculado
+    assert gemini.format_products_info([make_product(1, "Otro")], catalog_version=1) == (
+        "- Pegasus | Nike | $100.0 | Stock: 5"
+    )
+    assert gemini.format_products_info([make_product(1, "Otro")]) == "- Otro | Nike | $100.0 | Stock: 5"
+    assert gemini.format_products_info([]) == "No hay productos disponibles."
+
+class FakeStreamModel:
+    def __init__(self, chunks, fail_after=None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    async def generate_content_async(self, prompt, stream=False):
+        assert stream
+        outer = self
+
+        class Response:
+            async def __aiter__(self):
+                for i, text in enumerate(outer.chunks):
+                    if outer.fail_after == i:
+                        raise RuntimeError("corte")
+                    yield type("Chunk", (), {"text": text})()
+        return Response()
+
+def collect(gen):
+    async def run():
+        return [chunk async for chunk in gen]
+    return asyncio.run(run())
+
+def test_stream_response_yields_chunks(gemini):
+    gemini.model = FakeStreamModel(["Hola", " mundo"])
+    assert collect(gemini.stream_response("hola", [make_product(1)], [])) == ["Hola", " mundo"]
+    assert gemini.in_flight == 0
+
+def test_stream_response_falls_back_only_before_first_chunk(gemini):
+    gemini.model = FakeStreamModel(["Hola"], fail_after=0)
+    assert collect(gemini.stream_response("hola", [], [])) == [FALLBACK_MESSAGE]
+
+    gemini.model = FakeStreamModel(["Hola", " mundo"], fail_after=1)
+    with pytest.raises(RuntimeError):
+        collect(gemini.stream_response("hola", [], []))
+
+# ----- Tests del proveedor simulado -----
+
+def test_factory_selects_provider_by_name():
+    assert isinstance(create_llm_provider("fake"), FakeLLMService)
+    assert isinstance(create_llm_provider("simulated"), SimulatedLLMService)
+    assert isinstance(GeminiService(api_key="k"), ILLMProvider)
+    with pytest.raises(ValueError):
+        create_llm_provider("otro")
+
+def test_simulated_latency_distributions():
+    assert SimulatedLLMService(latency_ms=300, distribution="fixed").sample_latency() == 0.3
+    uniform = SimulatedLLMService(latency_ms=300, jitter_ms=100, distribution="uniform", seed=1)
+    assert all(0.2 <= uniform.sample_latency() <= 0.4 for _ in range(50))
+    lognormal = SimulatedLLMService(latency_ms=300, jitter_ms=100, distribution="lognormal", seed=1)
+    samples = [lognormal.sample_latency() for _ in range(2000)]
+    assert 0.27 < sum(samples) / len(samples) < 0.33
+    with pytest.raises(ValueError):
+        SimulatedLLMService(distribution="gauss")
+
+def test_simulated_provider_streams_and_injects_errors():
+    provider = SimulatedLLMService(latency_ms=0, tokens_per_second=0, seed=1)
+    products = [make_product(1, "Pegasus")]
+    reply = provider.generate_response_sync("hola", products, [])
+    assert "Pegasus" in reply
+    assert "".join(collect(provider.stream_response("hola", products, []))) == reply
+    assert provider.in_flight == 0
+
+    failing = SimulatedLLMService(latency_ms=0, tokens_per_second=0, error_rate=1.0)
+    failing.caller.retry_policy.max_retries = 0
+    assert failing.generate_response_sync("hola", products, []) == FALLBACK_MESSAGE
+    assert collect(failing.stream_response("hola", products, [])) == [FALLBACK_MESSAGE]
+    assert failing.errors == 2
+    assert failing.caller.fallbacks == 2
@@ -0,0 +1,70 @@
+import logging
+
+from sqlalchemy import create_engine, text
+
+from src.infrastructure.observability.metrics import MetricsRegistry, install_query_counter
+from src.infrastructure.observability.middleware import route_template
+from src.infrastructure.observability.structured_log import StructuredLogger
+
+# ----- Tests de métricas -----
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("stage_seconds", "Etapas", ("stage",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, stage="llm")
+    histogram.observe(0.5, stage="llm")
+    histogram.observe(5, stage="llm")
+
+    body = registry.render()
+    assert "# TYPE stage_seconds histogram" in body
+    assert 'stage_seconds_bucket{stage="llm",le="0.1"} 1' in body
+    assert 'stage_seconds_bucket{stage="llm",le="1.0"} 2' in body
+    assert 'stage_seconds_bucket{stage="llm",le="+Inf"} 3' in body
+    assert 'stage_seconds_count{stage="llm"} 3' in body
+    assert histogram.count(stage="llm") == 3
+
+def test_counter_and_collector_render_labels():
+    registry = MetricsRegistry()
+    counter = registry.counter("queries_total", "Consultas", ("engine",))
+    counter.inc(engine="sync")
+    counter.inc(2, engine="sync")
+    registry.collector("cache_hits", "Aciertos", "gauge", lambda: [({"cache": "catalog"}, 7)])
+
+    body = registry.render()
+    assert 'queries_total{engine="sync"} 3' in body
+    assert 'cache_hits{cache="catalog"} 7' in body
+
+def test_query_counter_counts_statements():
+    engine = create_engine("sqlite://")
+    registry = MetricsRegistry()
+    counter = registry.counter("db_queries_total", "Consultas", ("engine",))
+    uninstall = install_query_counter(engine, counter, {"engine": "sync"})
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+    uninstall()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 3"))
+    assert counter.value(engine="sync") == 2
+
+def test_route_template_replaces_path_params():
+    scope = {"path": "/products/42", "endpoint": object(), "path_params": {"product_id": 42}}
+    assert route_template(scope) == "/products/{product_id}"
+    assert route_template({"path": "/nada"}) == "unmatched"
+
+# ----- Tests de logging estructurado -----
+
+def test_sampled_logging_respects_rate_and_level(caplog):
+    values = iter([0.5, 0.05])
+    logger = StructuredLogger("test.sampled", sample_rate=0.1, rng=lambda: next(values))
+    with caplog.at_level(logging.INFO, logger="test.sampled"):
+        logger.sampled(logging.DEBUG, "debug.event")    # nivel desactivado: no consume muestra
+        logger.sampled(logging.INFO, "chat.turn", total_ms=10)
+        logger.sampled(logging.INFO, "chat.turn", total_ms=20)
+        logger.event(logging.WARNING, "chat.slow_turn", total_ms=5000)
+
+    records = [(r.getMessage(), r.fields) for r in caplog.records]
+    assert records == [
+        ("chat.turn", {"total_ms": 20, "sampled": 0.1}),
+        ("chat.slow_turn", {"total_ms": 5000}),
+    ]
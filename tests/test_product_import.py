@@ -0,0 +1,90 @@
+import io
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.application.product_service import ProductService
+from src.infrastructure.db.database import Base
+import src.infrastructure.db.models  # registra los modelos en Base
+from src.infrastructure.importers.product_feed import iter_csv_rows, iter_ndjson_rows, iter_csv_lines
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+# ----- Fixtures -----
+
+def make_service(tmp_path, name="import.db"):
+    engine = create_engine(f"sqlite:///{tmp_path / name}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    return ProductService(SQLProductRepository(db)), db
+
+CSV_FEED = (
+    "id,name,brand,category,size,color,price,stock,description\n"
+    ",Pegasus,Nike,Running,42,Negro,120,3,\"Amortiguación\nreactiva\"\n"
+    ",Sin precio,Nike,Running,42,Negro,,3,x\n"
+    ",Gratis,Adidas,Casual,40,Blanco,0,1,x\n"
+    ",Samba,Adidas,Casual,40,Blanco,90.5,7,Clásica\n"
+)
+
+# ----- Tests de lectura de archivos -----
+
+def test_csv_rows_keep_line_numbers_and_multiline_fields():
+    rows = list(iter_csv_rows(io.StringIO(CSV_FEED)))
+    assert [line for line, _ in rows] == [3, 4, 5, 6]
+    assert rows[0][1]["description"] == "Amortiguación\nreactiva"
+
+def test_ndjson_rows_report_invalid_json():
+    rows = list(iter_ndjson_rows(io.StringIO('{"name": "A"}\n\n{roto\n')))
+    assert rows[0] == (1, {"name": "A"})
+    assert rows[1][0] == 3 and isinstance(rows[1][1], ValueError)
+
+# ----- Tests de importación -----
+
+def test_import_products_validates_rows_and_saves_in_batches(tmp_path):
+    service, db = make_service(tmp_path)
+    report = service.import_products(iter_csv_rows(io.StringIO(CSV_FEED)), batch_size=1)
+
+    assert report.imported == 2
+    assert report.failed == 2
+    assert [e.line for e in report.errors] == [4, 5]
+    products = service.get_all_products()
+    assert [(p.name, p.price, p.stock) for p in products] == [("Pegasus", 120.0, 3), ("Samba", 90.5, 7)]
+    # Las columnas de búsqueda se calculan igual que en el ORM
+    assert [p.name for p in service.search_products({"brand": "adidas"})] == ["Samba"]
+    db.close()
+
+def test_import_products_upserts_rows_with_id(tmp_path):
+    service, db = make_service(tmp_path)
+    rows = [(1, {"name": "Pegasus", "brand": "Nike", "category": "Running", "price": 120, "stock": 3})]
+    service.import_products(rows)
+    product_id = service.get_all_products()[0].id
+
+    updated = [(1, {"id": product_id, "name": "Pegasus 41", "brand": "Nike", "category": "Running",
+                    "price": 130, "stock": 5}),
+               (2, {"id": 500, "name": "Nuevo", "brand": "Puma", "category": "Casual", "price": 50, "stock": 1})]
+    report = service.import_products(updated)
+
+    assert report.imported == 2 and report.failed == 0
+    products = {p.id: p for p in service.get_all_products()}
+    assert (products[product_id].name, products[product_id].price) == ("Pegasus 41", 130.0)
+    assert products[500].brand == "Puma"
+    db.close()
+
+def test_import_products_caps_listed_errors(tmp_path):
+    service, db = make_service(tmp_path)
+    rows = [(i, {"name": ""}) for i in range(1, 6)]
+    report = service.import_products(rows, max_errors=2)
+    assert report.failed == 5
+    assert len(report.errors) == 2 and report.errors_truncated
+    db.close()
+
+def test_csv_export_round_trips(tmp_path):
+    service, db = make_service(tmp_path)
+    service.import_products(iter_csv_rows(io.StringIO(CSV_FEED)))
+    exported = "".join(iter_csv_lines(service.get_all_products()))
+
+    other, other_db = make_service(tmp_path, "export.db")
+    report = other.import_products(iter_csv_rows(io.StringIO(exported)))
+    assert report.failed == 0
+    assert [p.description for p in other.get_all_products()][0] == "Amortiguación\nreactiva"
+    db.close()
+    other_db.close()
@@ -0,0 +1,61 @@
+from datetime import datetime
+
+from src.domain.entities import Product, ChatMessage
+from src.infrastructure.search.product_index import BM25ProductIndex, tokenize
+
+# ----- Fixtures -----
+
+def make_product(id, name, brand, category="Running", color="Negro", size="42"):
+    return Product(id=id, name=name, brand=brand, category=category, size=size,
+                   color=color, price=100.0, stock=5, description="Zapatillas cómodas.")
+
+CATALOG = [
+    make_product(1, "Nike Air Zoom Pegasus", "Nike"),
+    make_product(2, "Adidas Ultraboost 21", "Adidas", color="Blanco", size="41"),
+    make_product(3, "Puma Derby", "Puma", category="Formal", color="Marrón"),
+    make_product(4, "Nike Air Force 1", "Nike", category="Casual", color="Blanco", size="44"),
+]
+
+def build_index():
+    index = BM25ProductIndex()
+    index.on_catalog_loaded(CATALOG, version=1)
+    return index
+
+# ----- Tests de BM25ProductIndex -----
+
+def test_tokenize_normalizes_accents_and_stopwords():
+    assert tokenize("¿Tienen algo FORMAL en Marrón?") == ["formal", "marron"]
+
+def test_search_ranks_relevant_products_first():
+    index = build_index()
+    assert index.search("¿tienen Nike talla 42?", k=2) == [1, 4]
+    assert index.search("algo formal en marrón", k=1) == [3]
+    assert index.search("hola", k=3) == []
+
+def test_search_uses_previous_user_messages():
+    index = build_index()
+    context = [ChatMessage(id=1, session_id="s", role="user", message="me gustan las Adidas",
+                           timestamp=datetime.utcnow())]
+    assert index.search("¿y en blanco?", k=1, context=context) == [2]
+
+def test_index_updates_incrementally():
+    index = build_index()
+    index.on_product_saved(make_product(3, "Puma Derby", "Puma", category="Running"), version=2)
+    assert index.search("formal", k=1) == []
+    index.on_product_removed(1, version=3)
+    assert index.search("pegasus", k=1) == []
+    assert len(index) == 3
+
+def test_index_is_emptied_when_catalog_is_invalidated():
+    index = build_index()
+    index.on_catalog_invalidated(version=2)
+    assert len(index) == 0
+    assert index.search("pegasus", k=1) == []
+    index.on_catalog_loaded(CATALOG[:1], version=3)
+    assert index.search("pegasus", k=1) == [1]
+
+def test_select_falls_back_to_first_products():
+    index = build_index()
+    assert [p.id for p in index.select(CATALOG, "formal", k=2)] == [3]
+    assert [p.id for p in index.select(CATALOG, "hola", k=2)] == [1, 2]
+    assert len(index.select(CATALOG[:2], "formal", k=2)) == 2
@@ -0,0 +1,560 @@
+from dataclasses import replace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from src.domain.entities import Product
+from src.infrastructure.db.database import Base
+import src.infrastructure.db.models  # registra los modelos en Base
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+from src.infrastructure.repositorie.cached_product_repository import ProductCatalogCache, CachedProductRepository
+
+# ----- Fixtures -----
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def make_product(name="Zapato", brand="Nike", category="Running", price=100.0, stock=5, **kwargs):
+    data = dict(id=None, name=name, brand=brand, category=category, size="42",
+                color="Negro", price=price, stock=stock, description="Zapato de prueba")
+    data.update(kwargs)
+    return Product(**data)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# ----- Tests de CachedProductRepository -----
+
+def test_cached_repository_serves_reads_from_memory(db):
+    sql_repo = SQLProductRepository(db)
+    sql_repo.save(make_product(name="Pegasus"))
+    cache = ProductCatalogCache(ttl_seconds=60)
+    repo = CachedProductRepository(sql_repo, cache)
+
+    assert [p.name for p in repo.get_all()] == ["Pegasus"]
+    assert repo.get_by_brand("Nike")[0].name == "Pegasus"
+    assert repo.get_by_category("Casual") == []
+    assert cache.misses == 1
+    assert cache.hits == 2
+
+def test_cached_repository_write_through_updates_cache(db):
+    cache = ProductCatalogCache(ttl_seconds=60)
+    repo = CachedProductRepository(SQLProductRepository(db), cache)
+    repo.get_all()
+    version = cache.version
+
+    saved = repo.save(make_product(name="Gazelle", brand="Adidas"))
+    assert cache.version > version
+    assert repo.get_by_id(saved.id).name == "Gazelle"
+
+    saved.stock = 1
+    repo.save(saved)
+    assert repo.get_by_id(saved.id).stock == 1
+
+    assert repo.delete(saved.id) is True
+    assert repo.get_by_id(saved.id) is None
+    assert cache.misses == 1
+
+def test_cached_repository_get_by_id_returns_copy(db):
+    cache = ProductCatalogCache(ttl_seconds=60)
+    repo = CachedProductRepository(SQLProductRepository(db), cache)
+    saved = repo.save(make_product())
+    product = repo.get_by_id(saved.id)
+    product.stock = 0
+    assert repo.get_by_id(saved.id).stock == 5
+
+def test_cached_repository_reloads_after_ttl(db):
+    clock = FakeClock()
+    sql_repo = SQLProductRepository(db)
+    cache = ProductCatalogCache(ttl_seconds=10, clock=clock)
+    repo = CachedProductRepository(sql_repo, cache)
+    repo.get_all()
+
+    # Escritura fuera de la caché (p. ej. otro proceso)
+    sql_repo.save(make_product(name="Cortez"))
+    assert repo.get_all() == []
+
+    clock.now = 11
+    assert [p.name for p in repo.get_all()] == ["Cortez"]
+    assert cache.misses == 2
+
+def test_cached_repository_discards_catalog_read_overlapping_a_write(db):
+    sql_repo = SQLProductRepository(db)
+    saved = sql_repo.save(make_product(name="Pegasus", stock=5))
+    cache = ProductCatalogCache(ttl_seconds=60)
+    repo = CachedProductRepository(sql_repo, cache)
+
+    class WriteDuringRead:
+        """Toma la foto del catálogo y, antes de entregarla, otra petición edita el producto."""
+
+        def get_all(self):
+            snapshot = sql_repo.get_all()
+            repo.update_fields(saved.id, {"stock": 1})
+            return snapshot
+
+        def __getattr__(self, name):
+            return getattr(sql_repo, name)
+
+    repo.repository = WriteDuringRead()
+    # La lectura responde con su foto, pero no la guarda sobre la escritura
+    assert repo.get_all()[0].stock == 5
+    assert cache.get(saved.id).stock == 1
+    assert not cache.is_fresh()
+
+    repo.repository = sql_repo
+    assert repo.get_by_id(saved.id).stock == 1
+    assert cache.is_fresh() and cache.misses == 2
+
+# ----- Tests de búsqueda en SQL -----
+
+def test_search_filters_in_sql(db):
+    repo = SQLProductRepository(db)
+    repo.save(make_product(name="Air Zoom Pegasus", brand="Nike", price=120.0, stock=3))
+    repo.save(make_product(name="Air Force 1", brand="NIKE", category="Casual", price=110.0, stock=0))
+    repo.save(make_product(name="Ultraboost", brand="Adidas", price=180.0, color="Blanco"))
+
+    assert [p.name for p in repo.search({"brand": "nike"})] == ["Air Zoom Pegasus", "Air Force 1"]
+    assert [p.name for p in repo.search({"name": "AIR", "in_stock": True})] == ["Air Zoom Pegasus"]
+    assert [p.name for p in repo.search({"min_price": 115, "max_price": 200})] == ["Air Zoom Pegasus", "Ultraboost"]
+    assert [p.name for p in repo.search({"category": "casual", "color": None})] == ["Air Force 1"]
+    assert repo.search({"name": "100%"}) == []
+
+def test_search_paginates_by_offset_and_cursor(db):
+    repo = SQLProductRepository(db)
+    ids = [repo.save(make_product(name=f"Zapato {i}")).id for i in range(5)]
+
+    assert [p.id for p in repo.search({}, limit=2, offset=2)] == ids[2:4]
+    assert [p.id for p in repo.search({}, limit=2, after_id=ids[3])] == ids[4:]
+
+def test_migration_adds_search_columns_to_existing_table(engine):
+    from sqlalchemy import inspect, text
+    from src.infrastructure.db.migrations import run_migrations
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE products"))
+        conn.execute(text(
+            "CREATE TABLE products (id INTEGER PRIMARY KEY, name VARCHAR, brand VARCHAR, "
+            "category VARCHAR, size VARCHAR, color VARCHAR, price FLOAT, stock INTEGER, description VARCHAR)"
+        ))
+        conn.execute(text(
+            "INSERT INTO products VALUES (1, 'Stan Smith', 'Adidas', 'Casual', '42', 'Verde', 90.0, 18, 'Clásico')"
+        ))
+    run_migrations(engine)
+    run_migrations(engine)
+
+    indexes = {i["name"] for i in inspect(engine).get_indexes("products")}
+    assert "idx_products_brand_lower" in indexes
+    session = sessionmaker(bind=engine)()
+    assert [p.name for p in SQLProductRepository(session).search({"brand": "ADIDAS"})] == ["Stan Smith"]
+    assert SQLProductRepository(session).get_by_id(1).version == 1
+    session.close()
+
+def test_update_fields_is_a_single_update_of_changed_columns(engine, db):
+    from sqlalchemy import event
+    repo = SQLProductRepository(db)
+    product = repo.save(make_product(name="Pegasus", price=120.0))
+    assert product.version == 1
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        updated = repo.update_fields(product.id, {"name": "Pegasus 41", "price": 130.0}, expected_version=1)
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert len(statements) == 1 and statements[0].startswith("UPDATE products SET")
+    assignments = statements[0].split(" WHERE ")[0]
+    assert "stock" not in assignments and "brand" not in assignments
+    assert (updated.name, updated.price, updated.stock, updated.version) == ("Pegasus 41", 130.0, 5, 2)
+    # Las columnas de búsqueda siguen al nombre
+    assert [p.id for p in repo.search({"name": "pegasus 41"})] == [product.id]
+    assert repo.update_fields(999, {"stock": 1}) is None
+
+def test_update_fields_rejects_stale_version(db):
+    from src.domain.exceptions import ProductVersionConflictError
+    repo = SQLProductRepository(db)
+    product = repo.save(make_product())
+    repo.save(replace(product, stock=7))
+
+    with pytest.raises(ProductVersionConflictError) as error:
+        repo.update_fields(product.id, {"price": 1.0}, expected_version=product.version)
+    assert error.value.current_version == 2
+    assert repo.get_by_id(product.id).price == 100.0
+
+def test_iter_all_streams_in_id_order(db):
+    repo = SQLProductRepository(db)
+    ids = [repo.save(make_product(name=f"Zapato {i}")).id for i in range(5)]
+
+    assert [p.id for p in repo.iter_all(batch_size=2)] == ids
+    assert [p.id for p in repo.iter_all(after_id=ids[2], batch_size=2)] == ids[3:]
+
+# ----- Tests de repositorios asíncronos -----
+
+def run_async(test):
+    """Ejecuta `test(session_factory)` sobre una BD aiosqlite en memoria."""
+    import asyncio
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async def main():
+        async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        async with async_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await test(async_sessionmaker(async_engine, expire_on_commit=False))
+        await async_engine.dispose()
+
+    asyncio.run(main())
+
+def test_async_product_repository_matches_sync_behaviour():
+    from src.infrastructure.repositorie.async_product_repository import AsyncSQLProductRepository
+
+    async def scenario(session_factory):
+        repo = AsyncSQLProductRepository(session_factory())
+        saved = await repo.save(make_product(name="Pegasus", brand="Nike"))
+        await repo.save(make_product(name="Gazelle", brand="Adidas"))
+        saved.stock = 1
+        await repo.save(saved)
+
+        assert (await repo.get_by_id(saved.id)).stock == 1
+        assert [p.name for p in await repo.get_by_brand("Adidas")] == ["Gazelle"]
+        assert [p.name for p in await repo.search({"brand": "NIKE"})] == ["Pegasus"]
+        assert await repo.delete(saved.id) is True
+        assert [p.name for p in await repo.get_all()] == ["Gazelle"]
+
+    run_async(scenario)
+
+def test_async_update_fields_is_a_single_versioned_update():
+    from sqlalchemy import event
+    from src.domain.exceptions import ProductVersionConflictError
+    from src.infrastructure.repositorie.async_product_repository import AsyncSQLProductRepository
+
+    async def scenario(session_factory):
+        session = session_factory()
+        repo = AsyncSQLProductRepository(session)
+        saved = await repo.save(make_product(name="Pegasus", stock=5))
+        statements = []
+        event.listen(session.bind.sync_engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: statements.append(statement))
+
+        saved.stock = 1
+        updated = await repo.save(saved)
+        assert (updated.stock, updated.version) == (1, 2)
+        assert [s.split()[0] for s in statements] == ["UPDATE"]
+
+        with pytest.raises(ProductVersionConflictError) as error:
+            await repo.update_fields(saved.id, {"price": 1.0}, expected_version=1)
+        assert error.value.current_version == 2
+        assert (await repo.update_fields(saved.id, {"price": 99.0}, expected_version=2)).version == 3
+        assert await repo.update_fields(999, {"stock": 1}) is None
+        assert await repo.save(make_product(id=999)) is None
+
+    run_async(scenario)
+
+def test_async_chat_repository_history():
+    from datetime import datetime, timedelta
+    from src.domain.entities import ChatMessage
+    from src.infrastructure.repositorie.async_chat_repository import AsyncSQLChatRepository
+
+    async def scenario(session_factory):
+        repo = AsyncSQLChatRepository(session_factory())
+        start = datetime(2024, 1, 1)
+        for i in range(4):
+            await repo.save_message(ChatMessage(id=None, session_id="s1", role="user",
+                                                message=f"m{i}", timestamp=start + timedelta(seconds=i)))
+        assert [m.message for m in await repo.get_recent_messages("s1", 2)] == ["m2", "m3"]
+        assert await repo.delete_session_history("s1") == 4
+        assert await repo.get_session_history("s1") == []
+
+    run_async(scenario)
+
+# ----- Tests de persistencia en lote -----
+
+def test_save_messages_in_one_transaction(db):
+    from datetime import datetime
+    from src.domain.entities import ChatMessage
+    from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+
+    repo = SQLChatRepository(db)
+    saved = repo.save_messages([
+        ChatMessage(id=None, session_id="s1", role="user", message="hola", timestamp=datetime(2024, 1, 1, 10)),
+        ChatMessage(id=None, session_id="s1", role="assistant", message="¡hola!", timestamp=datetime(2024, 1, 1, 11)),
+    ])
+    assert [m.role for m in saved] == ["user", "assistant"]
+    assert saved[0].id is not None and saved[1].id == saved[0].id + 1
+    assert [m.id for m in repo.get_session_history("s1")] == [m.id for m in saved]
+
+def test_write_behind_queue_group_commits_concurrent_sessions():
+    import asyncio
+    from datetime import datetime
+    from src.domain.entities import ChatMessage
+    from src.infrastructure.repositorie.async_chat_repository import AsyncSQLChatRepository
+    from src.infrastructure.repositorie.chat_write_queue import ChatWriteBehindQueue
+
+    def turn(session_id):
+        now = datetime(2024, 1, 1)
+        return [ChatMessage(id=None, session_id=session_id, role="user", message="hola", timestamp=now),
+                ChatMessage(id=None, session_id=session_id, role="assistant", message="¡hola!", timestamp=now)]
+
+    async def scenario(session_factory):
+        queue = ChatWriteBehindQueue(session_factory, max_batch=100, max_delay_ms=10)
+        results = await asyncio.gather(*(queue.enqueue(turn(f"s{i}")) for i in range(5)))
+        await queue.close()
+
+        assert queue.batches_written == 1
+        assert [len(r) for r in results] == [2] * 5
+        assert all(m.id is not None for r in results for m in r)
+        async with session_factory() as session:
+            assert len(await AsyncSQLChatRepository(session).get_session_history("s3")) == 2
+
+    run_async(scenario)
+
+# ----- Tests del índice de historial de chat -----
+
+def test_recent_messages_query_is_an_index_range_scan(engine, db):
+    from datetime import datetime
+    from sqlalchemy import event, text
+    from src.domain.entities import ChatMessage
+    from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+
+    repo = SQLChatRepository(db)
+    now = datetime(2024, 1, 1)
+    repo.save_messages([ChatMessage(id=None, session_id=f"s{i % 3}", role="user", message="hola", timestamp=now)
+                        for i in range(30)])
+
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    messages = repo.get_recent_messages("s1", 4)
+    event.remove(engine, "before_cursor_execute", capture)
+
+    # Con timestamps iguales, el ID desempata y mantiene el orden de inserción
+    assert [m.id for m in messages] == sorted(m.id for m in messages)
+    statement, parameters = statements[-1]
+    plan = " ".join(row[-1] for row in db.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", parameters))
+    assert "idx_chat_memory_session_ts_id" in plan
+    assert "TEMP B-TREE" not in plan
+
+def test_migration_replaces_legacy_chat_indexes(engine):
+    from sqlalchemy import inspect, text
+    from src.infrastructure.db.migrations import run_migrations
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX idx_chat_memory_session_ts_id"))
+        conn.execute(text("CREATE INDEX ix_chat_memory_session_id ON chat_memory (session_id)"))
+        conn.execute(text("CREATE INDEX idx_chat_memory_session_id ON chat_memory (session_id)"))
+    run_migrations(engine)
+
+    indexes = {i["name"] for i in inspect(engine).get_indexes("chat_memory")}
+    assert indexes == {"idx_chat_memory_session_ts_id"}
+
+# ----- Tests de la caché de contexto por sesión -----
+
+def make_message(session_id, text, role="user", seconds=0):
+    from datetime import datetime, timedelta
+    from src.domain.entities import ChatMessage
+    return ChatMessage(id=None, session_id=session_id, role=role, message=text,
+                       timestamp=datetime(2024, 1, 1) + timedelta(seconds=seconds))
+
+def test_cached_chat_repository_serves_hot_sessions_from_memory(db):
+    from unittest.mock import MagicMock
+    from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+    from src.infrastructure.repositorie.cached_chat_repository import SessionContextCache, CachedChatRepository
+
+    inner = MagicMock(wraps=SQLChatRepository(db))
+    repo = CachedChatRepository(inner, SessionContextCache(max_messages=4))
+
+    assert repo.get_recent_messages("s1", 4) == []
+    for i in range(3):
+        repo.save_messages([make_message("s1", f"u{i}", seconds=2 * i),
+                            make_message("s1", f"a{i}", role="assistant", seconds=2 * i + 1)])
+        assert len(repo.get_recent_messages("s1", 4)) == min(4, 2 * i + 2)
+
+    assert [m.message for m in repo.get_session_history("s1", limit=3)] == ["a1", "u2", "a2"]
+    assert inner.get_recent_messages.call_count == 1
+    assert repo.cache.hits == 4
+
+    # Más mensajes de los que guarda la caché: se consulta la BD
+    assert len(repo.get_recent_messages("s1", 6)) == 6
+    assert inner.get_recent_messages.call_count == 2
+
+    assert repo.delete_session_history("s1") == 6
+    assert repo.get_recent_messages("s1", 2) == []
+
+def test_async_cached_chat_repository_does_not_refill_over_concurrent_turns():
+    import asyncio
+    from src.infrastructure.repositorie.cached_chat_repository import (
+        SessionContextCache, AsyncCachedChatRepository,
+    )
+
+    class SlowReadRepository:
+        """Toma la foto de la BD al empezar la lectura y la entrega al liberar `release`."""
+
+        def __init__(self):
+            self.rows = []
+            self.release = asyncio.Event()
+            self.reads = 0
+
+        async def get_recent_messages(self, session_id, n):
+            self.reads += 1
+            snapshot = list(self.rows[-n:])
+            await self.release.wait()
+            return snapshot
+
+        async def save_messages(self, messages):
+            saved = [replace(m, id=len(self.rows) + i + 1) for i, m in enumerate(messages)]
+            self.rows.extend(saved)
+            return saved
+
+        async def delete_session_history(self, session_id):
+            deleted, self.rows = len(self.rows), []
+            return deleted
+
+    async def scenario():
+        inner = SlowReadRepository()
+        repo = AsyncCachedChatRepository(inner, SessionContextCache(max_messages=4))
+
+        # Turno A lee el contexto mientras el turno B guarda su par de mensajes
+        read = asyncio.ensure_future(repo.get_recent_messages("s1", 4))
+        await asyncio.sleep(0)
+        await repo.save_messages([make_message("s1", "u0"), make_message("s1", "a0", role="assistant")])
+        inner.release.set()
+        assert await read == []
+        # La foto vieja no reemplaza lo que guardó B: la próxima lectura va a la BD
+        assert [m.message for m in await repo.get_recent_messages("s1", 4)] == ["u0", "a0"]
+        assert inner.reads == 2
+
+        # Un borrado durante la lectura tampoco se deshace con la foto previa
+        inner.release.clear()
+        repo.cache.invalidate("s1")
+        read = asyncio.ensure_future(repo.get_recent_messages("s1", 4))
+        await asyncio.sleep(0)
+        await repo.delete_session_history("s1")
+        inner.release.set()
+        assert len(await read) == 2
+        assert await repo.get_recent_messages("s1", 4) == []
+        assert inner.reads == 4
+        assert repo.cache._fills == {}
+
+    asyncio.run(scenario())
+
+def test_async_cached_summary_repository_does_not_revive_deleted_summary():
+    import asyncio
+    from datetime import datetime
+    from src.domain.entities import ChatSummary
+    from src.infrastructure.repositorie.cached_chat_repository import (
+        SessionContextCache, AsyncCachedChatRepository, AsyncCachedChatSummaryRepository,
+    )
+
+    class SlowSummaryRepository:
+        """Lee el resumen al empezar y lo entrega al liberar `release`; el borrado lo quita."""
+
+        def __init__(self):
+            self.summaries = {}
+            self.release = asyncio.Event()
+            self.reads = 0
+
+        async def get(self, session_id):
+            self.reads += 1
+            snapshot = self.summaries.get(session_id)
+            await self.release.wait()
+            return snapshot
+
+        async def save(self, summary):
+            self.summaries[summary.session_id] = summary
+            return summary
+
+        async def delete_session_history(self, session_id):
+            self.summaries.pop(session_id, None)
+            return 0
+
+    async def scenario():
+        inner = SlowSummaryRepository()
+        cache = SessionContextCache(max_messages=4)
+        summaries = AsyncCachedChatSummaryRepository(inner, cache)
+        chats = AsyncCachedChatRepository(inner, cache)
+        inner.summaries["s1"] = ChatSummary(session_id="s1", summary="vieja", last_message_id=2,
+                                            updated_at=datetime(2024, 1, 1))
+
+        # El historial se borra mientras otro turno lee el resumen
+        read = asyncio.ensure_future(summaries.get("s1"))
+        await asyncio.sleep(0)
+        await chats.delete_session_history("s1")
+        inner.release.set()
+        assert (await read).summary == "vieja"
+        # La foto previa al borrado no vuelve a la caché
+        assert await summaries.get("s1") is None
+        assert inner.reads == 2
+
+        # Un resumen guardado durante la lectura tampoco se pisa con la foto anterior
+        inner.release.clear()
+        cache.invalidate("s1")
+        read = asyncio.ensure_future(summaries.get("s1"))
+        await asyncio.sleep(0)
+        await summaries.save(ChatSummary(session_id="s1", summary="nueva", last_message_id=4,
+                                         updated_at=datetime(2024, 1, 2)))
+        inner.release.set()
+        assert await read is None
+        assert (await summaries.get("s1")).summary == "nueva"
+        assert inner.reads == 3
+        assert cache._fills == {}
+
+    asyncio.run(scenario())
+
+def test_session_context_cache_expires_and_respects_budget():
+    from src.infrastructure.repositorie.cached_chat_repository import SessionContextCache
+
+    clock = FakeClock()
+    cache = SessionContextCache(max_messages=4, ttl_seconds=60, max_bytes=2000, clock=clock)
+    cache.fill("s1", [make_message("s1", "hola")], complete=True)
+    assert cache.get("s1", 4) is not None
+
+    clock.now = 61
+    assert cache.get("s1", 4) is None
+    assert len(cache) == 0
+
+    for i in range(10):
+        cache.fill(f"s{i}", [make_message(f"s{i}", "x" * 200)], complete=True)
+    assert cache.size_bytes <= 2000
+    assert cache.get("s9", 1) is not None
+    assert cache.get("s0", 1) is None
+    assert cache.evictions > 0
+
+def test_chat_summary_repository_upserts_and_is_cleared_with_history(db):
+    from datetime import datetime
+    from src.domain.entities import ChatSummary
+    from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+    from src.infrastructure.repositorie.chat_summary_repository import SQLChatSummaryRepository
+
+    repo = SQLChatSummaryRepository(db)
+    assert repo.get("s1") is None
+    repo.save(ChatSummary(session_id="s1", summary="uno", last_message_id=2, updated_at=datetime(2024, 1, 1)))
+    repo.save(ChatSummary(session_id="s1", summary="uno | dos", last_message_id=4, updated_at=datetime(2024, 1, 2)))
+    assert repo.get("s1").summary == "uno | dos"
+
+    SQLChatRepository(db).delete_session_history("s1")
+    assert repo.get("s1") is None
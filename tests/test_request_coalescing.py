@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from src.domain.exceptions import LLMOverloadedError
+from src.infrastructure.llm_providers.fake_llm_service import FakeLLMService
+from src.infrastructure.llm_providers.request_coalescing import (
+    CoalescingLLMService, LLMConcurrencyLimiter, SingleFlight,
+)
+
+# ----- Fixtures -----
+
+class SlowLLM(FakeLLMService):
+    def __init__(self, delay=0.05):
+        super().__init__()
+        self.delay = delay
+
+    async def generate_response(self, user_message, products, context, catalog_version=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return f"respuesta a {user_message}"
+
+# ----- Tests de SingleFlight y CoalescingLLMService -----
+
+def test_identical_prompts_share_one_upstream_call():
+    provider = SlowLLM()
+    limiter = LLMConcurrencyLimiter(max_concurrency=2, max_queue=0)
+    service = CoalescingLLMService(provider, limiter)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(service.generate_response("¿tienen Nike?", [], []) for _ in range(20)),
+            service.generate_response("¿tienen Adidas?", [], []),
+        )
+
+    replies = asyncio.run(scenario())
+    assert replies[:20] == ["respuesta a ¿tienen Nike?"] * 20
+    assert provider.calls == 2
+    assert service.single_flight.coalesced == 19
+    assert limiter.rejected == 0
+
+def test_single_flight_shares_errors_and_forgets_key():
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream")
+
+    async def scenario():
+        results = await asyncio.gather(flight.do("k", failing), flight.do("k", failing),
+                                       return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert len(flight) == 0
+        with pytest.raises(RuntimeError):
+            await flight.do("k", failing)
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+def test_single_flight_leader_cancellation_does_not_cancel_followers():
+    flight = SingleFlight()
+    calls = []
+
+    async def slow():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "listo"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert await follower == "listo"
+        assert len(flight) == 0
+
+        # Si todos los que esperan se cancelan, la llamada compartida también
+        lone = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0.01)
+        lone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await lone
+        assert len(flight) == 0
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+# ----- Tests de LLMConcurrencyLimiter -----
+
+def test_limiter_rejects_when_queue_is_full():
+    limiter = LLMConcurrencyLimiter(max_concurrency=1, max_queue=1)
+    service = CoalescingLLMService(SlowLLM(), limiter)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(service.generate_response(f"mensaje {i}", [], []) for i in range(3)),
+            return_exceptions=True,
+        )
+
+    results = asyncio.run(scenario())
+    assert [isinstance(r, LLMOverloadedError) for r in results] == [False, False, True]
+    assert limiter.rejected == 1
+    assert limiter.peak_queued == 1
+    assert (limiter.in_flight, limiter.queued) == (0, 0)
+
+def test_session_slot_limits_turns_per_session():
+    limiter = LLMConcurrencyLimiter(max_concurrency=4, max_queue=4, max_per_session=1)
+
+    async def scenario():
+        async with limiter.session_slot("s1"):
+            assert limiter.session_is_full("s1")
+            with pytest.raises(LLMOverloadedError):
+                async with limiter.session_slot("s1"):
+                    pass
+            async with limiter.session_slot("s2"):
+                pass
+        assert not limiter.session_is_full("s1")
+
+    asyncio.run(scenario())
@@ -0,0 +1,295 @@
+import asyncio
+import logging
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from src.infrastructure.llm_providers.gemini_service import GeminiService, FALLBACK_MESSAGE
+from src.infrastructure.llm_providers.request_coalescing import CoalescingLLMService, LLMConcurrencyLimiter
+from src.infrastructure.llm_providers.resilience import (
+    CircuitBreaker, CircuitOpenError, ResilientCaller, RetryPolicy,
+)
+from src.infrastructure.llm_providers.simulated_llm_service import SimulatedLLMService
+
+# ----- Fixtures -----
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class RecordingSleep:
+    def __init__(self):
+        self.delays = []
+
+    async def __call__(self, delay):
+        self.delays.append(delay)
+
+class FlakyModel:
+    """Falla con los errores indicados y luego responde."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return type("Response", (), {"text": " listo "})()
+
+def make_gemini(model, max_retries=2, failure_threshold=5, clock=None):
+    breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_seconds=30,
+                             clock=clock or FakeClock())
+    policy = RetryPolicy(max_retries=max_retries, sleep=RecordingSleep(),
+                         retryable=(asyncio.TimeoutError, google_exceptions.ServerError))
+    gemini = GeminiService(api_key="test-key", caller=ResilientCaller(1.0, policy, breaker))
+    gemini.model = model
+    return gemini
+
+# ----- Tests de CircuitBreaker -----
+
+def test_breaker_opens_after_threshold_and_probes_after_reset():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()  # solo una llamada de prueba
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.stats()["times_opened"] == 2
+
+# ----- Tests de RetryPolicy -----
+
+def test_retry_policy_backoff_is_bounded_and_only_for_retryable_errors():
+    sleep = RecordingSleep()
+    policy = RetryPolicy(max_retries=3, base_delay_ms=100, max_delay_ms=250, sleep=sleep)
+    attempts = []
+
+    async def timeout_twice():
+        attempts.append(1)
+        if len(attempts) <= 2:
+            raise asyncio.TimeoutError()
+        return "ok"
+
+    assert asyncio.run(policy.run(timeout_twice)) == "ok"
+    assert len(sleep.delays) == 2
+    assert 0 <= sleep.delays[0] <= 0.1 and 0 <= sleep.delays[1] <= 0.2
+    assert all(policy.backoff(10) <= 0.25 for _ in range(20))
+
+    async def invalid():
+        attempts.append(1)
+        raise ValueError("petición inválida")
+
+    with pytest.raises(ValueError):
+        asyncio.run(policy.run(invalid))
+    assert policy.retries == 2
+
+def test_caller_applies_deadline_per_attempt():
+    caller = ResilientCaller(timeout_seconds=0.01,
+                             retry_policy=RetryPolicy(max_retries=1, sleep=RecordingSleep()))
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(caller.call(hang))
+    assert caller.retry_policy.retries == 1
+    assert caller.breaker.consecutive_failures == 1
+
+def test_caller_bounds_all_attempts_with_total_budget():
+    caller = ResilientCaller(timeout_seconds=0.05, total_timeout_seconds=0.12,
+                             retry_policy=RetryPolicy(max_retries=10, sleep=RecordingSleep()))
+
+    async def hang():
+        await asyncio.sleep(1)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(caller.call(hang))
+    # Sin el presupuesto total serían 11 intentos de 0.05 s
+    assert caller.retry_policy.retries <= 2
+    assert caller.breaker.consecutive_failures == 1
+
+def test_cancelled_half_open_probe_releases_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=10, clock=clock)
+    caller = ResilientCaller(timeout_seconds=5, retry_policy=RetryPolicy(max_retries=0), breaker=breaker)
+    breaker.record_failure()
+    clock.now = 10
+
+    async def run():
+        probe = asyncio.ensure_future(caller.call(lambda: asyncio.sleep(1)))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(run())
+    # La prueba cancelada no deja el circuito bloqueado en half_open
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+# ----- Tests de GeminiService -----
+
+def test_gemini_retries_transient_errors():
+    model = FlakyModel([google_exceptions.ServiceUnavailable("caído")])
+    gemini = make_gemini(model)
+    assert asyncio.run(gemini.generate_response("hola", [], [])) == "listo"
+    assert model.calls == 2
+    assert gemini.caller.breaker.state == "closed"
+
+def test_gemini_queue_wait_does_not_count_against_deadline():
+    model = FlakyModel([])
+    gemini = make_gemini(model, max_retries=0)
+    gemini.caller.timeout_seconds = 0.02
+    # Único límite de concurrencia: el del limitador, tomado fuera del deadline
+    limiter = LLMConcurrencyLimiter(max_concurrency=1, max_queue=1)
+    service = CoalescingLLMService(gemini, limiter)
+    release = None
+
+    async def hold_slot():
+        async with limiter.slot():
+            await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(hold_slot())
+        await asyncio.sleep(0)
+        call = asyncio.ensure_future(service.generate_response("hola", [], []))
+        # Más que el deadline de un intento esperando en la cola local
+        await asyncio.sleep(0.05)
+        release.set()
+        await holder
+        return await call
+
+    assert asyncio.run(scenario()) == "listo"
+    assert gemini.caller.breaker.consecutive_failures == 0
+
+def test_gemini_does_not_retry_client_errors():
+    model = FlakyModel([google_exceptions.InvalidArgument("mal")])
+    gemini = make_gemini(model)
+    assert asyncio.run(gemini.generate_response("hola", [], [])) == FALLBACK_MESSAGE
+    assert model.calls == 1
+    assert gemini.caller.breaker.consecutive_failures == 0
+
+def test_gemini_fallback_is_logged_and_counted(caplog):
+    gemini = make_gemini(FlakyModel([google_exceptions.InvalidArgument("prompt inválido")]))
+    with caplog.at_level(logging.WARNING, logger="src.llm"):
+        assert asyncio.run(gemini.generate_response("hola", [], [])) == FALLBACK_MESSAGE
+    assert gemini.caller.fallbacks == 1
+    [record] = caplog.records
+    assert record.getMessage() == "llm.fallback"
+    assert record.fields == {"error_type": "InvalidArgument", "error": "400 prompt inválido",
+                             "provider": "gemini"}
+
+def test_gemini_short_circuits_while_breaker_is_open():
+    model = FlakyModel([google_exceptions.ServiceUnavailable("caído")] * 10)
+    gemini = make_gemini(model, max_retries=0, failure_threshold=2)
+    for _ in range(4):
+        assert asyncio.run(gemini.generate_response("hola", [], [])) == FALLBACK_MESSAGE
+    assert model.calls == 2
+    assert gemini.caller.breaker.stats()["rejected"] == 2
+
+    chunks = []
+
+    async def consume():
+        async for chunk in gemini.stream_response("hola", [], []):
+            chunks.append(chunk)
+
+    asyncio.run(consume())
+    assert chunks == [FALLBACK_MESSAGE]
+    assert model.calls == 2
+    assert gemini.caller.stats()["fallbacks"] == 5
+
+class HangingStreamModel:
+    """Abre el stream y entrega un fragmento; `hang_open` lo deja colgado antes."""
+
+    def __init__(self, hang_open=False):
+        self.hang_open = hang_open
+
+    async def generate_content_async(self, prompt, stream=False):
+        if self.hang_open:
+            await asyncio.sleep(10)
+
+        class Response:
+            async def __aiter__(self):
+                yield type("Chunk", (), {"text": "Hola"})()
+                await asyncio.sleep(10)
+        return Response()
+
+def test_stream_disconnect_during_half_open_probe_does_not_lock_breaker():
+    clock = FakeClock()
+    gemini = make_gemini(HangingStreamModel(hang_open=True), failure_threshold=1, clock=clock)
+    breaker = gemini.caller.breaker
+    breaker.record_failure()
+    clock.now = 30
+
+    async def disconnect_before_first_chunk():
+        async def consume():
+            async for _ in gemini.stream_response("hola", [], []):
+                pass
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(disconnect_before_first_chunk())
+    # Desconexión neutral: el circuito sigue en half_open y admite otra prueba
+    assert breaker.state == "half_open" and gemini.in_flight == 0
+    assert breaker.allow()
+    breaker.release_probe()
+
+    async def disconnect_after_first_chunk():
+        stream = gemini.stream_response("hola", [], [])
+        assert await stream.__anext__() == "Hola"
+        await stream.aclose()
+
+    gemini.model = HangingStreamModel()
+    asyncio.run(disconnect_after_first_chunk())
+    # Gemini ya había respondido: la prueba cuenta como éxito
+    assert breaker.state == "closed"
+
+def test_simulated_stream_disconnect_releases_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30, clock=clock)
+    provider = SimulatedLLMService(latency_ms=5000, tokens_per_second=0, breaker=breaker)
+    breaker.record_failure()
+    clock.now = 30
+
+    async def run():
+        stream = provider.stream_response("hola", [], [])
+        task = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert breaker.allow()
+
+def test_simulated_provider_trips_breaker_offline():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    provider = SimulatedLLMService(latency_ms=0, tokens_per_second=0, error_rate=1.0, breaker=breaker)
+    provider.caller.retry_policy.max_retries = 0
+    assert provider.generate_response_sync("hola", [], []) == FALLBACK_MESSAGE
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(provider.caller.call(lambda: asyncio.sleep(0)))
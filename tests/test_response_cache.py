@@ -0,0 +1,114 @@
+import asyncio
+import dataclasses
+
+from src.domain.entities import ChatContext, ChatMessage, Product
+from src.infrastructure.llm_providers.fake_llm_service import FakeLLMService
+from src.infrastructure.llm_providers.gemini_service import FALLBACK_MESSAGE
+from src.infrastructure.llm_providers.response_cache import (
+    ChatResponseCache, CachedLLMService, normalize_message,
+)
+from src.infrastructure.repositorie.cached_product_repository import ProductCatalogCache
+
+# ----- Fixtures -----
+
+def make_product(id, name="Pegasus", price=120.0, stock=3):
+    return Product(id=id, name=name, brand="Nike", category="Running", size="42",
+                   color="Negro", price=price, stock=stock, description="Zapato de prueba")
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+# ----- Tests de ChatResponseCache -----
+
+def test_normalize_message_ignores_case_accents_and_punctuation():
+    assert normalize_message("¿Tienen NIKE talla 42?") == "nike talla 42"
+    assert normalize_message("tienen nike, talla 42") == "nike talla 42"
+
+def test_exact_hits_depend_on_context_and_products():
+    cache = ChatResponseCache(max_entries=10, ttl_seconds=60)
+    products = [make_product(1)]
+    cache.put("¿Tienen Nike talla 42?", [], products, "Sí, el Pegasus.")
+
+    assert cache.get("tienen nike talla 42", [], products) == "Sí, el Pegasus."
+    context = ChatContext(messages=[ChatMessage(id=1, session_id="s", role="user",
+                                                message="Hola", timestamp=None)])
+    assert cache.get("tienen nike talla 42", context, products) is None
+    assert cache.get("tienen nike talla 42", [], [make_product(2)]) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_similar_questions_hit_only_when_enabled():
+    products = [make_product(1)]
+    exact = ChatResponseCache(max_entries=10, ttl_seconds=60)
+    similar = ChatResponseCache(max_entries=10, ttl_seconds=60, similarity=0.6)
+    for cache in (exact, similar):
+        cache.put("tienen nike talla 42", [], products, "Sí")
+
+    assert exact.get("tienen nike en talla 42 por favor", [], products) is None
+    assert similar.get("tienen nike en talla 42 por favor", [], products) == "Sí"
+    assert similar.get("busco sandalias rojas", [], products) is None
+    assert similar.similar_hits == 1
+
+def test_lru_and_ttl_eviction():
+    clock = FakeClock()
+    cache = ChatResponseCache(max_entries=2, ttl_seconds=10, clock=clock)
+    for message in ("uno", "dos"):
+        cache.put(message, [], [], message)
+    cache.get("uno", [], [])
+    cache.put("tres", [], [], "tres")
+    assert cache.get("dos", [], []) is None
+    assert cache.evictions == 1
+
+    clock.now = 10
+    assert cache.get("uno", [], []) is None
+    assert len(cache) == 1
+
+def test_price_or_stock_changes_invalidate_referenced_answers():
+    catalog = ProductCatalogCache(ttl_seconds=60)
+    cache = ChatResponseCache(max_entries=10, ttl_seconds=60)
+    catalog.add_listener(cache)
+    catalog.load([make_product(1), make_product(2, "Gazelle")])
+    cache.put("pegasus", [], [make_product(1)], "Pegasus a $120")
+    cache.put("gazelle", [], [make_product(2, "Gazelle")], "Gazelle a $120")
+
+    # Cambiar la descripción no afecta a la respuesta
+    catalog.upsert(dataclasses.replace(make_product(1), description="Otra"))
+    assert len(cache) == 2
+    catalog.upsert(make_product(1, stock=0))
+    assert cache.get("pegasus", [], [make_product(1)]) is None
+    assert cache.get("gazelle", [], [make_product(2, "Gazelle")]) == "Gazelle a $120"
+
+    # Una recarga completa compara precio y stock de lo que quedó
+    catalog.load([make_product(2, "Gazelle", price=99.0)])
+    assert len(cache) == 0
+    assert cache.invalidations == 2
+
+def test_cached_llm_service_skips_provider_on_repeat():
+    provider = FakeLLMService()
+    service = CachedLLMService(provider, ChatResponseCache(max_entries=10, ttl_seconds=60))
+    products = [make_product(1)]
+
+    async def scenario():
+        first = await service.generate_response("Hola Nike", products, [])
+        second = await service.generate_response("hola nike!", products, [])
+        streamed = [c async for c in service.stream_response("HOLA NIKE", products, [])]
+        return first, second, streamed
+
+    first, second, streamed = asyncio.run(scenario())
+    assert first == second == "".join(streamed)
+    assert provider.calls == 1
+
+def test_cached_llm_service_does_not_store_fallback():
+    class FailingLLM(FakeLLMService):
+        async def generate_response(self, *args, **kwargs):
+            self.calls += 1
+            return FALLBACK_MESSAGE
+
+    provider = FailingLLM()
+    service = CachedLLMService(provider, ChatResponseCache(max_entries=10, ttl_seconds=60))
+    for _ in range(2):
+        asyncio.run(service.generate_response("hola", [], []))
+    assert provider.calls == 2
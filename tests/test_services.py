@@ -71,4 +71,29 @@ def test_generate_chat_response_llm_error(chat_service, mock_chat_repo, mock_pro
     mock_llm_service.generate_response.side_effect = Exception("LLM error")
     with pytest.raises(Exception) as exc_info:
         chat_service.generate_chat_response("session1", "error")
-    assert "LLM error" in str(exc_info.value)
\ No newline at end of file
+    assert "LLM error" in str(exc_info.value)
+
+
+# ----- Test de resumen de contexto -----
+
+def test_build_chat_context_summarizes_older_turns():
+    from src.domain.entities import ChatMessage
+    from src.application.context_builder import ConversationSummarizer, build_chat_context
+
+    messages = [
+        ChatMessage(id=i, session_id="s1", role="user" if i % 2 else "assistant",
+                    message=f"mensaje {i} " + "x" * 50, timestamp=datetime.utcnow())
+        for i in range(1, 11)
+    ]
+    summarizer = ConversationSummarizer(max_chars=200)
+    context, summary = build_chat_context("s1", messages, None, summarizer, max_messages=4, max_chars=1000)
+
+    assert [m.id for m in context.get_recent_messages()] == [7, 8, 9, 10]
+    assert summary.last_message_id == 6
+    assert len(summary.summary) <= 200
+    assert "mensaje 6" in summary.summary
+    assert context.summary == summary.summary
+
+    # Sin mensajes nuevos fuera del contexto, el resumen no cambia
+    _, same = build_chat_context("s1", messages, summary, summarizer, max_messages=4, max_chars=1000)
+    assert same is summary
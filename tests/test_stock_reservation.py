@@ -0,0 +1,137 @@
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.application.dtos import StockReservationDTO
+from src.application.product_service import ProductService
+from src.domain.entities import Product
+from src.domain.exceptions import (
+    InsufficientStockError, ProductNotFoundError, InvalidProductDataError, ProductVersionConflictError,
+)
+from src.infrastructure.db.database import Base
+import src.infrastructure.db.models  # registra los modelos en Base
+from src.infrastructure.repositorie.cached_product_repository import CachedProductRepository, ProductCatalogCache
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+
+# ----- Fixtures -----
+
+@pytest.fixture
+def session_factory(tmp_path):
+    # BD en archivo: cada hilo usa su propia conexión
+    engine = create_engine(f"sqlite:///{tmp_path / 'stock.db'}", connect_args={"timeout": 30})
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+def add_product(session_factory, name="Pegasus", stock=10) -> int:
+    with session_factory() as db:
+        saved = SQLProductRepository(db).save(Product(id=None, name=name, brand="Nike", category="Running",
+                                                      size="42", color="Negro", price=120.0, stock=stock,
+                                                      description="x"))
+        return saved.id
+
+def stock_of(session_factory, product_id) -> int:
+    with session_factory() as db:
+        return SQLProductRepository(db).get_by_id(product_id).stock
+
+# ----- Tests del repositorio -----
+
+def test_reserve_stock_decrements_and_rejects_oversell(session_factory):
+    product_id = add_product(session_factory, stock=3)
+    with session_factory() as db:
+        repo = SQLProductRepository(db)
+        assert repo.reserve_stock(product_id, 2).stock == 1
+        with pytest.raises(InsufficientStockError) as error:
+            repo.reserve_stock(product_id, 2)
+        assert error.value.available == 1
+        with pytest.raises(ProductNotFoundError):
+            repo.reserve_stock(999, 1)
+        assert repo.release_stock(product_id, 2).stock == 3
+
+def test_reservation_invalidates_a_version_read_before_it(session_factory):
+    product_id = add_product(session_factory, stock=10)
+    with session_factory() as db:
+        service = ProductService(CachedProductRepository(SQLProductRepository(db), ProductCatalogCache()))
+        read = service.get_product_by_id(product_id)
+        assert (read.stock, read.version) == (10, 1)
+
+        service.reserve_stock(product_id, 5)
+        # La edición basada en la lectura anterior no puede borrar la reserva
+        with pytest.raises(ProductVersionConflictError) as error:
+            service.patch_product(product_id, {"stock": 11}, expected_version=read.version)
+        assert error.value.current_version == 2
+        assert stock_of(session_factory, product_id) == 5
+
+        service.release_stock(product_id, 1)
+        service.bulk_reserve([StockReservationDTO(product_id=product_id, quantity=2)])
+        current = service.get_product_by_id(product_id)
+        assert (current.stock, current.version) == (4, 4)
+        assert service.patch_product(product_id, {"stock": 11}, expected_version=4).stock == 11
+
+def test_concurrent_reservations_never_oversell(session_factory):
+    initial_stock, threads, attempts = 25, 16, 5
+    product_id = add_product(session_factory, stock=initial_stock)
+    results = []
+    start = threading.Barrier(threads)
+
+    def buyer():
+        start.wait()
+        with session_factory() as db:
+            repo = SQLProductRepository(db)
+            for _ in range(attempts):
+                try:
+                    repo.reserve_stock(product_id, 1)
+                    results.append(True)
+                except InsufficientStockError:
+                    results.append(False)
+
+    workers = [threading.Thread(target=buyer) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert len(results) == threads * attempts
+    assert results.count(True) == initial_stock
+    assert stock_of(session_factory, product_id) == 0
+
+def test_bulk_reserve_is_all_or_nothing(session_factory):
+    first = add_product(session_factory, "Pegasus", stock=5)
+    second = add_product(session_factory, "Samba", stock=1)
+    with session_factory() as db:
+        service = ProductService(SQLProductRepository(db))
+        with pytest.raises(InsufficientStockError) as error:
+            service.bulk_reserve([StockReservationDTO(product_id=first, quantity=2),
+                                  StockReservationDTO(product_id=second, quantity=2)])
+        assert error.value.product_id == second
+        assert (stock_of(session_factory, first), stock_of(session_factory, second)) == (5, 1)
+
+        # Las cantidades repetidas de un producto se suman
+        results = service.bulk_reserve([StockReservationDTO(product_id=first, quantity=2),
+                                        StockReservationDTO(product_id=second, quantity=1),
+                                        StockReservationDTO(product_id=first, quantity=1)])
+        assert [(r.product_id, r.quantity, r.stock) for r in results] == [(first, 3, 2), (second, 1, 0)]
+        with pytest.raises(ProductNotFoundError):
+            service.bulk_reserve([StockReservationDTO(product_id=999, quantity=1)])
+        with pytest.raises(InvalidProductDataError):
+            service.reserve_stock(first, 0)
+
+def test_cached_repository_updates_stock_in_cache(session_factory):
+    product_id = add_product(session_factory, stock=4)
+    cache = ProductCatalogCache()
+    with session_factory() as db:
+        repo = CachedProductRepository(SQLProductRepository(db), cache)
+        before = repo.get_by_id(product_id)
+        assert before.stock == 4
+        version = cache.version
+        repo.reserve_stock(product_id, 3)
+        assert repo.get_by_id(product_id).stock == 1
+        # Una escritura anterior que llega tarde no pisa la reserva
+        cache.upsert(before)
+        assert repo.get_by_id(product_id).stock == 1
+        assert cache.version == version + 1
+        repo.bulk_reserve({product_id: 1})
+        assert repo.get_all()[0].stock == 0
+        assert cache.misses == 1
@@ -0,0 +1,85 @@
+import asyncio
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from src.application.chat_service import ChatService
+from src.application.dtos import ChatMessageRequestDTO
+from src.domain.entities import Product
+from src.infrastructure.db.database import Base
+import src.infrastructure.db.models  # registra los modelos en Base
+from src.infrastructure.llm_providers.simulated_llm_service import SimulatedLLMService
+from src.infrastructure.repositorie.chat_repository import SQLChatRepository
+from src.infrastructure.repositorie.product_repository import SQLProductRepository
+from src.infrastructure.repositorie.unit_of_work import AsyncSQLUnitOfWork, SQLUnitOfWork
+
+# ----- Fixtures -----
+
+def make_product(name="Pegasus"):
+    return Product(id=None, name=name, brand="Nike", category="Running", size="42",
+                   color="Negro", price=120.0, stock=3, description="Zapato de prueba")
+
+def seeded_database(tmp_path):
+    url = f"sqlite:///{tmp_path / 'uow.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    SQLProductRepository(db).save(make_product())
+    db.close()
+    return engine
+
+# ----- Tests de unidad de trabajo -----
+
+def test_sync_unit_of_work_closes_session(tmp_path):
+    engine = seeded_database(tmp_path)
+    provider = SimulatedLLMService(latency_ms=0, tokens_per_second=0)
+    service = ChatService(None, None, provider,
+                          unit_of_work_factory=lambda: SQLUnitOfWork(sessionmaker(bind=engine)))
+
+    response = asyncio.run(service.process_message(ChatMessageRequestDTO(session_id="s1", message="Hola")))
+    assert "Pegasus" in response.assistant_message
+    assert engine.pool.checkedout() == 0
+    db = sessionmaker(bind=engine)()
+    assert [m.role for m in SQLChatRepository(db).get_session_history("s1")] == ["user", "assistant"]
+    db.close()
+    engine.dispose()
+
+def test_small_pool_sustains_many_concurrent_slow_llm_calls(tmp_path):
+    """
+    30 turnos simultáneos con un LLM de 200 ms sobre un pool de 1 conexión
+    sin overflow: como ninguna sesión se mantiene durante la llamada al LLM,
+    todos terminan sin agotar el pool en aproximadamente una latencia del LLM.
+    """
+    seeded_database(tmp_path).dispose()
+    async_engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'uow.db'}", poolclass=AsyncAdaptedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=2,
+    )
+    peak = {"checked_out": 0}
+
+    @event.listens_for(async_engine.sync_engine, "checkout")
+    def _on_checkout(*args):
+        peak["checked_out"] = max(peak["checked_out"], async_engine.sync_engine.pool.checkedout())
+
+    factory = async_sessionmaker(async_engine, expire_on_commit=False)
+    provider = SimulatedLLMService(latency_ms=200, tokens_per_second=0)
+    service = ChatService(None, None, provider, unit_of_work_factory=lambda: AsyncSQLUnitOfWork(factory))
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        responses = await asyncio.gather(*(
+            service.process_message(ChatMessageRequestDTO(session_id=f"s{i}", message="Hola"))
+            for i in range(30)
+        ))
+        elapsed = loop.time() - started
+        await async_engine.dispose()
+        return responses, elapsed
+
+    responses, elapsed = asyncio.run(scenario())
+    assert len(responses) == 30
+    assert peak["checked_out"] == 1
+    # Con la sesión tomada durante el LLM serían 30 x 200 ms en serie
+    assert elapsed < 3